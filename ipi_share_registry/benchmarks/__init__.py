@@ -0,0 +1,12 @@
+"""
+Performance benchmarks for the share registry.
+
+Generate a synthetic register, then time the main views against it::
+
+    python manage.py generate_benchmark_data --shareholders 100000 --transactions 500000
+    python manage.py run_benchmarks --output results.json
+    python manage.py run_benchmarks --compare results.json
+
+Run both against a dedicated database: point ``DJANGO_SETTINGS_MODULE`` at
+settings for a scratch SQLite file or a local PostgreSQL instance.
+"""
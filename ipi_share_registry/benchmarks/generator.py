@@ -0,0 +1,222 @@
+"""
+Deterministic synthetic register for benchmarks.
+
+The same counts and seed always produce the same holders, directors, ledger
+and transfers, so timings from different commits are taken over identical
+data. Rows are written with ``bulk_create`` in batches; balances are tracked
+in memory while the ledger is generated in date order, so ``total_shares``
+always equals the completed ledger and no balance goes negative.
+"""
+import random
+from bisect import bisect_right
+from contextlib import contextmanager
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+
+from shareholders import captable
+from shareholders.models import Company, Director, Shareholder, ShareTransfer, Transaction
+from shareholders.signals import register_changed
+
+DEFAULT_COUNTS = {
+    'shareholders': 1000,
+    'directors': 20,
+    'transactions': 5000,
+    'transfers': 500,
+}
+DEFAULT_SEED = 1
+DEFAULT_BATCH_SIZE = 5000
+ID_PREFIX = 'BENCH-'
+
+FIRST_NAMES = [
+    'Alice', 'Bob', 'Carol', 'David', 'Esther', 'Francis', 'Grace', 'Henry', 'Iru', 'John',
+    'Kila', 'Lucy', 'Mary', 'Noah', 'Oala', 'Peter', 'Ruth', 'Samuel', 'Tamara', 'Vincent',
+]
+LAST_NAMES = [
+    'Tau', 'Kila', 'Morea', 'Namaliu', 'Somare', 'Wari', 'Pokawin', 'Kaupa', 'Anis', 'Gima',
+    'Smith', 'Nguyen', 'Chan', 'Walker', 'Patel', 'Kaiulo', 'Mek', 'Tovue', 'Sapuri', 'Lohia',
+]
+CITIES = ['Port Moresby', 'Lae', 'Mount Hagen', 'Madang', 'Goroka', 'Kokopo', 'Wewak', 'Kainantu']
+
+# Weights for ledger entries that are not a holder's opening issue
+LEDGER_TYPES = [('ISSUE', 2), ('PURCHASE', 3), ('BONUS', 1), ('RIGHTS', 1), ('BUYBACK', 2)]
+STATUSES = [('COMPLETED', 80), ('PENDING', 10), ('APPROVED', 5), ('DRAFT', 5)]
+TRANSFER_STATUSES = [('COMPLETED', 70), ('PENDING', 15), ('APPROVED', 10), ('DRAFT', 5)]
+
+
+@contextmanager
+def _explicit_join_dates():
+    # date_joined is auto_now_add, which would stamp every row with today
+    field = Shareholder._meta.get_field('date_joined')
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+def _choice(rng, weighted):
+    values, weights = zip(*weighted)
+    return rng.choices(values, weights)[0]
+
+
+def _random_dates(rng, count, start, end):
+    span = (end - start).days
+    return sorted(start + timedelta(days=rng.randint(0, span)) for _ in range(count))
+
+
+class _Writer:
+    """Buffer rows per model and bulk_create them in batches."""
+
+    def __init__(self, batch_size):
+        self.batch_size = batch_size
+        self.pending = {}
+
+    def add(self, obj):
+        rows = self.pending.setdefault(type(obj), [])
+        rows.append(obj)
+        if len(rows) >= self.batch_size:
+            self.flush(type(obj))
+
+    def flush(self, model=None):
+        for key in ([model] if model else list(self.pending)):
+            rows = self.pending.pop(key, [])
+            if rows:
+                key.objects.bulk_create(rows)
+
+
+def generate(shareholders=DEFAULT_COUNTS['shareholders'], directors=DEFAULT_COUNTS['directors'],
+             transactions=DEFAULT_COUNTS['transactions'], transfers=DEFAULT_COUNTS['transfers'],
+             seed=DEFAULT_SEED, start=date(2015, 1, 1), end=None, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Write a synthetic register and return the number of rows created per model.
+
+    ``transactions`` counts ledger entries other than each holder's opening
+    issue and the two legs of every completed transfer.
+    """
+    if shareholders < 2:
+        raise ValueError("At least two shareholders are needed to generate transfers")
+    rng = random.Random(seed)
+    end = end or date(2025, 12, 31)
+    company = Company.get_company()
+    writer = _Writer(batch_size)
+    counts = {'shareholders': shareholders, 'directors': directors, 'transactions': 0, 'transfers': transfers}
+
+    with transaction.atomic(), _explicit_join_dates():
+        join_dates = _random_dates(rng, shareholders, start, end)
+        holders = []
+        for i, joined in enumerate(join_dates):
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            holder = Shareholder(
+                company=company,
+                full_name=f"{first} {last}",
+                id_number=f"{ID_PREFIX}{i + 1:07d}",
+                email=f"{first.lower()}.{last.lower()}{i + 1}@example.com",
+                phone_number=f"+675 7{rng.randint(0, 9999999):07d}",
+                city=rng.choice(CITIES),
+                country='Papua New Guinea',
+                date_joined=joined,
+                is_active=rng.random() > 0.05,
+            )
+            holders.append(holder)
+            writer.add(holder)
+        writer.flush()
+        # bulk_create does not return primary keys on every backend
+        holder_ids = list(
+            Shareholder.objects.filter(id_number__startswith=ID_PREFIX)
+            .order_by('id_number').values_list('id', flat=True)
+        )
+
+        for i in range(directors):
+            writer.add(Director(
+                company=company,
+                full_name=f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+                director_type=rng.choice(Director.DIRECTOR_TYPE_CHOICES)[0],
+                position='Director',
+                appointed_date=start + timedelta(days=rng.randint(0, (end - start).days)),
+                is_active=rng.random() > 0.2,
+            ))
+
+        balances = {}
+
+        def post(holder_id, transaction_type, shares, day, status, reference=''):
+            price = Decimal(rng.randint(100, 500)) / 100
+            writer.add(Transaction(
+                shareholder_id=holder_id,
+                transaction_type=transaction_type,
+                status=status,
+                shares=shares,
+                price_per_share=price,
+                total_amount=price * shares,
+                transaction_date=day,
+                reference_number=reference,
+            ))
+            counts['transactions'] += 1
+            if status == 'COMPLETED':
+                sign = 1 if transaction_type in Transaction.CREDIT_TYPES else -1
+                balances[holder_id] = balances.get(holder_id, 0) + sign * shares
+
+        # Every holder opens with a completed issue on the day they join
+        for holder_id, joined in zip(holder_ids, join_dates):
+            post(holder_id, 'ISSUE', rng.randint(100, 10000), joined, 'COMPLETED')
+
+        # Ledger entries and transfers interleaved in date order, each
+        # touching only holders who have already joined
+        events = [('transaction', day) for day in _random_dates(rng, transactions, start, end)]
+        events += [('transfer', day) for day in _random_dates(rng, transfers, start, end)]
+        events.sort(key=lambda event: event[1])
+        transfer_number = 0
+        for kind, day in events:
+            joined = max(bisect_right(join_dates, day), 1)
+            holder_id = holder_ids[rng.randrange(joined)]
+            balance = balances.get(holder_id, 0)
+
+            if kind == 'transaction':
+                transaction_type = _choice(rng, LEDGER_TYPES)
+                shares = rng.randint(10, 1000)
+                if transaction_type == 'BUYBACK':
+                    if balance < 10:
+                        transaction_type = 'PURCHASE'
+                    else:
+                        shares = rng.randint(1, balance // 10 or 1)
+                post(holder_id, transaction_type, shares, day, _choice(rng, STATUSES))
+                continue
+
+            transfer_number += 1
+            recipient_id = holder_ids[rng.randrange(max(joined, 2))]
+            if recipient_id == holder_id:
+                recipient_id = holder_ids[0] if holder_id != holder_ids[0] else holder_ids[1]
+            status = _choice(rng, TRANSFER_STATUSES)
+            shares = max(1, balance // rng.randint(4, 20))
+            if shares > balance:
+                status = 'DRAFT'
+            price = Decimal(rng.randint(100, 500)) / 100
+            reference = f"{ID_PREFIX}T{transfer_number:07d}"
+            writer.add(ShareTransfer(
+                company=company,
+                from_shareholder_id=holder_id,
+                to_shareholder_id=recipient_id,
+                transfer_date=day,
+                shares=shares,
+                price_per_share=price,
+                total_amount=price * shares,
+                reference_number=reference,
+                status=status,
+            ))
+            if status == 'COMPLETED':
+                post(holder_id, 'TRANSFER_OUT', shares, day, 'COMPLETED', reference)
+                post(recipient_id, 'TRANSFER_IN', shares, day, 'COMPLETED', reference)
+        writer.flush()
+
+        for batch_start in range(0, len(holder_ids), batch_size):
+            batch = [
+                Shareholder(id=holder_id, total_shares=balances.get(holder_id, 0))
+                for holder_id in holder_ids[batch_start:batch_start + batch_size]
+            ]
+            Shareholder.objects.bulk_update(batch, ['total_shares'])
+
+        captable.rebuild(batch_size=batch_size)
+        register_changed.send(sender=Shareholder, dates=join_dates + [day for _, day in events])
+
+    return counts
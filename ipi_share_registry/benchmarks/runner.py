@@ -0,0 +1,174 @@
+"""
+Time the main pages and operations against whatever database is configured.
+
+Each scenario runs ``warmup`` untimed and ``iterations`` timed passes
+through the Django test client (or, for transfer execution, the model API
+inside a rolled-back transaction). Results are plain JSON keyed by
+scenario name, so files from different commits or databases can be
+compared with ``compare``.
+"""
+import json
+import platform
+import statistics
+import subprocess
+from datetime import datetime, timezone
+from time import perf_counter
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from dashboard import kpis
+from shareholders.models import Company, Director, Shareholder, ShareTransfer, Transaction
+
+BENCHMARK_USER = 'benchmark'
+DEFAULT_ITERATIONS = 10
+DEFAULT_WARMUP = 2
+
+
+class Fixtures:
+    """Rows the scenarios work on, picked deterministically from the generated data."""
+
+    def __init__(self):
+        holders = Shareholder.objects.filter(total_shares__gt=0).order_by('-total_shares', 'id')
+        self.holder = holders.first()
+        self.recipient = Shareholder.objects.exclude(pk=self.holder.pk).order_by('id').first()
+        self.search_term = self.holder.full_name.split()[-1][:4]
+        self.user, _ = User.objects.get_or_create(
+            username=BENCHMARK_USER, defaults={'is_staff': True, 'is_superuser': True}
+        )
+        self.client = Client()
+        self.client.force_login(self.user)
+
+
+def _get(path):
+    def scenario(fixtures):
+        response = fixtures.client.get(path(fixtures))
+        if response.status_code != 200:
+            raise RuntimeError(f"{path(fixtures)} returned {response.status_code}")
+    return scenario
+
+
+def _dashboard_cold(fixtures):
+    kpis.invalidate()
+    _get(lambda f: reverse('dashboard:dashboard'))(fixtures)
+
+
+def _execute_transfer(fixtures):
+    with transaction.atomic():
+        transfer = ShareTransfer.objects.create(
+            company=Company.get_company(),
+            from_shareholder=fixtures.holder,
+            to_shareholder=fixtures.recipient,
+            shares=1,
+            status='APPROVED',
+        )
+        transfer.execute_transfer()
+        transaction.set_rollback(True)
+
+
+SCENARIOS = {
+    'dashboard': _get(lambda f: reverse('dashboard:dashboard')),
+    'dashboard_cold': _dashboard_cold,
+    'share_register': _get(lambda f: reverse('dashboard:share_register')),
+    'shareholders_list': _get(lambda f: reverse('dashboard:shareholders')),
+    'directors_list': _get(lambda f: reverse('dashboard:directors')),
+    'transaction_history': _get(lambda f: reverse('dashboard:transaction_history')),
+    'transaction_history_filtered': _get(
+        lambda f: f"{reverse('dashboard:transaction_history')}?status=COMPLETED&shareholder={f.holder.pk}"
+    ),
+    'search': _get(lambda f: f"{reverse('shareholders:search_suggest')}?q={f.search_term}"),
+    'transfer_execution': _execute_transfer,
+    'shareholder_report': _get(lambda f: reverse('shareholders:shareholder_report', args=[f.holder.pk])),
+}
+
+
+def _time(scenario, fixtures, iterations, warmup):
+    for _ in range(warmup):
+        scenario(fixtures)
+    timings = []
+    queries = 0
+    for _ in range(iterations):
+        with CaptureQueriesContext(connection) as captured:
+            start = perf_counter()
+            scenario(fixtures)
+            timings.append((perf_counter() - start) * 1000)
+        queries = max(queries, len(captured))
+    timings.sort()
+    return {
+        'median_ms': round(statistics.median(timings), 3),
+        'p95_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+        'min_ms': round(timings[0], 3),
+        'max_ms': round(timings[-1], 3),
+        'queries': queries,
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def dataset_counts():
+    return {
+        'shareholders': Shareholder.objects.count(),
+        'directors': Director.objects.count(),
+        'transactions': Transaction.objects.count(),
+        'transfers': ShareTransfer.objects.count(),
+    }
+
+
+def run(names=None, iterations=DEFAULT_ITERATIONS, warmup=DEFAULT_WARMUP):
+    """Run the named scenarios (default: all) and return the results document."""
+    names = names or list(SCENARIOS)
+    unknown = set(names) - set(SCENARIOS)
+    if unknown:
+        raise ValueError(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+    if not Shareholder.objects.filter(total_shares__gt=0).exists():
+        raise ValueError("The register is empty; generate benchmark data first")
+
+    fixtures = Fixtures()
+    results = {}
+    # The test client sends Host: testserver
+    with override_settings(ALLOWED_HOSTS=['testserver']):
+        for name in names:
+            results[name] = _time(SCENARIOS[name], fixtures, iterations, warmup)
+
+    return {
+        'meta': {
+            'commit': _git_commit(),
+            'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'iterations': iterations,
+            'warmup': warmup,
+            'dataset': dataset_counts(),
+        },
+        'results': results,
+    }
+
+
+def compare(baseline, current):
+    """Return ``(scenario, baseline ms, current ms, % change)`` for scenarios in both result documents."""
+    rows = []
+    for name, result in current['results'].items():
+        before = baseline['results'].get(name)
+        if before is None:
+            continue
+        change = (result['median_ms'] - before['median_ms']) / before['median_ms'] * 100 if before['median_ms'] else 0.0
+        rows.append((name, before['median_ms'], result['median_ms'], round(change, 1)))
+    return rows
+
+
+def dumps(results):
+    return json.dumps(results, indent=2, sort_keys=True)
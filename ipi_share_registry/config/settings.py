@@ -1,3 +1,4 @@
+import sys
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -13,6 +14,9 @@ SECRET_KEY = 'django-insecure-=($cqmmy-hx41%(qw(+y)fwu^p2f#arx^l-5_tpoz-(i@b*01=
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = True
 
+# Running under manage.py test
+TESTING = len(sys.argv) > 1 and sys.argv[1] == 'test'
+
 ALLOWED_HOSTS = []
 
 
@@ -26,6 +30,7 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'django.contrib.humanize',
+    'django.contrib.postgres',
 
     'shareholders',
     'dashboard',
@@ -33,11 +38,15 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'dashboard.instrumentation.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'dashboard.groups.GroupCacheMiddleware',
+    'shareholders.audit.AuditMiddleware',
+    'dashboard.replicas.ReplicaStickinessMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -78,6 +87,76 @@ DATABASES = {
     }
 }
 
+# Reporting views (dashboard, register, history, statements, exports) read
+# from the database alias named by READ_REPLICA, typically a streaming
+# replica of 'default' added to DATABASES, e.g.
+#
+#     'replica': {..., 'HOST': 'replica.internal', 'TEST': {'MIRROR': 'default'}},
+#
+# None sends everything to 'default'. After a POST a session reads from
+# 'default' for READ_REPLICA_STICKY_SECONDS, so users see their own changes
+# even while the replica lags (see dashboard.replicas).
+DATABASE_ROUTERS = ['dashboard.replicas.ReplicaRouter']
+READ_REPLICA = None
+READ_REPLICA_STICKY_SECONDS = 10
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'ipi-share-registry',
+    }
+}
+
+# Cache alias and lifetime (seconds) for the dashboard KPIs. Point the alias
+# at a shared backend (e.g. Redis or Memcached) when running several workers.
+DASHBOARD_KPI_CACHE = 'default'
+DASHBOARD_KPI_TIMEOUT = 300
+
+# Cache alias and lifetime (seconds) for users' group names (see dashboard.groups)
+USER_GROUPS_CACHE = 'default'
+USER_GROUPS_TIMEOUT = 60
+
+# Cache alias holding the ledger version and the register totals keyed by
+# it (see shareholders.register)
+REGISTER_CACHE = 'default'
+
+# Cache alias and lifetime (seconds) for shareholder statements (see
+# shareholders.statements). Any ledger change retires cached statements, so
+# the timeout only bounds how long unused ones take up space.
+STATEMENT_CACHE = 'default'
+STATEMENT_TIMEOUT = 24 * 60 * 60
+# Processes computing and rendering statement runs for the whole register.
+# Template rendering dominates a run, so on a multi-core host raising this
+# to the number of cores shortens it roughly in proportion.
+STATEMENT_WORKERS = 1
+
+# Background jobs (see shareholders.jobs). A running job whose worker has not
+# reported for JOB_LEASE_SECONDS is assumed dead and queued again; failed
+# attempts are retried after JOB_RETRY_DELAY seconds, doubling each time.
+JOB_LEASE_SECONDS = 300
+JOB_RETRY_DELAY = 30
+JOB_POLL_INTERVAL = 2
+
+# Processes rendering large certificate batches. Rendering from the compiled
+# template takes microseconds, so one process keeps up with the database;
+# raise this if the template grows heavier.
+CERTIFICATE_WORKERS = 1
+
+
+# Request instrumentation (see dashboard.instrumentation)
+
+INSTRUMENTATION_SERVER_TIMING = True
+# Record peak memory per request with tracemalloc (slows every request)
+INSTRUMENTATION_TRACE_MEMORY = False
+# Requests kept per view for the stats page
+INSTRUMENTATION_STATS_WINDOW = 200
+# Raise instead of logging when a view exceeds its @query_budget
+QUERY_BUDGET_ENFORCE = TESTING
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -0,0 +1,55 @@
+"""
+Cached group membership for permission checks.
+
+A user's group names are read at most once per request (kept on the user
+object) and shared across requests through the cache named by
+``USER_GROUPS_CACHE`` for ``USER_GROUPS_TIMEOUT`` seconds.
+``GroupCacheMiddleware`` loads them up front for signed-in users, and
+``dashboard.signals`` drops a user's entry when their groups change.
+"""
+from django.conf import settings
+from django.core.cache import caches
+
+
+def _cache():
+    return caches[getattr(settings, 'USER_GROUPS_CACHE', 'default')]
+
+
+def _key(user_id):
+    return f'user-groups:{user_id}'
+
+
+def group_names(user):
+    """The names of ``user``'s groups as a frozenset."""
+    if not user.is_authenticated:
+        return frozenset()
+    names = getattr(user, '_group_names', None)
+    if names is None:
+        cache = _cache()
+        names = cache.get(_key(user.pk))
+        if names is None:
+            names = frozenset(user.groups.values_list('name', flat=True))
+            cache.set(_key(user.pk), names, getattr(settings, 'USER_GROUPS_TIMEOUT', 60))
+        user._group_names = names
+    return names
+
+
+def has_group(user, group_name):
+    return group_name in group_names(user)
+
+
+def invalidate(user_ids):
+    _cache().delete_many([_key(user_id) for user_id in user_ids])
+
+
+class GroupCacheMiddleware:
+    """Resolve the signed-in user's groups once, before the view and templates ask."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            group_names(user)
+        return self.get_response(request)
@@ -0,0 +1,209 @@
+"""
+Per-request instrumentation.
+
+``InstrumentationMiddleware`` counts and times every SQL query (through
+``connection.execute_wrapper``, so it works without ``DEBUG``), times
+template rendering and optionally records peak memory with ``tracemalloc``.
+The figures are sent in a ``Server-Timing`` header and kept in a rolling
+in-process window per view, shown by ``dashboard.views.request_stats``.
+
+Views can declare the most queries they may issue with ``@query_budget(n)``.
+Overruns are logged, and raise ``QueryBudgetExceeded`` when
+``QUERY_BUDGET_ENFORCE`` is set (as it is under the test runner).
+"""
+import contextvars
+import functools
+import logging
+import threading
+import tracemalloc
+from collections import deque
+from contextlib import ExitStack
+from time import perf_counter
+
+from django.conf import settings
+from django.db import connections
+from django.template.base import Template
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STATS_WINDOW = 200
+
+_current = contextvars.ContextVar('request_metrics', default=None)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class RequestMetrics:
+    __slots__ = ('view_name', 'budget', 'queries', 'sql_time', 'template_time', 'total_time',
+                 'peak_memory', '_template_depth')
+
+    def __init__(self):
+        self.view_name = None
+        self.budget = None
+        self.queries = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.total_time = 0.0
+        self.peak_memory = None
+        self._template_depth = 0
+
+    def server_timing(self):
+        entries = [
+            f'sql;dur={self.sql_time * 1000:.1f};desc="{self.queries} queries"',
+            f'tpl;dur={self.template_time * 1000:.1f}',
+            f'total;dur={self.total_time * 1000:.1f}',
+        ]
+        if self.peak_memory is not None:
+            entries.append(f'mem;desc="peak {self.peak_memory / 1024:.0f} KiB"')
+        return ', '.join(entries)
+
+
+def query_budget(max_queries):
+    """Declare the most SQL queries a view may issue per request, session and auth included."""
+    def decorator(view):
+        view.query_budget = max_queries
+        return view
+    return decorator
+
+
+def current_metrics():
+    """The metrics of the request being handled on this thread, or None."""
+    return _current.get()
+
+
+def _record_query(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.sql_time += perf_counter() - start
+
+
+def _instrument_templates():
+    """Wrap Template.render once so top-level renders (not includes/extends) are timed."""
+    original = Template.render
+    if getattr(original, 'instrumented', False):
+        return
+
+    @functools.wraps(original)
+    def render(self, context):
+        metrics = _current.get()
+        if metrics is None or metrics._template_depth:
+            return original(self, context)
+        metrics._template_depth += 1
+        start = perf_counter()
+        try:
+            return original(self, context)
+        finally:
+            metrics.template_time += perf_counter() - start
+            metrics._template_depth -= 1
+
+    render.instrumented = True
+    Template.render = render
+
+
+class RollingStats:
+    """The last ``window`` requests per view, kept in memory for this process only."""
+
+    def __init__(self, window=DEFAULT_STATS_WINDOW):
+        self.window = window
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def add(self, metrics):
+        sample = (metrics.total_time, metrics.queries, metrics.sql_time, metrics.template_time, metrics.peak_memory)
+        with self._lock:
+            samples = self._samples.get(metrics.view_name)
+            if samples is None:
+                samples = self._samples[metrics.view_name] = deque(maxlen=self.window)
+            samples.append(sample)
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+
+    def summary(self):
+        """One dict per view, slowest p95 first. Times are in milliseconds."""
+        with self._lock:
+            snapshot = {view: list(samples) for view, samples in self._samples.items()}
+
+        rows = []
+        for view, samples in snapshot.items():
+            totals = sorted(s[0] for s in samples)
+            queries = [s[1] for s in samples]
+            memory = [s[4] for s in samples if s[4] is not None]
+            count = len(samples)
+            rows.append({
+                'view': view,
+                'requests': count,
+                'avg_ms': sum(totals) / count * 1000,
+                'p95_ms': totals[min(count - 1, int(count * 0.95))] * 1000,
+                'max_ms': totals[-1] * 1000,
+                'avg_queries': sum(queries) / count,
+                'max_queries': max(queries),
+                'avg_sql_ms': sum(s[2] for s in samples) / count * 1000,
+                'avg_template_ms': sum(s[3] for s in samples) / count * 1000,
+                'max_memory_kib': max(memory) / 1024 if memory else None,
+            })
+        return sorted(rows, key=lambda row: row['p95_ms'], reverse=True)
+
+
+stats = RollingStats(getattr(settings, 'INSTRUMENTATION_STATS_WINDOW', DEFAULT_STATS_WINDOW))
+
+
+class InstrumentationMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.trace_memory = getattr(settings, 'INSTRUMENTATION_TRACE_MEMORY', False)
+        self.server_timing = getattr(settings, 'INSTRUMENTATION_SERVER_TIMING', True)
+        _instrument_templates()
+
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        if self.trace_memory:
+            # tracemalloc is process-wide, so under a threaded server the
+            # peak includes allocations made by concurrent requests
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+        start = perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(_record_query))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        metrics.total_time = perf_counter() - start
+        if self.trace_memory:
+            metrics.peak_memory = tracemalloc.get_traced_memory()[1]
+
+        if metrics.view_name is None and request.resolver_match is not None:
+            metrics.view_name = request.resolver_match.view_name
+        if metrics.view_name:
+            stats.add(metrics)
+        if self.server_timing:
+            response['Server-Timing'] = metrics.server_timing()
+        self._check_budget(metrics)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        metrics = _current.get()
+        if metrics is not None:
+            metrics.view_name = request.resolver_match.view_name
+            metrics.budget = getattr(view_func, 'query_budget', None)
+
+    def _check_budget(self, metrics):
+        if metrics.budget is None or metrics.queries <= metrics.budget:
+            return
+        message = f"{metrics.view_name} issued {metrics.queries} queries, over its budget of {metrics.budget}"
+        if getattr(settings, 'QUERY_BUDGET_ENFORCE', False):
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
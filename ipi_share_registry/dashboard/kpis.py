@@ -0,0 +1,93 @@
+"""
+Cached dashboard KPIs.
+
+The figures are computed once and kept in the cache named by
+``DASHBOARD_KPI_CACHE`` until a shareholder, director or transaction
+changes (see ``dashboard.signals``) or ``DASHBOARD_KPI_TIMEOUT`` expires.
+The shareholder list's totals are cached the same way, under their own key
+so the list never computes the whole dashboard. A cache miss is always
+computed on the primary database.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from shareholders import captable
+from shareholders.models import Director, Shareholder
+
+from . import replicas
+
+CACHE_KEY = 'dashboard:kpis'
+HOLDER_TOTALS_KEY = 'dashboard:holder-totals'
+
+
+def _cache():
+    return caches[getattr(settings, 'DASHBOARD_KPI_CACHE', 'default')]
+
+
+def share_distribution(top=10, next_=40):
+    """
+    Percentage of the register held by the ``top`` largest holders, the
+    ``next_`` largest after them, and everyone else.
+    """
+    total = Shareholder.objects.aggregate(total=Sum('total_shares'))['total'] or 0
+    largest = list(
+        Shareholder.objects.filter(total_shares__gt=0)
+        .order_by('-total_shares', 'id')
+        .values_list('total_shares', flat=True)[:top + next_]
+    )
+    if not total:
+        return {'top': 0, 'next': 0, 'other': 0}
+    top_share = round(sum(largest[:top]) / total * 100, 1)
+    next_share = round(sum(largest[top:]) / total * 100, 1)
+    return {'top': top_share, 'next': next_share, 'other': round(100 - top_share - next_share, 1)}
+
+
+def compute_kpis():
+    thirty_days_ago = timezone.now() - timedelta(days=30)
+    return {
+        'total_shareholders': Shareholder.objects.count(),
+        'total_directors': Director.objects.count(),
+        'total_shares': captable.register_total(),
+        'new_shareholders': Shareholder.objects.filter(created_at__gte=thirty_days_ago).count(),
+        'share_distribution': share_distribution(),
+    }
+
+
+def compute_holder_totals():
+    totals = Shareholder.objects.aggregate(
+        count=Count('id'),
+        active=Count('id', filter=Q(is_active=True)),
+        shares=Sum('total_shares'),
+    )
+    totals['shares'] = totals['shares'] or 0
+    return totals
+
+
+def _cached(key, compute):
+    cache = _cache()
+    value = cache.get(key)
+    if value is None:
+        # Everyone reads the cached figures, so they are never computed from
+        # a replica that may not have the change that invalidated them yet
+        with replicas.primary():
+            value = compute()
+        cache.set(key, value, getattr(settings, 'DASHBOARD_KPI_TIMEOUT', 300))
+    return value
+
+
+def get_kpis():
+    """Return the dashboard KPIs, computing them only on a cache miss."""
+    return _cached(CACHE_KEY, compute_kpis)
+
+
+def get_holder_totals():
+    """Return ``count``, ``active`` and ``shares`` (the sum of balances) over all shareholders."""
+    return _cached(HOLDER_TOTALS_KEY, compute_holder_totals)
+
+
+def invalidate():
+    _cache().delete_many([CACHE_KEY, HOLDER_TOTALS_KEY])
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.30 on 2026-10-16 23:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyActivity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month', unique=True)),
+                ('new_shareholders', models.PositiveIntegerField(default=0)),
+                ('issued_shares', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('issued_value', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('transferred_shares', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('transferred_value', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('is_stale', models.BooleanField(default=False)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Monthly Activity',
+                'verbose_name_plural': 'Monthly Activity',
+                'ordering': ['month'],
+            },
+        ),
+    ]
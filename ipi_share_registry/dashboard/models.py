@@ -1,3 +1,25 @@
 from django.db import models
 
-# Create your models here.
+
+class MonthlyActivity(models.Model):
+    """
+    Rollup of register activity for one calendar month, feeding the dashboard
+    charts. Rows are marked stale when the underlying data changes and
+    recomputed on the next read.
+    """
+    month = models.DateField(unique=True, help_text="First day of the month")
+    new_shareholders = models.PositiveIntegerField(default=0)
+    issued_shares = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    issued_value = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    transferred_shares = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    transferred_value = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    is_stale = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['month']
+        verbose_name = 'Monthly Activity'
+        verbose_name_plural = 'Monthly Activity'
+
+    def __str__(self):
+        return f"Activity for {self.month:%B %Y}"
@@ -0,0 +1,195 @@
+import base64
+import datetime
+import json
+from functools import reduce
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db.models import Q
+
+# Count at most this many rows exactly before falling back to an estimate
+COUNT_LIMIT = 10000
+
+
+class _CursorEncoder(DjangoJSONEncoder):
+    # DjangoJSONEncoder truncates datetimes to milliseconds, which would make
+    # a cursor on a timestamp skip or repeat rows
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def encode_cursor(values):
+    """Encode the ordering values of a row into an opaque URL-safe cursor."""
+    raw = json.dumps(list(values), cls=_CursorEncoder, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Decode a cursor produced by encode_cursor, returning None if it is invalid."""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+    except (ValueError, TypeError):
+        return None
+    return values if isinstance(values, list) else None
+
+
+class KeysetPage:
+    """A single page of keyset-paginated results."""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """
+    Paginate a queryset by seeking past the last row seen instead of using OFFSET.
+
+    ``ordering`` is a tuple of field names (optionally prefixed with ``-``) that
+    must uniquely identify a row, e.g. ``('full_name', 'id')``. Each page costs a
+    single indexed range scan no matter how deep into the result set it is.
+
+    ``queryset`` may also be a ``values()`` queryset that includes the
+    ordering fields; ``row_factory``, if given, then wraps each dict on the page.
+    """
+
+    def __init__(self, queryset, ordering, per_page=50, row_factory=None):
+        self.queryset = queryset
+        self.ordering = tuple(ordering)
+        self.per_page = per_page
+        self.row_factory = row_factory
+        self.fields = [f.lstrip('-') for f in self.ordering]
+
+    def _seek(self, values, forward):
+        """Build the row-value comparison ``(a, b, ...) > (x, y, ...)`` as a Q object."""
+        clauses = []
+        lookups = []
+        for i, field in enumerate(self.ordering):
+            name = field.lstrip('-')
+            descending = field.startswith('-')
+            lookup = 'lt' if descending == forward else 'gt'
+            lookups.append(lookup)
+            equal = {self.fields[j]: values[j] for j in range(i)}
+            clauses.append(Q(**equal, **{f'{name}__{lookup}': values[i]}))
+        # The OR of the clauses cannot bound an index scan, so the leading
+        # column's inclusive bound is added to start the scan at the cursor
+        # rather than filtering every row before it
+        leading = Q(**{f'{self.fields[0]}__{lookups[0]}e': values[0]})
+        return leading & reduce(lambda a, b: a | b, clauses)
+
+    def _reversed_ordering(self):
+        return [f[1:] if f.startswith('-') else f'-{f}' for f in self.ordering]
+
+    def _cursor_for(self, obj):
+        if isinstance(obj, dict):
+            return encode_cursor(obj[field] for field in self.fields)
+        return encode_cursor(getattr(obj, field) for field in self.fields)
+
+    def _page(self, rows, next_cursor=None, previous_cursor=None):
+        if self.row_factory is not None:
+            rows = [self.row_factory(row) for row in rows]
+        return KeysetPage(rows, next_cursor=next_cursor, previous_cursor=previous_cursor)
+
+    def page(self, after=None, before=None):
+        """Return the page following the ``after`` cursor, or preceding ``before``."""
+        after_values = decode_cursor(after)
+        before_values = decode_cursor(before)
+        if after_values is not None and len(after_values) != len(self.fields):
+            after_values = None
+        if before_values is not None and len(before_values) != len(self.fields):
+            before_values = None
+
+        if before_values is not None:
+            qs = self.queryset.filter(self._seek(before_values, forward=False))
+            rows = list(qs.order_by(*self._reversed_ordering())[:self.per_page + 1])
+            has_more = len(rows) > self.per_page
+            rows = rows[:self.per_page][::-1]
+            if not rows:
+                return KeysetPage(rows)
+            return self._page(
+                rows,
+                next_cursor=self._cursor_for(rows[-1]),
+                previous_cursor=self._cursor_for(rows[0]) if has_more else None,
+            )
+
+        qs = self.queryset
+        if after_values is not None:
+            qs = qs.filter(self._seek(after_values, forward=True))
+        rows = list(qs.order_by(*self.ordering)[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if not rows:
+            return KeysetPage(rows)
+        return self._page(
+            rows,
+            next_cursor=self._cursor_for(rows[-1]) if has_more else None,
+            previous_cursor=self._cursor_for(rows[0]) if after_values is not None else None,
+        )
+
+
+class CountEstimate:
+    """A row count that may be exact, a lower bound, or a planner estimate."""
+
+    def __init__(self, value, exact=True, lower_bound=False):
+        self.value = value
+        self.exact = exact
+        self.lower_bound = lower_bound
+
+    def __int__(self):
+        return self.value
+
+    def __str__(self):
+        if self.exact:
+            return f"{self.value:,}"
+        if self.lower_bound:
+            return f"{self.value:,}+"
+        return f"~{self.value:,}"
+
+
+def estimate_count(queryset, limit=COUNT_LIMIT):
+    """
+    Count ``queryset`` without scanning more than ``limit + 1`` rows.
+
+    Small results are counted exactly. Larger ones fall back to PostgreSQL's
+    table statistics when the queryset is unfiltered, and otherwise to
+    ``limit`` reported as a lower bound.
+    """
+    counted = queryset.order_by()[:limit + 1].count()
+    if counted <= limit:
+        return CountEstimate(counted)
+
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql' and not queryset.query.where:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                [connection.ops.quote_name(queryset.model._meta.db_table)],
+            )
+            row = cursor.fetchone()
+        if row and row[0] > limit:
+            return CountEstimate(row[0], exact=False)
+    return CountEstimate(limit, exact=False, lower_bound=True)
@@ -0,0 +1,136 @@
+"""
+Read-replica routing for reporting views.
+
+Views decorated with ``@read_replica`` read from the database alias named
+by ``READ_REPLICA`` when they answer a GET or HEAD; everything else, and
+every write, uses ``default``. The alias is held in a context variable for
+the duration of the view, and of the iteration of a streamed response, so
+``ReplicaRouter`` only has to look it up.
+
+A replica trails the primary, so a user who has just changed something
+must not be shown the register from before the change. ``ReplicaStickinessMiddleware``
+notes in the session when a user last sent a POST (or another unsafe
+method), and for ``READ_REPLICA_STICKY_SECONDS`` after that their reads stay
+on ``default``.
+
+Caches and rollups shared with primary readers must not be filled from a
+replica that may be behind an invalidation: either recompute them inside
+``primary()`` or, if ``reading_from_replica()``, leave them alone.
+
+With ``READ_REPLICA`` unset, as it is by default, none of this changes
+which database is used.
+"""
+import contextvars
+import functools
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.http import StreamingHttpResponse
+
+SAFE_METHODS = ('GET', 'HEAD')
+SESSION_KEY = '_read_replica_pinned_until'
+DEFAULT_STICKY_SECONDS = 10
+
+_read_alias = contextvars.ContextVar('read_alias', default=None)
+
+
+def replica_alias():
+    return getattr(settings, 'READ_REPLICA', None)
+
+
+def reading_from_replica():
+    """Whether reads are currently being sent to the replica."""
+    return _read_alias.get() is not None
+
+
+@contextmanager
+def primary():
+    """Read from ``default`` inside the block, even within a routed view."""
+    token = _read_alias.set(None)
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+def sticky_seconds():
+    return getattr(settings, 'READ_REPLICA_STICKY_SECONDS', DEFAULT_STICKY_SECONDS)
+
+
+class ReplicaRouter:
+    """Send reads to the replica while a ``@read_replica`` view runs; writes always go to ``default``."""
+
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        # Explicitly, so an instance read from the replica is not saved back to it
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica gets its schema from the primary
+        if replica_alias() and db == replica_alias():
+            return False
+        return None
+
+
+def is_pinned(request):
+    """Whether ``request``'s session wrote recently enough that the replica may not have caught up."""
+    session = getattr(request, 'session', None)
+    return session is not None and session.get(SESSION_KEY, 0) > time.time()
+
+
+def _on_alias(alias, iterator):
+    iterator = iter(iterator)
+    while True:
+        token = _read_alias.set(alias)
+        try:
+            chunk = next(iterator, None)
+        finally:
+            _read_alias.reset(token)
+        if chunk is None:
+            return
+        yield chunk
+
+
+def read_replica(view):
+    """Serve safe requests to ``view`` from the read replica, unless the session is pinned to the primary."""
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        alias = replica_alias()
+        if not alias or request.method not in SAFE_METHODS or is_pinned(request):
+            return view(request, *args, **kwargs)
+        token = _read_alias.set(alias)
+        try:
+            response = view(request, *args, **kwargs)
+        finally:
+            _read_alias.reset(token)
+        if isinstance(response, StreamingHttpResponse):
+            # Streamed exports run their queries as the body is sent
+            response.streaming_content = _on_alias(alias, response.streaming_content)
+        return response
+    return wrapper
+
+
+class ReplicaStickinessMiddleware:
+    """Keep a session's reads on the primary for a while after it sends a write."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        session = getattr(request, 'session', None)
+        user = getattr(request, 'user', None)
+        # Only signed-in users reach the routed views; pinning anyone else
+        # (e.g. just after logging out) would only create a session for them
+        if (replica_alias() and session is not None and user is not None and user.is_authenticated
+                and request.method not in SAFE_METHODS):
+            session[SESSION_KEY] = time.time() + sticky_seconds()
+        return response
@@ -0,0 +1,62 @@
+"""
+Lightweight rows for the list pages.
+
+Each list is fetched as one ``values()`` query, joins included, and each
+row wrapped in a ``__slots__`` object exposing just what the template
+reads. Rendering therefore costs a fixed number of queries, and a row
+takes a fraction of the memory of a model instance with its state,
+field cache and deferred-loading machinery.
+"""
+from shareholders import thumbnails
+from shareholders.models import Director
+
+
+class Row:
+    """Base for list rows: ``fields`` are the ``values()`` lookups, in slot order."""
+    __slots__ = ()
+    fields = ()
+
+    def __init__(self, values):
+        for slot, field in zip(self.__slots__, self.fields):
+            setattr(self, slot, values[field])
+
+    @classmethod
+    def project(cls, queryset):
+        """Restrict ``queryset`` to the values a row needs."""
+        return queryset.values(*cls.fields)
+
+
+def _initials(full_name):
+    names = (full_name or '').split()
+    if not names:
+        return "??"
+    if len(names) >= 2:
+        return f"{names[0][0]}{names[-1][0]}".upper()
+    return full_name[:2].upper()
+
+
+class ShareholderRow(Row):
+    __slots__ = ('id', 'full_name', 'id_number', 'total_shares', 'ownership_percentage',
+                 'email', 'phone_number', 'is_active', 'photo', 'company_name')
+    fields = ('id', 'full_name', 'id_number', 'total_shares', 'ownership_percentage',
+              'email', 'phone_number', 'is_active', 'photo', 'company__name')
+
+    @property
+    def photo_url(self):
+        return thumbnails.url(self.photo, 'avatar')
+
+    def get_initials(self):
+        return _initials(self.full_name)
+
+
+class DirectorRow(Row):
+    __slots__ = ('id', 'full_name', 'position', 'director_type', 'is_active',
+                 'appointed_date', 'resignation_date', 'company_id', 'company_name')
+    fields = ('id', 'full_name', 'position', 'director_type', 'is_active',
+              'appointed_date', 'resignation_date', 'company_id', 'company__name')
+
+
+def director_rows(queryset=None):
+    """Every director as a DirectorRow, by name."""
+    queryset = Director.objects.all() if queryset is None else queryset
+    return [DirectorRow(values) for values in DirectorRow.project(queryset.order_by('full_name', 'id'))]
@@ -0,0 +1,78 @@
+from django.contrib.auth.models import Group, User
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from shareholders.models import Director, Shareholder, Transaction
+from shareholders.signals import register_changed
+
+from . import groups, kpis, timeseries
+
+
+@receiver(post_save, sender=Shareholder)
+@receiver(post_delete, sender=Shareholder)
+@receiver(post_save, sender=Director)
+@receiver(post_delete, sender=Director)
+@receiver(post_save, sender=Transaction)
+@receiver(post_delete, sender=Transaction)
+@receiver(register_changed)
+def invalidate_kpis(sender, **kwargs):
+    # Drop the cache once the change is visible to other requests
+    transaction.on_commit(kpis.invalidate)
+
+
+@receiver(post_save, sender=Shareholder)
+@receiver(post_delete, sender=Shareholder)
+def shareholder_activity_changed(sender, instance, **kwargs):
+    timeseries.mark_stale([instance.date_joined])
+
+
+@receiver(post_save, sender=Transaction)
+def transaction_activity_changed(sender, instance, created, **kwargs):
+    # Only completed issues and transfers count towards the series; post_save
+    # runs before save() resets tracking, so the loaded status is the old one.
+    # A new row has no old status, and asking for one would cost a query
+    if instance.transaction_type not in timeseries.COUNTED_TYPES:
+        return
+    if instance.status == 'COMPLETED' or (not created and instance.get_loaded_value('status') == 'COMPLETED'):
+        timeseries.mark_stale([instance.transaction_date])
+
+
+@receiver(post_delete, sender=Transaction)
+def transaction_activity_deleted(sender, instance, **kwargs):
+    if instance.status == 'COMPLETED' and instance.transaction_type in timeseries.COUNTED_TYPES:
+        timeseries.mark_stale([instance.transaction_date])
+
+
+@receiver(register_changed)
+def register_activity_changed(sender, dates=(), **kwargs):
+    timeseries.mark_stale(dates)
+
+
+def _invalidate_groups(user_ids):
+    user_ids = list(user_ids)
+    if user_ids:
+        transaction.on_commit(lambda: groups.invalidate(user_ids))
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def user_groups_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        # user.groups.add()/remove()/clear()
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            _invalidate_groups([instance.pk])
+    elif action == 'pre_clear':
+        # group.user_set.clear() does not say which users it removes
+        instance._cleared_user_ids = list(instance.user_set.values_list('pk', flat=True))
+    elif action == 'post_clear':
+        _invalidate_groups(getattr(instance, '_cleared_user_ids', []))
+    elif action in ('post_add', 'post_remove'):
+        _invalidate_groups(pk_set)
+
+
+@receiver(post_save, sender=Group)
+@receiver(pre_delete, sender=Group)
+def group_changed(sender, instance, **kwargs):
+    # A rename or delete changes the names cached for every member
+    if instance.pk is not None:
+        _invalidate_groups(instance.user_set.values_list('pk', flat=True))
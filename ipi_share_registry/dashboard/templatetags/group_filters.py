@@ -1,7 +1,9 @@
 from django import template
 
+from dashboard import groups
+
 register = template.Library()
 
 @register.filter(name='has_group')
 def has_group(user, group_name):
-    return user.groups.filter(name=group_name).exists()
+    return groups.has_group(user, group_name)
@@ -1,3 +1,448 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from datetime import date
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import Group, User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, router
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from shareholders import jobs
+from shareholders.models import Company, Director, Job, Shareholder, Transaction
+
+from . import instrumentation, kpis, replicas, timeseries, views
+from .models import MonthlyActivity
+from .pagination import estimate_count
+from .rows import ShareholderRow
+from .templatetags.group_filters import has_group
+
+
+class KpiCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.company = Company.get_company()
+
+    def test_kpis_are_served_from_cache(self):
+        kpis.get_kpis()
+        with self.assertNumQueries(0):
+            kpis.get_kpis()
+
+    def test_saving_a_shareholder_invalidates_kpis(self):
+        self.assertEqual(kpis.get_kpis()['total_shareholders'], 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            Shareholder.objects.create(company=self.company, full_name='Kila Tau', id_number='SH-KPI-1')
+        kpis_after = kpis.get_kpis()
+        self.assertEqual(kpis_after['total_shareholders'], 1)
+        self.assertEqual(kpis_after['share_distribution'], {'top': 0, 'next': 0, 'other': 0})
+
+
+class TimeSeriesTests(TestCase):
+    def setUp(self):
+        self.company = Company.get_company()
+        self.today = timezone.localdate()
+        self.holder = Shareholder.objects.create(
+            company=self.company, full_name='Kila Tau', id_number='SH-TS-1', date_joined=self.today
+        )
+
+    def add_transaction(self, transaction_type, shares, day):
+        return Transaction.objects.create(
+            shareholder=self.holder,
+            transaction_type=transaction_type,
+            shares=shares,
+            price_per_share=2,
+            transaction_date=day,
+            status='COMPLETED',
+        )
+
+    def test_series_groups_activity_by_month(self):
+        last_month = timeseries.month_starts(2, self.today)[0]
+        self.add_transaction('ISSUE', 100, last_month)
+        self.add_transaction('ISSUE', 50, self.today)
+        self.add_transaction('TRANSFER_IN', 20, self.today)
+        self.add_transaction('TRANSFER_OUT', 20, self.today)
+
+        series = timeseries.monthly_series(2, self.today)
+        self.assertEqual(series['new_shareholders'], [0, 1])
+        self.assertEqual(series['issued_shares'], [100, 50])
+        self.assertEqual(series['issued_value'], [200, 100])
+        self.assertEqual(series['transferred_shares'], [0, 20])
+
+    def test_unchanged_months_are_read_from_rollup(self):
+        timeseries.monthly_series(12, self.today)
+        # Nothing changed, so nothing is recomputed or written
+        with self.assertNumQueries(1):
+            timeseries.monthly_series(12, self.today)
+
+    def test_current_month_is_recomputed_after_a_change(self):
+        timeseries.monthly_series(2, self.today)
+        self.add_transaction('ISSUE', 40, self.today)
+        self.assertEqual(timeseries.monthly_series(2, self.today)['issued_shares'][1], 40)
+
+    def test_new_transaction_does_not_read_back_its_status(self):
+        with CaptureQueriesContext(connection) as captured:
+            self.add_transaction('ISSUE', 5, self.today)
+        table = Transaction._meta.db_table
+        reads = [q['sql'] for q in captured if q['sql'].startswith('SELECT') and f'FROM "{table}"' in q['sql']]
+        self.assertEqual(reads, [])
+
+    def test_new_transaction_marks_its_month_stale(self):
+        last_month = timeseries.month_starts(2, self.today)[0]
+        timeseries.monthly_series(2, self.today)
+        self.add_transaction('ISSUE', 75, last_month)
+        self.assertTrue(MonthlyActivity.objects.get(month=last_month).is_stale)
+        self.assertEqual(timeseries.monthly_series(2, self.today)['issued_shares'][0], 75)
+
+
+class TransactionHistoryTests(TestCase):
+    def setUp(self):
+        company = Company.get_company()
+        self.user = User.objects.create_user('clerk', password='pw')
+        self.client.force_login(self.user)
+        self.alice = Shareholder.objects.create(company=company, full_name='Alice', id_number='SH-TH-1')
+        self.bob = Shareholder.objects.create(company=company, full_name='Bob', id_number='SH-TH-2')
+        for i in range(7):
+            Transaction.objects.create(
+                shareholder=self.alice if i % 2 else self.bob,
+                transaction_type='ISSUE' if i % 3 else 'BUYBACK',
+                shares=10 + i,
+                status='COMPLETED' if i < 4 else 'PENDING',
+            )
+
+    def fetch_all(self, params):
+        ids = []
+        params = dict(params)
+        url = reverse('dashboard:transaction_history')
+        while True:
+            response = self.client.get(url, params)
+            page = response.context['transactions']
+            ids.extend(txn.id for txn in page)
+            if not page.has_next():
+                return ids
+            params['after'] = page.next_cursor
+
+    @mock.patch('dashboard.views.TRANSACTIONS_PER_PAGE', 2)
+    def test_cursor_pages_cover_the_ledger_once_newest_first(self):
+        expected = list(Transaction.objects.order_by('-created_at', 'id').values_list('id', flat=True))
+        self.assertEqual(self.fetch_all({}), expected)
+
+    @mock.patch('dashboard.views.TRANSACTIONS_PER_PAGE', 2)
+    def test_filters_are_kept_across_pages(self):
+        expected = list(
+            Transaction.objects.filter(shareholder=self.alice, status='COMPLETED')
+            .order_by('-created_at', 'id').values_list('id', flat=True)
+        )
+        ids = self.fetch_all({'shareholder': self.alice.id, 'status': 'COMPLETED'})
+        self.assertEqual(ids, expected)
+
+    def test_shareholder_filter_does_not_list_the_register(self):
+        Shareholder.objects.create(company=Company.get_company(), full_name='Idle Holder', id_number='SH-TH-3')
+        response = self.client.get(reverse('dashboard:transaction_history'))
+        self.assertIsNone(response.context['selected_shareholder'])
+        self.assertNotContains(response, 'Idle Holder')
+
+        response = self.client.get(reverse('dashboard:transaction_history'), {'shareholder': self.alice.id})
+        self.assertEqual(response.context['selected_shareholder'], self.alice)
+        self.assertContains(response, 'value="Alice (SH-TH-1)"')
+        self.assertContains(response, reverse('shareholders:search_suggest'))
+
+    def test_count_is_capped(self):
+        count = estimate_count(Transaction.objects.all(), limit=5)
+        self.assertFalse(count.exact)
+        self.assertEqual(str(estimate_count(Transaction.objects.all())), '7')
+
+
+class InstrumentationTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('clerk'))
+        instrumentation.stats.clear()
+
+    def test_server_timing_header_and_stats(self):
+        response = self.client.get(reverse('dashboard:transaction_history'))
+        self.assertRegex(response['Server-Timing'], r'sql;dur=[\d.]+;desc="\d+ queries"')
+        views = [row['view'] for row in instrumentation.stats.summary()]
+        self.assertEqual(views, ['dashboard:transaction_history'])
+
+    def test_exceeding_query_budget_fails(self):
+        with mock.patch.object(views.directors_page, 'query_budget', 1, create=True):
+            with self.assertRaises(instrumentation.QueryBudgetExceeded):
+                self.client.get(reverse('dashboard:directors'))
+
+
+class ListPageQueryTests(TestCase):
+    def setUp(self):
+        self.company = Company.get_company()
+        self.client.force_login(User.objects.create_user('clerk'))
+
+    def count_queries(self, url):
+        # Warm the per-user caches so only the page's own queries are compared
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(captured)
+
+    def add_shareholders(self, start, count):
+        Shareholder.objects.bulk_create([
+            Shareholder(company=self.company, full_name=f'Holder {i:03d}', id_number=f'SH-Q-{i}', total_shares=i)
+            for i in range(start, start + count)
+        ])
+
+    def add_directors(self, start, count):
+        Director.objects.bulk_create([
+            Director(company=self.company, full_name=f'Director {i:03d}', position='Director',
+                     appointed_date=date(2020, 1, 1))
+            for i in range(start, start + count)
+        ])
+
+    def test_shareholders_page_queries_do_not_grow_with_rows(self):
+        url = reverse('dashboard:shareholders')
+        self.add_shareholders(0, 2)
+        baseline = self.count_queries(url)
+        self.add_shareholders(2, 120)
+        self.assertEqual(self.count_queries(url), baseline)
+
+    def test_directors_page_queries_do_not_grow_with_rows(self):
+        url = reverse('dashboard:directors')
+        self.add_directors(0, 2)
+        baseline = self.count_queries(url)
+        self.add_directors(2, 200)
+        self.assertEqual(self.count_queries(url), baseline)
+
+    def test_register_pages_in_name_order_with_constant_queries(self):
+        url = reverse('dashboard:share_register')
+        for i, name in enumerate(['Ane', 'Ane', 'Ben', 'Cara', 'Dai']):
+            holder = Shareholder.objects.create(company=self.company, full_name=name, id_number=f'SH-R-{i}')
+            Transaction.objects.create(
+                shareholder=holder, transaction_type='ISSUE', shares=i + 1,
+                transaction_date=date(2025, 1, 1), status='COMPLETED',
+            )
+        with mock.patch.object(views, 'REGISTER_PER_PAGE', 2):
+            baseline = self.count_queries(url)
+            first = self.client.get(url)
+            second = self.client.get(url, {'after': first.context['register_rows'].next_cursor})
+            third = self.client.get(url, {'after': second.context['register_rows'].next_cursor})
+            back = self.client.get(url, {'before': third.context['register_rows'].previous_cursor})
+        pages = [[(row.full_name, row.shares) for row in page.context['register_rows']]
+                 for page in (first, second, third)]
+        self.assertEqual(pages, [[('Ane', 1), ('Ane', 2)], [('Ben', 3), ('Cara', 4)], [('Dai', 5)]])
+        self.assertEqual([row.full_name for row in back.context['register_rows']], ['Ben', 'Cara'])
+        self.assertEqual(first.context['holder_count'], 5)
+        self.assertAlmostEqual(first.context['register_rows'][0].ownership_percentage, 100 / 15)
+
+        # More holders do not mean more queries
+        for i in range(40):
+            holder = Shareholder.objects.create(company=self.company, full_name=f'Zed {i}', id_number=f'SH-Z-{i}')
+            Transaction.objects.create(
+                shareholder=holder, transaction_type='ISSUE', shares=1,
+                transaction_date=date(2025, 1, 1), status='COMPLETED',
+            )
+        self.count_queries(url)
+        self.assertEqual(self.count_queries(url), baseline)
+
+    def test_shareholder_pages_seek_past_ties_on_name_both_ways(self):
+        names = ['Ane', 'Ane', 'Ane', 'Ben', 'Ben', 'Cara', 'Ane']
+        for i, name in enumerate(names):
+            Shareholder.objects.create(company=self.company, full_name=name, id_number=f'SH-K-{i}')
+        expected = list(Shareholder.objects.order_by('full_name', 'id').values_list('id', flat=True))
+        url = reverse('dashboard:shareholders')
+
+        forward, params = [], {}
+        with mock.patch.object(views, 'SHAREHOLDERS_PER_PAGE', 2):
+            while True:
+                page = self.client.get(url, params).context['shareholders']
+                forward.append([row.id for row in page])
+                if not page.has_next():
+                    break
+                params = {'after': page.next_cursor}
+            backward = []
+            while page.has_previous():
+                page = self.client.get(url, {'before': page.previous_cursor}).context['shareholders']
+                backward.insert(0, [row.id for row in page])
+
+        self.assertEqual(sum(forward, []), expected)
+        self.assertEqual([len(ids) for ids in forward], [2, 2, 2, 1])
+        self.assertEqual(backward, forward[:-1])
+
+    def test_shareholders_page_totals_are_cached_until_the_register_changes(self):
+        cache.clear()
+        url = reverse('dashboard:shareholders')
+        self.add_shareholders(0, 3)
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(url)
+        self.assertFalse([q for q in captured if 'SUM(' in q['sql'].upper()])
+        self.assertEqual((response.context['shareholder_count'], response.context['total_shares']), (3, 3))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Shareholder.objects.create(company=self.company, full_name='Late', id_number='SH-Q-L', total_shares=7)
+        response = self.client.get(url)
+        self.assertEqual((response.context['shareholder_count'], response.context['total_shares']), (4, 10))
+
+    def test_rows_render_company_name(self):
+        self.add_shareholders(0, 1)
+        response = self.client.get(reverse('dashboard:shareholders'))
+        row = response.context['shareholders'][0]
+        self.assertIsInstance(row, ShareholderRow)
+        self.assertEqual(row.company_name, self.company.name)
+        self.assertFalse(hasattr(row, '__dict__'))
+
+
+class GroupCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('clerk')
+        self.admins = Group.objects.create(name='Admin')
+
+    def fresh_user(self):
+        return User.objects.get(pk=self.user.pk)
+
+    def test_group_names_are_read_once(self):
+        user = self.fresh_user()
+        with self.assertNumQueries(1):
+            self.assertFalse(has_group(user, 'Admin'))
+            self.assertFalse(views.is_admin(user))
+        another_request_user = self.fresh_user()
+        with self.assertNumQueries(0):
+            self.assertFalse(has_group(another_request_user, 'Admin'))
+
+    def test_membership_changes_invalidate_the_cache(self):
+        self.assertFalse(views.is_admin(self.fresh_user()))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.groups.add(self.admins)
+        self.assertTrue(views.is_admin(self.fresh_user()))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.admins.user_set.clear()
+        self.assertFalse(views.is_admin(self.fresh_user()))
+
+    def test_admin_pages_check_groups_without_extra_queries(self):
+        self.user.groups.add(self.admins)
+        self.client.force_login(self.user)
+        self.client.get(reverse('dashboard:user_list'))
+        with CaptureQueriesContext(connection) as captured:
+            self.client.get(reverse('dashboard:user_list'))
+        self.assertFalse(any('auth_user_groups' in query['sql'] for query in captured))
+
+
+class CertificateViewTests(TestCase):
+    def test_certificates_are_streamed_as_a_zip(self):
+        self.client.force_login(User.objects.create_user('clerk'))
+        Shareholder.objects.create(company=Company.get_company(), full_name='Kila Tau', id_number='SH-C-1', total_shares=5)
+        response = self.client.get(reverse('dashboard:certificates', args=['holders']))
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'PK'))
+
+
+class JobViewTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('clerk', password='pw')
+        self.client.force_login(self.user)
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+
+    def test_import_is_queued_and_polled(self):
+        upload = SimpleUploadedFile('holders.csv', b"full_name,total_shares\nKila Tau,10\n")
+        response = self.client.post(reverse('dashboard:shareholders_import'), {'file': upload})
+        job = Job.objects.get()
+        self.assertRedirects(response, reverse('dashboard:job_detail', args=[job.pk]))
+        self.assertFalse(Shareholder.objects.exists())
+
+        status = self.client.get(reverse('dashboard:job_status', args=[job.pk])).json()
+        self.assertEqual((status['status'], status['finished']), ('QUEUED', False))
+
+        jobs.work(once=True)
+        status = self.client.get(reverse('dashboard:job_status', args=[job.pk])).json()
+        self.assertEqual(status['status'], 'SUCCEEDED')
+        self.assertEqual(status['progress']['percent'], 100)
+        self.assertEqual(status['result']['created'], 1)
+
+    def test_xlsx_export_is_queued_and_downloadable(self):
+        response = self.client.get(reverse('dashboard:export', args=['shareholders']) + '?format=xlsx')
+        job = Job.objects.get()
+        self.assertRedirects(response, reverse('dashboard:job_detail', args=[job.pk]))
+        jobs.work(once=True)
+        status = self.client.get(reverse('dashboard:job_status', args=[job.pk])).json()
+        if status['status'] == 'FAILED':
+            self.skipTest(status['error'])  # openpyxl is optional
+        response = self.client.get(status['download_url'])
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('shareholders-', response['Content-Disposition'])
+
+    def test_other_users_jobs_are_hidden(self):
+        job = jobs.enqueue('export', created_by=User.objects.create_user('other'), dataset='shareholders')
+        self.assertEqual(self.client.get(reverse('dashboard:job_status', args=[job.pk])).status_code, 404)
+
+
+@override_settings(READ_REPLICA='replica', READ_REPLICA_STICKY_SECONDS=10)
+class ReplicaRoutingTests(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.user = User.objects.create_user('clerk')
+
+    def request(self, method='get', session=None):
+        request = getattr(self.factory, method)('/')
+        request.user = self.user
+        request.session = {} if session is None else session
+        return request
+
+    @staticmethod
+    @replicas.read_replica
+    def routed_view(request):
+        return HttpResponse(router.db_for_read(Shareholder))
+
+    def test_safe_requests_read_from_the_replica(self):
+        self.assertEqual(self.routed_view(self.request()).content, b'replica')
+        self.assertEqual(self.routed_view(self.request('post')).content, b'default')
+        # Outside the view reads are back on the primary
+        self.assertEqual(router.db_for_read(Shareholder), 'default')
+
+    def test_writes_go_to_the_primary(self):
+        shareholder = Shareholder(full_name='Kila Tau')
+        shareholder._state.db = 'replica'
+        self.assertEqual(router.db_for_write(Shareholder, instance=shareholder), 'default')
+        self.assertFalse(router.allow_migrate('replica', 'shareholders'))
+
+    def test_a_post_pins_the_session_to_the_primary(self):
+        session = {}
+        middleware = replicas.ReplicaStickinessMiddleware(lambda request: HttpResponse())
+        middleware(self.request(session=session))
+        self.assertEqual(self.routed_view(self.request(session=session)).content, b'replica')
+
+        middleware(self.request('post', session=session))
+        self.assertEqual(self.routed_view(self.request(session=session)).content, b'default')
+
+        with mock.patch('dashboard.replicas.time.time', return_value=session[replicas.SESSION_KEY] + 1):
+            self.assertEqual(self.routed_view(self.request(session=session)).content, b'replica')
+
+    def test_streamed_content_is_read_from_the_replica(self):
+        @replicas.read_replica
+        def streaming_view(request):
+            return StreamingHttpResponse(router.db_for_read(Shareholder) for _ in range(2))
+
+        response = streaming_view(self.request())
+        self.assertEqual(b''.join(response.streaming_content), b'replicareplica')
+
+    def test_shared_figures_are_computed_on_the_primary(self):
+        cache.clear()
+
+        @replicas.read_replica
+        def kpi_view(request):
+            with mock.patch.object(kpis, 'compute_kpis', lambda: router.db_for_read(Shareholder)):
+                return HttpResponse(kpis.get_kpis())
+
+        self.assertEqual(kpi_view(self.request()).content, b'default')
+        # A cached figure is still served without touching the database
+        self.assertEqual(kpi_view(self.request()).content, b'default')
+
+    @override_settings(READ_REPLICA=None)
+    def test_nothing_is_routed_without_a_replica(self):
+        self.assertEqual(self.routed_view(self.request()).content, b'default')
+        session = {}
+        replicas.ReplicaStickinessMiddleware(lambda request: HttpResponse())(self.request('post', session=session))
+        self.assertEqual(session, {})
@@ -0,0 +1,134 @@
+"""
+Monthly time series for the dashboard charts.
+
+Each month's new-holder count and issued/transferred share volume and value
+are computed with ``TruncMonth`` grouped queries and stored in
+``MonthlyActivity``. Reads only recompute months that are missing or were
+marked stale by a change to the register, so a chart is normally a single
+indexed read however long the ledger grows. Months are always recomputed
+on the primary database.
+"""
+from decimal import Decimal
+
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce, TruncMonth
+
+from shareholders.models import Shareholder, Transaction
+
+from . import replicas
+from .models import MonthlyActivity
+
+ISSUE_TYPES = ['ISSUE', 'RIGHTS', 'BONUS']
+# Each transfer has an IN and an OUT leg; count only one of them
+TRANSFER_TYPES = ['TRANSFER_IN']
+COUNTED_TYPES = ISSUE_TYPES + TRANSFER_TYPES
+
+SERIES = ['new_shareholders', 'issued_shares', 'issued_value', 'transferred_shares', 'transferred_value']
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def month_starts(months, today):
+    """The first day of each of the last ``months`` months, oldest first."""
+    year, month = today.year, today.month
+    starts = []
+    for _ in range(months):
+        starts.append(today.replace(year=year, month=month, day=1))
+        year, month = (year - 1, 12) if month == 1 else (year, month - 1)
+    return starts[::-1]
+
+
+def _next_month(start):
+    return start.replace(year=start.year + 1, month=1) if start.month == 12 else start.replace(month=start.month + 1)
+
+
+def compute_months(months):
+    """Return ``{month: {series: value}}`` for the given month starts, in two grouped queries."""
+    months = sorted(months)
+    if not months:
+        return {}
+    start, end = months[0], _next_month(months[-1])
+    zero = Decimal('0')
+    stats = {m: {'new_shareholders': 0, 'issued_shares': zero, 'issued_value': zero,
+                 'transferred_shares': zero, 'transferred_value': zero} for m in months}
+
+    joined = (
+        Shareholder.objects.filter(date_joined__gte=start, date_joined__lt=end)
+        .annotate(month=TruncMonth('date_joined'))
+        .order_by()
+        .values('month')
+        .annotate(count=Count('id'))
+    )
+    for row in joined:
+        if row['month'] in stats:
+            stats[row['month']]['new_shareholders'] = row['count']
+
+    issued = Q(transaction_type__in=ISSUE_TYPES)
+    transferred = Q(transaction_type__in=TRANSFER_TYPES)
+    volume = (
+        Transaction.objects.filter(
+            status='COMPLETED',
+            transaction_date__gte=start,
+            transaction_date__lt=end,
+            transaction_type__in=COUNTED_TYPES,
+        )
+        .annotate(month=TruncMonth('transaction_date'))
+        .order_by()
+        .values('month')
+        .annotate(
+            issued_shares=Coalesce(Sum('shares', filter=issued), zero),
+            issued_value=Coalesce(Sum('total_amount', filter=issued), zero),
+            transferred_shares=Coalesce(Sum('shares', filter=transferred), zero),
+            transferred_value=Coalesce(Sum('total_amount', filter=transferred), zero),
+        )
+    )
+    for row in volume:
+        if row['month'] in stats:
+            month = stats[row['month']]
+            for field in ('issued_shares', 'issued_value', 'transferred_shares', 'transferred_value'):
+                month[field] = row[field]
+    return stats
+
+
+def store(computed):
+    """Upsert the rollup rows for the output of ``compute_months`` in one query."""
+    MonthlyActivity.objects.bulk_create(
+        [MonthlyActivity(month=month, is_stale=False, **values) for month, values in computed.items()],
+        update_conflicts=True,
+        unique_fields=['month'],
+        update_fields=SERIES + ['is_stale', 'updated_at'],
+    )
+
+
+def mark_stale(days):
+    """Flag the months containing ``days`` for recomputation on the next read."""
+    months = {month_start(day) for day in days if day}
+    if months:
+        MonthlyActivity.objects.filter(month__in=months).update(is_stale=True)
+
+
+def monthly_series(months, today):
+    """
+    Return the chart series for the last ``months`` months as a dict of
+    lists: ``labels`` plus one list per entry in ``SERIES``.
+    """
+    starts = month_starts(months, today)
+    rows = {row.month: row for row in MonthlyActivity.objects.filter(month__gte=starts[0], month__lte=starts[-1])}
+
+    # Changes mark their month stale, the current one included, so a read
+    # only writes when something has changed since the month was stored
+    dirty = [m for m in starts if m not in rows or rows[m].is_stale]
+    if dirty:
+        # Stored rows are marked fresh, so they must come from the primary:
+        # a lagging replica could clear a newer mark_stale() with old figures
+        with replicas.primary():
+            computed = compute_months(dirty)
+        store(computed)
+        rows.update({month: MonthlyActivity(month=month, **values) for month, values in computed.items()})
+
+    series = {'labels': [m.strftime('%b %Y') for m in starts]}
+    for name in SERIES:
+        series[name] = [getattr(rows[m], name) for m in starts]
+    return series
@@ -6,17 +6,26 @@ app_name = "dashboard"
 urlpatterns = [
     # Dashboard
     path('', views.dashboard, name='dashboard'),
+    path('api/timeseries/', views.activity_timeseries, name='activity_timeseries'),
 
     # User management (Admin)
     path('users/', views.user_list, name='user_list'),
     path('users/add/', views.user_add, name='user_add'),
     path('users/edit/<int:user_id>/', views.user_edit, name='user_edit'),
+    path('stats/', views.request_stats, name='request_stats'),
 
     # Sidebar pages
     path('share-register/', views.share_register, name='share_register'),
     path('shareholders/', views.shareholders_page, name='shareholders'),
+    path('shareholders/import/', views.shareholders_import, name='shareholders_import'),
     path('directors/', views.directors_page, name='directors'),
     path('transactions/', views.transaction_history, name='transaction_history'),
+    path('export/<slug:dataset>/', views.export_data, name='export'),
+    path('certificates/<slug:scope>/', views.certificates_download, name='certificates'),
+    path('statements/', views.statements_export, name='statements'),
+    path('jobs/<int:job_id>/', views.job_detail, name='job_detail'),
+    path('jobs/<int:job_id>/status/', views.job_status, name='job_status'),
+    path('jobs/<int:job_id>/download/', views.job_download, name='job_download'),
     path('settings/', views.settings_page, name='settings'),
     path('help/', views.help_page, name='help'),
 ]
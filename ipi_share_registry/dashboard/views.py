@@ -1,23 +1,43 @@
-from datetime import timedelta
-from django.shortcuts import render, redirect
+import os
+
+from django.shortcuts import get_object_or_404, render, redirect
 from django.contrib.auth.decorators import login_required, user_passes_test
-from django.db.models import Sum
+from django.db.models import Count, ExpressionWrapper, F, FloatField, Q, Value
 from django.contrib.auth.models import User
 from django.contrib import messages
+from django.http import FileResponse, Http404, JsonResponse, StreamingHttpResponse
 from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.urls import reverse
+from django.utils.text import slugify
+
+from shareholders import certificates, exporter, jobs, register
+from shareholders.forms import TransactionFilterForm
+from shareholders.identifiers import generate_shareholder_id
+from shareholders.models import Company, Job, Shareholder, Director, Transaction, ShareTransfer
+from . import groups, instrumentation, kpis, timeseries
+from .instrumentation import query_budget
+from .pagination import KeysetPaginator, estimate_count
+from .replicas import read_replica
+from .rows import ShareholderRow, director_rows
 
-from shareholders.models import Shareholder, Director, Transaction
+SHAREHOLDERS_PER_PAGE = 50
+REGISTER_PER_PAGE = 50
+TRANSACTIONS_PER_PAGE = 50
+TIMESERIES_MONTHS = 12
+MAX_TIMESERIES_MONTHS = 60
 
 # -------------------------
 # PERMISSION HELPERS
 # -------------------------
 def is_admin(user):
     """Only superusers or users in 'Admin' group"""
-    return user.is_superuser or user.groups.filter(name='Admin').exists()
+    return user.is_superuser or groups.has_group(user, 'Admin')
 
 # -------------------------
 # USER MANAGEMENT (ADMIN)
 # -------------------------
+@query_budget(5)
 @login_required
 @user_passes_test(is_admin)
 def user_list(request):
@@ -63,19 +83,31 @@ def user_edit(request, user_id):
 
     return render(request, "dashboard/user_edit.html", {"user": user})
 
+# -------------------------
+# INSTRUMENTATION (ADMIN)
+# -------------------------
+@login_required
+@user_passes_test(is_admin)
+def request_stats(request):
+    """Rolling per-view latency and query stats for this process; POST resets them."""
+    if request.method == 'POST':
+        instrumentation.stats.clear()
+        return redirect('dashboard:request_stats')
+    return render(request, 'dashboard/request_stats.html', {
+        'rows': instrumentation.stats.summary(),
+        'window': instrumentation.stats.window,
+    })
+
 # -------------------------
 # DASHBOARD
 # -------------------------
+@query_budget(12)
+@read_replica
 @login_required
 def dashboard(request):
-    # Totals
-    total_shareholders = Shareholder.objects.count()
-    total_directors = Director.objects.count()
-    total_shares = Transaction.objects.aggregate(total=Sum('shares'))['total'] or 0
-
-    # New shareholders (last 30 days)
-    thirty_days_ago = timezone.now() - timedelta(days=30)
-    new_shareholders = Shareholder.objects.filter(created_at__gte=thirty_days_ago).count()
+    # Totals and share distribution come from the KPI cache; the growth
+    # chart loads its series from activity_timeseries
+    context = kpis.get_kpis().copy()
 
     # Recent transactions - only select the fields we need
     recent_transactions = Transaction.objects.select_related('shareholder').only(
@@ -88,46 +120,77 @@ def dashboard(request):
         {'title': 'Shareholder Briefing', 'date': timezone.now(), 'time': '2:00 PM'},
     ]
 
-    # Chart demo data
-    months = ["Jan","Feb","Mar","Apr","May","Jun","Jul","Aug","Sep","Oct","Nov","Dec"]
-    new_counts = [5,8,6,10,12,7,9,11,4,6,8,7]
-
-    # Share distribution demo (can replace with DB queries later)
-    share_distribution = {'common': 65, 'preferred': 25, 'other': 10}
-
-    context = {
-        'total_shareholders': total_shareholders,
-        'total_directors': total_directors,
-        'total_shares': total_shares,
-        'new_shareholders': new_shareholders,
+    context.update({
         'recent_transactions': recent_transactions,
         'upcoming_events': upcoming_events,
-        'months': months,
-        'new_counts': new_counts,
-        'share_distribution': share_distribution,
-    }
+    })
     return render(request, 'dashboard/dashboard.html', context)
 
+
+@query_budget(8)
+@read_replica
+@login_required
+def activity_timeseries(request):
+    """Monthly activity series for the dashboard charts, for the last ``?months=`` months."""
+    try:
+        months = int(request.GET.get('months', TIMESERIES_MONTHS))
+    except ValueError:
+        months = TIMESERIES_MONTHS
+    months = max(1, min(months, MAX_TIMESERIES_MONTHS))
+
+    series = timeseries.monthly_series(months, timezone.localdate())
+    # Decimal share counts and amounts are sent as JSON numbers
+    for name in timeseries.SERIES[1:]:
+        series[name] = [float(value) for value in series[name]]
+    return JsonResponse(series)
+
 # -------------------------
 # SIDEBAR PAGES
 # -------------------------
+@query_budget(10)
+@read_replica
 @login_required
 def share_register(request):
-    return render(request, 'dashboard/share_register.html')
+    """The register as it stood at the end of ``?as_of=YYYY-MM-DD`` (default: today)."""
+    today = timezone.now().date()
+    try:
+        as_of = parse_date(request.GET.get('as_of') or '') or today
+    except ValueError:
+        as_of = today
+    as_of = min(as_of, today)
+
+    # Totals come from the cache; the page itself is read holder by holder
+    holder_count, total_shares = register.register_totals(as_of)
+    rows = register.register_queryset(as_of).only(
+        'id', 'full_name', 'id_number', 'is_active', 'share_certificate_number'
+    ).annotate(
+        ownership_percentage=ExpressionWrapper(
+            F('shares') * 100.0 / Value(total_shares or 1),
+            output_field=FloatField(),
+        )
+    )
+    page = KeysetPaginator(rows, ('full_name', 'id'), per_page=REGISTER_PER_PAGE).page(
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
+
+    context = {
+        'as_of': as_of,
+        'fiscal_year_end': Company.get_company().fiscal_year_end,
+        'register_rows': page,
+        'holder_count': holder_count,
+        'total_shares': total_shares,
+        'pending_transfers': ShareTransfer.objects.filter(status__in=['PENDING', 'APPROVED']).count(),
+        'pending_transactions': Transaction.objects.filter(status='PENDING').count(),
+    }
+    return render(request, 'dashboard/share_register.html', context)
 
 from django.contrib import messages
 from django.shortcuts import render, redirect
 from django.utils import timezone
 
-def generate_shareholder_id():
-    """Generate a unique shareholder ID in the format SH-YYYYMMDD-XXXXXX"""
-    from datetime import datetime
-    import random
-    import string
-    date_str = datetime.now().strftime("%Y%m%d")
-    random_str = ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
-    return f"SH-{date_str}-{random_str}"
-
+@query_budget(6)
+@read_replica
 @login_required
 def shareholders_page(request):
     if request.method == 'POST':
@@ -141,10 +204,8 @@ def shareholders_page(request):
             last_name = request.POST.get('last_name', '').strip()
             full_name = f"{first_name} {last_name}".strip()
             
-            # Always generate a unique ID
+            # Always allocate a fresh ID
             id_number = generate_shareholder_id()
-            while Shareholder.objects.filter(id_number=id_number).exists():
-                id_number = generate_shareholder_id()
 
             # Get other fields with proper defaults
             email = request.POST.get('email', '').strip()
@@ -202,36 +263,233 @@ def shareholders_page(request):
             print(traceback.format_exc())
             messages.error(request, f'Error adding shareholder: {str(e)}')
     
-    # GET request - show the list of shareholders
-    shareholders = Shareholder.objects.all().order_by('full_name')
-    
-    # Calculate total shares and ownership percentages
-    total_shares = sum(shareholder.total_shares for shareholder in shareholders) or 1  # Avoid division by zero
-    
-    # Calculate average shares per investor
-    avg_shares = total_shares / len(shareholders) if shareholders else 0
-    
-    # Add ownership percentage to each shareholder
-    for shareholder in shareholders:
-        shareholder.ownership_percentage = (shareholder.total_shares / total_shares) * 100 if total_shares > 0 else 0
-    
+    # GET request - show one page of the register. The register-wide totals
+    # are cached, so a page load never aggregates the whole table
+    totals = kpis.get_holder_totals()
+    shareholder_count = totals['count']
+    total_shares = totals['shares']
+    avg_shares = total_shares / shareholder_count if shareholder_count else 0
+
+    # Ownership is computed in SQL against the register-wide total so each row
+    # arrives ready to render; keyset pagination keeps every page a range scan.
+    shareholders = ShareholderRow.project(Shareholder.objects.annotate(
+        ownership_percentage=ExpressionWrapper(
+            F('total_shares') * 100.0 / Value(total_shares or 1),
+            output_field=FloatField(),
+        )
+    ))
+    page = KeysetPaginator(
+        shareholders, ('full_name', 'id'), per_page=SHAREHOLDERS_PER_PAGE, row_factory=ShareholderRow
+    ).page(
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
+
     return render(request, 'dashboard/shareholders.html', {
-        'shareholders': shareholders,
+        'shareholders': page,
+        'shareholder_count': shareholder_count,
+        'active_shareholders': totals['active'],
         'total_shares': total_shares,
         'avg_shares': avg_shares,
-        'auto_generated_id': generate_shareholder_id()
     })
-    return render(request, 'dashboard/shareholders.html', {'shareholders': shareholders})
 
+@login_required
+def shareholders_import(request):
+    """Upload a CSV/XLSX file of shareholders; the import runs as a background job."""
+    if request.method == 'POST':
+        upload = request.FILES.get('file')
+        if not upload:
+            messages.error(request, "Choose a CSV or XLSX file to import.")
+            return redirect('dashboard:shareholders_import')
+        job = jobs.enqueue(
+            'import_shareholders',
+            created_by=request.user,
+            file=jobs.store_upload(upload),
+            dry_run=bool(request.POST.get('dry_run')),
+        )
+        return redirect('dashboard:job_detail', job_id=job.pk)
+
+    return render(request, 'dashboard/shareholders_import.html')
+
+
+@read_replica
+@login_required
+def export_data(request, dataset):
+    """
+    Stream a CSV export of the register, ledger or transfers. XLSX files can
+    only be sent once complete, so they are built by a background job.
+    """
+    as_of = None
+    if dataset == 'register':
+        try:
+            as_of = parse_date(request.GET.get('as_of') or '') or timezone.now().date()
+        except ValueError:
+            raise Http404("Invalid date")
+    try:
+        title, rows = exporter.dataset_rows(dataset, as_of=as_of)
+    except ValueError:
+        raise Http404("Unknown export")
+
+    if request.GET.get('format') == 'xlsx':
+        job = jobs.enqueue(
+            'export',
+            created_by=request.user,
+            dataset=dataset,
+            format='xlsx',
+            as_of=as_of.isoformat() if as_of else None,
+        )
+        return redirect('dashboard:job_detail', job_id=job.pk)
+
+    filename = f"{slugify(title)}-{timezone.now():%Y%m%d}"
+    response = StreamingHttpResponse(exporter.iter_csv(rows), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
+    return response
+
+CERTIFICATE_SETS = {
+    'holders': ('share-certificates', certificates.holder_certificates),
+    'issues': ('issue-certificates', certificates.transaction_certificates),
+}
+
+
+@read_replica
+@login_required
+def certificates_download(request, scope):
+    """
+    Stream a ZIP of PDF certificates: one per holder for their current
+    holding, or one per completed issue or transfer in (``?since=`` limits
+    these to transactions on or after a date).
+    """
+    if scope not in CERTIFICATE_SETS:
+        raise Http404("Unknown certificate set")
+    name, make_certificates = CERTIFICATE_SETS[scope]
+    queryset = None
+    if scope == 'issues':
+        try:
+            since = parse_date(request.GET.get('since') or '')
+        except ValueError:
+            raise Http404("Invalid date")
+        queryset = Transaction.objects.filter(transaction_date__gte=since) if since else None
+    return certificates.zip_response(make_certificates(queryset), f"{name}-{timezone.now():%Y%m%d}.zip")
+
+
+@login_required
+def statements_export(request):
+    """
+    Queue a ZIP of every holder's statement for a period (``?start=``/``?end=``,
+    default this year to date); a register's worth takes too long to stream.
+    """
+    today = timezone.localdate()
+    try:
+        start = parse_date(request.GET.get('start') or '') or today.replace(month=1, day=1)
+        end = parse_date(request.GET.get('end') or '') or today
+    except ValueError:
+        raise Http404("Invalid date")
+    if start > end:
+        raise Http404("The period starts after it ends")
+    job = jobs.enqueue('statements', created_by=request.user, start=start.isoformat(), end=end.isoformat())
+    return redirect('dashboard:job_detail', job_id=job.pk)
+
+# -------------------------
+# BACKGROUND JOBS
+# -------------------------
+def _user_job(request, job_id):
+    """A job the user queued, or any job for admins."""
+    job = get_object_or_404(Job, pk=job_id)
+    if job.created_by_id != request.user.pk and not is_admin(request.user):
+        raise Http404("No such job")
+    return job
+
+
+@login_required
+def job_detail(request, job_id):
+    """Progress page for a job; polls job_status until it finishes."""
+    return render(request, 'dashboard/job_detail.html', {'job': _user_job(request, job_id)})
+
+
+@query_budget(4)
+@login_required
+def job_status(request, job_id):
+    job = _user_job(request, job_id)
+    return JsonResponse({
+        'id': job.pk,
+        'kind': job.kind,
+        'status': job.status,
+        'finished': job.is_finished,
+        'attempts': job.attempts,
+        'max_attempts': job.max_attempts,
+        'progress': {
+            'current': job.progress_current,
+            'total': job.progress_total,
+            'percent': job.percent_complete,
+        },
+        'message': job.message,
+        'result': job.result,
+        'error': job.error.strip().splitlines()[-1] if job.error else '',
+        'download_url': reverse('dashboard:job_download', args=[job.pk]) if job.result_file else None,
+    })
+
+
+@login_required
+def job_download(request, job_id):
+    job = _user_job(request, job_id)
+    if not job.result_file:
+        raise Http404("This job has no file")
+    filename = (job.result or {}).get('filename') or os.path.basename(job.result_file.name)
+    return FileResponse(job.result_file.open('rb'), as_attachment=True, filename=filename)
+
+
+@query_budget(8)
+@read_replica
 @login_required
 def transaction_history(request):
-    transactions = Transaction.objects.select_related('shareholder').order_by('-created_at')
-    return render(request, 'dashboard/transaction_history.html', {'transactions': transactions})
+    """One cursor page of the ledger, newest first, narrowed by the GET filters."""
+    filters = TransactionFilterForm(request.GET or None)
+    transactions = filters.filter(
+        Transaction.objects.select_related('shareholder').only(
+            'id', 'created_at', 'transaction_type', 'status', 'shares', 'total_amount',
+            'reference_number', 'shareholder__full_name', 'shareholder__id_number',
+        )
+    )
+    page = KeysetPaginator(transactions, ('-created_at', 'id'), per_page=TRANSACTIONS_PER_PAGE).page(
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
+
+    # Keep the filters on the pagination links
+    query = request.GET.copy()
+    for key in ('after', 'before'):
+        query.pop(key, None)
 
+    return render(request, 'dashboard/transaction_history.html', {
+        'transactions': page,
+        'transaction_count': estimate_count(transactions),
+        'filters': filters,
+        'filter_query': query.urlencode(),
+        # Only the chosen holder; the filter box looks others up as the user types
+        'selected_shareholder': filters.selected_shareholder(),
+    })
+
+@query_budget(5)
+@read_replica
 @login_required
 def directors_page(request):
-    directors = Director.objects.all().order_by('full_name')
-    return render(request, 'dashboard/directors.html', {'directors': directors})
+    # One projected query for the cards, one aggregate for the stats
+    directors = director_rows()
+    today = timezone.localdate()
+    counts = Director.objects.aggregate(
+        active=Count('id', filter=Q(is_active=True)),
+        new_this_year=Count('id', filter=Q(appointed_date__year=today.year)),
+    )
+    tenures = [
+        ((d.resignation_date or today) - d.appointed_date).days / 365.25
+        for d in directors if d.appointed_date
+    ]
+    return render(request, 'dashboard/directors.html', {
+        'directors': directors,
+        'active_directors_count': counts['active'],
+        'new_directors_this_year': counts['new_this_year'],
+        'average_tenure': round(sum(tenures) / len(tenures), 1) if tenures else 0,
+    })
 
 @login_required
 def settings_page(request):
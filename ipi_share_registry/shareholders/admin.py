@@ -1,8 +1,28 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.http import StreamingHttpResponse
 from django.utils.html import format_html
 from django.urls import reverse
 from django.utils.safestring import mark_safe
-from .models import Company, Shareholder, Director, Transaction, ShareTransfer
+from django.utils import timezone
+from . import certificates, dividends, exporter, jobs, search, workflow
+from .forms import DividendRunForm
+from .models import (
+    Company, Shareholder, Director, Transaction, ShareTransfer, CapTableSnapshot, Job, DividendRun, CorporateAction,
+    AuditEntry,
+)
+
+
+def queue_workflow_job(model_admin, request, queryset, target):
+    """Complete the selected rows in a background job and link to its progress page."""
+    ranges = jobs.id_ranges(queryset.values_list('pk', flat=True).iterator())
+    job = jobs.enqueue('workflow', created_by=request.user, target=target, action='complete', id_ranges=ranges)
+    url = reverse('dashboard:job_detail', args=[job.pk])
+    selected = sum(last - first + 1 for first, last in ranges)
+    model_admin.message_user(
+        request,
+        format_html('Completion of {} {} queued as <a href="{}">job #{}</a>.', selected, target, url, job.pk),
+        messages.SUCCESS,
+    )
 
 
 @admin.register(Company)
@@ -42,8 +62,9 @@ class CompanyAdmin(admin.ModelAdmin):
 class ShareholderAdmin(admin.ModelAdmin):
     list_display = ("full_name", "id_number", "total_shares", "is_active", "created_at")
     list_filter = ("is_active", "created_at")
-    search_fields = ("full_name", "id_number", "email", "phone")
+    search_fields = search.SEARCH_FIELDS
     readonly_fields = ("created_at", "updated_at")
+    actions = ("download_certificates",)
     fieldsets = (
         ('Personal Information', {
             'fields': (
@@ -69,6 +90,19 @@ class ShareholderAdmin(admin.ModelAdmin):
         }),
     )
 
+    @admin.action(description="Download share certificates for selected shareholders")
+    def download_certificates(self, request, queryset):
+        return certificates.zip_response(
+            certificates.holder_certificates(queryset),
+            f"share-certificates-{timezone.now():%Y%m%d}.zip",
+        )
+
+    def get_search_results(self, request, queryset, search_term):
+        # Use the indexed search instead of icontains over every field
+        if not search_term.strip():
+            return queryset, False
+        return search.filter_shareholders(queryset, search_term), False
+
 
 @admin.register(Director)
 class DirectorAdmin(admin.ModelAdmin):
@@ -105,6 +139,7 @@ class TransactionAdmin(admin.ModelAdmin):
     list_filter = ("transaction_type", "status", "transaction_date")
     search_fields = ("shareholder__full_name", "reference_number", "certificate_number")
     readonly_fields = ("created_at", "updated_at", "created_by", "approved_by", "approval_date")
+    actions = ("approve_selected", "complete_selected", "download_certificates")
     fieldsets = (
         ('Transaction Details', {
             'fields': (
@@ -143,6 +178,24 @@ class TransactionAdmin(admin.ModelAdmin):
             obj.approval_date = timezone.now()
         super().save_model(request, obj, form, change)
 
+    @admin.action(description="Approve selected transactions")
+    def approve_selected(self, request, queryset):
+        approved = workflow.run_in_batches(
+            workflow.approve_transactions, queryset, approved_by=request.user
+        )
+        self.message_user(request, f"{approved} transaction(s) approved.", messages.SUCCESS)
+
+    @admin.action(description="Complete selected transactions and update balances")
+    def complete_selected(self, request, queryset):
+        queue_workflow_job(self, request, queryset, 'transactions')
+
+    @admin.action(description="Download certificates for selected completed issues and transfers in")
+    def download_certificates(self, request, queryset):
+        return certificates.zip_response(
+            certificates.transaction_certificates(queryset),
+            f"transaction-certificates-{timezone.now():%Y%m%d}.zip",
+        )
+
 
 @admin.register(ShareTransfer)
 class ShareTransferAdmin(admin.ModelAdmin):
@@ -150,6 +203,7 @@ class ShareTransferAdmin(admin.ModelAdmin):
     list_filter = ("status", "transfer_date")
     search_fields = ("from_shareholder__full_name", "to_shareholder__full_name", "reference_number")
     readonly_fields = ("created_at", "updated_at", "created_by", "approved_by", "completed_by")
+    actions = ("approve_selected", "complete_selected")
     fieldsets = (
         ('Transfer Details', {
             'fields': (
@@ -187,3 +241,119 @@ class ShareTransferAdmin(admin.ModelAdmin):
         return "-"
     to_shareholder_link.short_description = 'To Shareholder'
     to_shareholder_link.admin_order_field = 'to_shareholder__full_name'
+
+    @admin.action(description="Approve selected transfers")
+    def approve_selected(self, request, queryset):
+        approved = workflow.run_in_batches(
+            workflow.approve_transfers, queryset, approved_by=request.user
+        )
+        self.message_user(request, f"{approved} transfer(s) approved.", messages.SUCCESS)
+
+    @admin.action(description="Execute selected transfers")
+    def complete_selected(self, request, queryset):
+        queue_workflow_job(self, request, queryset, 'transfers')
+
+
+@admin.register(CapTableSnapshot)
+class CapTableSnapshotAdmin(admin.ModelAdmin):
+    list_display = ("as_of_date", "shareholder", "shares", "updated_at")
+    list_filter = ("as_of_date",)
+    search_fields = ("shareholder__full_name", "shareholder__id_number")
+    readonly_fields = ("shareholder", "as_of_date", "shares", "updated_at")
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ("id", "kind", "status", "attempts", "progress_current", "progress_total", "created_by", "created_at", "finished_at")
+    list_filter = ("status", "kind")
+    readonly_fields = [field.name for field in Job._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(DividendRun)
+class DividendRunAdmin(admin.ModelAdmin):
+    list_display = ("record_date", "description", "amount_per_share", "holder_count", "total_amount", "status", "payment_date")
+    list_filter = ("status",)
+    search_fields = ("description",)
+    declared_fields = ("description", "amount_per_share", "record_date", "payment_date")
+    calculated_fields = ("status", "holder_count", "total_shares", "total_amount", "rounding_residue",
+                         "declared_by", "created_at", "paid_at")
+    actions = ("download_payment_file", "recalculate_selected", "mark_paid")
+    form = DividendRunForm
+
+    def get_fields(self, request, obj=None):
+        return self.declared_fields if obj is None else self.declared_fields + self.calculated_fields
+
+    def get_readonly_fields(self, request, obj=None):
+        # Entitlements follow from the rate and record date, so those are fixed once declared
+        if obj is None:
+            return ()
+        return ("amount_per_share", "record_date") + self.calculated_fields
+
+    def save_model(self, request, obj, form, change):
+        if change:
+            super().save_model(request, obj, form, change)
+            return
+        run = dividends.declare(
+            obj.amount_per_share,
+            obj.record_date,
+            payment_date=obj.payment_date,
+            description=obj.description,
+            declared_by=request.user,
+        )
+        obj.pk = run.pk
+
+    @admin.action(description="Download the payment file")
+    def download_payment_file(self, request, queryset):
+        if queryset.count() != 1:
+            self.message_user(request, "Select a single dividend run.", messages.WARNING)
+            return None
+        run = queryset.get()
+        response = StreamingHttpResponse(exporter.iter_csv(dividends.payment_rows(run)), content_type='text/csv')
+        response['Content-Disposition'] = f'attachment; filename="{dividends.payment_filename(run)}"'
+        return response
+
+    @admin.action(description="Recalculate selected runs from the register")
+    def recalculate_selected(self, request, queryset):
+        unpaid = queryset.filter(status='CALCULATED', record_date__lt=timezone.localdate())
+        for run in unpaid:
+            dividends.calculate(run)
+        self.message_user(request, f"Recalculated {len(unpaid)} dividend runs.", messages.SUCCESS)
+
+    @admin.action(description="Mark selected runs as paid")
+    def mark_paid(self, request, queryset):
+        self.message_user(request, f"Marked {dividends.mark_paid(queryset)} dividend runs as paid.", messages.SUCCESS)
+
+
+@admin.register(CorporateAction)
+class CorporateActionAdmin(admin.ModelAdmin):
+    list_display = ("effective_date", "kind", "ratio_new", "ratio_held", "holder_count", "shares_allotted", "idempotency_key", "applied_at")
+    list_filter = ("kind",)
+    search_fields = ("idempotency_key", "description")
+    readonly_fields = [field.name for field in CorporateAction._meta.fields]
+
+    def has_add_permission(self, request):
+        # Applied with manage.py apply_corporate_action, which can preview first
+        return False
+
+
+@admin.register(AuditEntry)
+class AuditEntryAdmin(admin.ModelAdmin):
+    list_display = ("sequence", "created_at", "username", "action", "model", "object_id")
+    list_filter = ("action", "model")
+    search_fields = ("=object_id", "username")
+    readonly_fields = [field.name for field in AuditEntry._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class ShareholdersConfig(AppConfig):
     name = 'shareholders'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,262 @@
+"""
+Append-only, hash-chained audit log of register changes.
+
+Saves and deletes of shareholders, transactions and transfers are recorded
+as ``AuditEntry`` rows holding the field-level diff, ``{field: [old, new]}``
+(see ``shareholders.signals``); bulk operations that bypass save() record
+their changes through ``record_created`` and ``record_updates``. Old values
+come from ``TrackedFieldsMixin``, which keeps what was loaded, so recording
+a change costs no queries.
+
+Entries only reach the log once the change commits (``transaction.on_commit``).
+Inside ``context()`` — every request, through ``AuditMiddleware`` —
+committed entries are buffered and written with one ``bulk_create`` when
+the context ends, or sooner if ``BATCH_SIZE`` of them pile up. Background
+jobs commit batch by batch over minutes, so their context is unbuffered
+and each commit writes its own entries, as it does outside any context.
+Each entry stores the hash of the one before it and its own hash over
+both, so altering, removing or reordering any entry breaks the chain from
+there on; ``manage.py verify_audit_log`` walks it.
+"""
+import contextvars
+import hashlib
+import json
+from contextlib import contextmanager
+from datetime import date, datetime
+from functools import partial
+
+from django.db import IntegrityError, transaction
+from django.db.models.fields.files import FieldFile
+from django.utils import timezone
+
+from .models import AuditEntry
+
+GENESIS_HASH = '0' * 64
+BATCH_SIZE = 2000
+WRITE_ATTEMPTS = 5
+
+_context = contextvars.ContextVar('audit_context', default=None)
+
+
+class _Context:
+    __slots__ = ('user', 'buffered', '_actor', 'entries')
+
+    def __init__(self, user, buffered):
+        self.user = user
+        self.buffered = buffered
+        self._actor = None
+        self.entries = []
+
+    def actor(self):
+        """``(user id, username)``, resolved on first use so requests that change nothing never load the user."""
+        if self._actor is None:
+            user = self.user
+            if user is not None and user.is_authenticated:
+                self._actor = (user.pk, user.get_username())
+            else:
+                self._actor = (None, '')
+        return self._actor
+
+
+@contextmanager
+def context(user=None, buffered=True):
+    """
+    Attribute changes to ``user``. If ``buffered``, everything committed
+    meanwhile is written in one go at the end.
+    """
+    current = _Context(user, buffered)
+    token = _context.set(current)
+    try:
+        yield current
+    finally:
+        _context.reset(token)
+        if current.entries:
+            write(current.entries)
+
+
+# Fields covered by an entry's hash, in hashing order
+HASHED_FIELDS = ('sequence', 'previous_hash', 'created_at', 'user_id', 'username',
+                 'model', 'object_id', 'action', 'changes')
+
+
+def _digest(sequence, previous_hash, created_at, user_id, username, model, object_id, action, changes):
+    payload = '\x1f'.join([
+        str(sequence),
+        previous_hash,
+        created_at.isoformat(),
+        '' if user_id is None else str(user_id),
+        username,
+        model,
+        object_id,
+        action,
+        changes,
+    ])
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def entry_hash(entry):
+    return _digest(*(getattr(entry, field) for field in HASHED_FIELDS))
+
+
+def _plain(value):
+    if isinstance(value, FieldFile):
+        return value.name
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    return str(value)
+
+
+def _fields(instance):
+    exclude = getattr(instance, 'audit_exclude', ())
+    return [field for field in instance._meta.concrete_fields if field.name not in exclude]
+
+
+def _entry(instance, action, changes):
+    current = _context.get()
+    user_id, username = current.actor() if current else (None, '')
+    return AuditEntry(
+        created_at=timezone.now(),
+        user_id=user_id,
+        username=username,
+        model=instance._meta.label_lower,
+        object_id=str(instance.pk),
+        action=action,
+        changes=json.dumps(changes, sort_keys=True, separators=(',', ':')),
+    )
+
+
+def _capture(entries):
+    if entries:
+        transaction.on_commit(partial(_committed, entries))
+
+
+def _committed(entries):
+    current = _context.get()
+    if current is None or not current.buffered:
+        write(entries)
+        return
+    current.entries.extend(entries)
+    if len(current.entries) >= BATCH_SIZE:
+        write(current.entries)
+        current.entries = []
+
+
+def record_save(instance, created, update_fields=None):
+    """Record a saved instance's changes against the values it was loaded with."""
+    # save() moves the snapshot on once post_save has run
+    loaded = getattr(instance, '_loaded_values', {})
+    changes = {}
+    for field in _fields(instance):
+        if update_fields is not None and field.name not in update_fields:
+            continue
+        new = _plain(field.value_from_object(instance))
+        if created:
+            changes[field.attname] = [None, new]
+        elif field.attname not in loaded:
+            # Not loaded (deferred, or built by hand), so the old value is unknown
+            changes[field.attname] = [None, new]
+        elif _plain(loaded[field.attname]) != new:
+            changes[field.attname] = [_plain(loaded[field.attname]), new]
+    if changes:
+        _capture([_entry(instance, 'CREATE' if created else 'UPDATE', changes)])
+
+
+def record_delete(instance):
+    changes = {field.attname: [_plain(field.value_from_object(instance)), None] for field in _fields(instance)}
+    _capture([_entry(instance, 'DELETE', changes)])
+
+
+def record_created(instances):
+    """Record instances written with ``bulk_create`` (their pks must be set)."""
+    _capture([
+        _entry(instance, 'CREATE', {
+            field.attname: [None, _plain(field.value_from_object(instance))] for field in _fields(instance)
+        })
+        for instance in instances
+    ])
+
+
+def record_updates(model, changes):
+    """Record a queryset update() given ``{pk: {field: [old, new]}}``."""
+    instance = model()
+    entries = []
+    for pk, diff in changes.items():
+        instance.pk = pk
+        entries.append(_entry(instance, 'UPDATE', {
+            field: [_plain(old), _plain(new)] for field, (old, new) in diff.items()
+        }))
+    _capture(entries)
+
+
+def write(entries):
+    """
+    Append ``entries`` to the chain with one ``bulk_create``. A writer that
+    loses a race for the next sequence numbers hashes against the new head
+    and tries again.
+    """
+    for attempt in range(1, WRITE_ATTEMPTS + 1):
+        try:
+            with transaction.atomic():
+                for entry in entries:
+                    entry.pk = None
+                sequence, previous = (
+                    AuditEntry.objects.order_by('-sequence')
+                    .values_list('sequence', 'entry_hash')
+                    .first()
+                ) or (0, GENESIS_HASH)
+                for entry in entries:
+                    sequence += 1
+                    entry.sequence = sequence
+                    entry.previous_hash = previous
+                    entry.entry_hash = previous = entry_hash(entry)
+                AuditEntry.objects.bulk_create(entries, batch_size=BATCH_SIZE)
+            return
+        except IntegrityError:
+            if attempt == WRITE_ATTEMPTS:
+                raise
+
+
+def verify(chunk_size=5000):
+    """
+    Walk the whole chain in sequence order. Yields ``(checked, problem)``
+    every ``chunk_size`` entries with ``problem`` None, and stops at the
+    first broken link with a description of it.
+    """
+    rows = (
+        AuditEntry.objects.order_by('sequence')
+        .values_list(*HASHED_FIELDS, 'entry_hash')
+        .iterator(chunk_size=chunk_size)
+    )
+    expected_sequence = 1
+    previous = GENESIS_HASH
+    checked = 0
+    for row in rows:
+        sequence, previous_hash, stored_hash = row[0], row[1], row[-1]
+        if sequence != expected_sequence:
+            yield checked, f"entry {expected_sequence} is missing (found {sequence} next)"
+            return
+        if previous_hash != previous:
+            yield checked, f"entry {sequence} does not follow entry {sequence - 1}"
+            return
+        if _digest(*row[:-1]) != stored_hash:
+            yield checked, f"entry {sequence} was altered"
+            return
+        previous = stored_hash
+        expected_sequence += 1
+        checked += 1
+        if checked % chunk_size == 0:
+            yield checked, None
+    yield checked, None
+
+
+class AuditMiddleware:
+    """Attribute a request's changes to its user and write them once it is done."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with context(getattr(request, 'user', None)):
+            return self.get_response(request)
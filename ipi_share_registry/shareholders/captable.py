@@ -0,0 +1,230 @@
+"""
+Incrementally maintained cap table.
+
+``CapTableSnapshot`` stores one row per shareholder per date on which their
+balance changed. Reads pick the latest row on or before a date instead of
+summing the ledger. A change rewrites that holder's rows from its date on,
+which only ever contends with changes to the same holder.
+
+The register-wide total is kept as ``RegisterMovement`` rows, the net
+change per date, and read as their sum: a running total would have every
+change rewrite the same later rows, and every writer queue behind them.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, DecimalField, F, OuterRef, Subquery, Sum, Value, When
+
+from .models import CapTableSnapshot, RegisterMovement, Transaction
+
+
+def signed_shares_expression():
+    """SQL expression for a transaction's effect on the holder's balance."""
+    return Case(
+        When(transaction_type__in=Transaction.CREDIT_TYPES, then=F('shares')),
+        When(transaction_type__in=Transaction.DEBIT_TYPES, then=-F('shares')),
+        default=Value(Decimal('0')),
+        output_field=DecimalField(max_digits=20, decimal_places=2),
+    )
+
+
+def apply_delta(shareholder_id, as_of_date, delta):
+    """Add ``delta`` shares to a holding from ``as_of_date`` onwards."""
+    if not delta:
+        return
+    rows = CapTableSnapshot.objects.filter(shareholder_id=shareholder_id)
+    with transaction.atomic():
+        if not rows.filter(as_of_date=as_of_date).exists():
+            opening = (
+                rows.filter(as_of_date__lt=as_of_date)
+                .order_by('-as_of_date')
+                .values_list('shares', flat=True)
+                .first()
+            )
+            rows.get_or_create(
+                shareholder_id=shareholder_id,
+                as_of_date=as_of_date,
+                defaults={'shares': opening or 0},
+            )
+        rows.filter(as_of_date__gte=as_of_date).update(shares=F('shares') + delta)
+
+
+def add_to_register(as_of_date, delta):
+    """Add ``delta`` shares to the register's movement on ``as_of_date``."""
+    if not delta:
+        return
+    rows = RegisterMovement.objects.filter(as_of_date=as_of_date)
+    if not rows.update(shares=F('shares') + delta):
+        try:
+            with transaction.atomic():
+                RegisterMovement.objects.create(as_of_date=as_of_date, shares=delta)
+        except IntegrityError:
+            # Another writer created the date's row first
+            rows.update(shares=F('shares') + delta)
+
+
+def record_transaction(tx, reverse=False, holding=True):
+    """
+    Apply a transaction that just reached (or, with ``reverse``, left)
+    COMPLETED. ``holding=False`` leaves the holder's rows alone, for a
+    holder being deleted along with them.
+    """
+    delta = tx.signed_shares
+    if reverse:
+        delta = -delta
+    if not delta:
+        return
+    if holding:
+        apply_delta(tx.shareholder_id, tx.transaction_date, delta)
+    add_to_register(tx.transaction_date, delta)
+
+    # Register checkpoints on or after this date no longer match the ledger
+    from .register import invalidate_checkpoints
+    invalidate_checkpoints(tx.transaction_date)
+
+
+def record_completed(transactions):
+    """
+    Apply a set of transactions completed in bulk (bypassing save()).
+
+    Deltas are summed per holder and date in one grouped query, so each
+    holder's snapshot is touched once however many of their transactions
+    were completed.
+    """
+    grouped = (
+        transactions.order_by()
+        .values('shareholder_id', 'transaction_date')
+        .annotate(delta=Sum(signed_shares_expression()))
+    )
+    register_deltas = {}
+    for row in grouped:
+        if not row['delta']:
+            continue
+        apply_delta(row['shareholder_id'], row['transaction_date'], row['delta'])
+        day = row['transaction_date']
+        register_deltas[day] = register_deltas.get(day, Decimal('0')) + row['delta']
+
+    # Transfers net to zero on the register but still move holdings, so
+    # checkpoints are invalidated from the earliest changed date either way
+    for day, delta in register_deltas.items():
+        add_to_register(day, delta)
+    if register_deltas:
+        from .register import invalidate_checkpoints
+        invalidate_checkpoints(min(register_deltas))
+
+
+def record_completed_on(day, transactions):
+    """
+    Apply a set of transactions all dated ``day`` and completed in bulk, in
+    a fixed number of queries however many holders they touch. Used for
+    register-wide actions, where ``record_completed`` would update each
+    holder's snapshot separately.
+    """
+    transactions = transactions.order_by()
+    holder_ids = set(transactions.values_list('shareholder_id', flat=True))
+    if not holder_ids:
+        return
+    # Holders without a row for the day start one from their previous balance
+    existing = set(
+        CapTableSnapshot.objects.filter(as_of_date=day)
+        .values_list('shareholder_id', flat=True)
+    )
+    missing = holder_ids - existing
+    opening = holdings_as_of(day - timedelta(days=1), transactions.values('shareholder_id')) if missing else {}
+    CapTableSnapshot.objects.bulk_create(
+        [CapTableSnapshot(shareholder_id=sid, as_of_date=day, shares=opening.get(sid, 0)) for sid in missing],
+        batch_size=1000,
+    )
+    delta = (
+        transactions.filter(shareholder_id=OuterRef('shareholder_id'))
+        .values('shareholder_id')
+        .annotate(total=Sum(signed_shares_expression()))
+        .values('total')
+    )
+    CapTableSnapshot.objects.filter(
+        shareholder_id__in=transactions.values('shareholder_id'),
+        as_of_date__gte=day,
+    ).update(shares=F('shares') + Subquery(delta))
+
+    add_to_register(day, transactions.aggregate(total=Sum(signed_shares_expression()))['total'])
+    from .register import invalidate_checkpoints
+    invalidate_checkpoints(day)
+
+
+def holding(shareholder_id, as_of=None):
+    """Shares held by one shareholder at the end of ``as_of`` (default: latest)."""
+    rows = CapTableSnapshot.objects.filter(shareholder_id=shareholder_id)
+    if as_of is not None:
+        rows = rows.filter(as_of_date__lte=as_of)
+    return rows.order_by('-as_of_date').values_list('shares', flat=True).first() or Decimal('0')
+
+
+def register_total(as_of=None):
+    """Total shares on the register at the end of ``as_of`` (default: latest)."""
+    rows = RegisterMovement.objects.all()
+    if as_of is not None:
+        rows = rows.filter(as_of_date__lte=as_of)
+    return rows.aggregate(total=Sum('shares'))['total'] or Decimal('0')
+
+
+def holdings_as_of(as_of, shareholder_ids=None):
+    """
+    Return ``{shareholder_id: shares}`` for every holder (or just those in
+    ``shareholder_ids``) with a snapshot on or before ``as_of``.
+    """
+    latest = (
+        CapTableSnapshot.objects
+        .filter(shareholder_id=OuterRef('shareholder_id'), as_of_date__lte=as_of)
+        .order_by('-as_of_date')
+        .values('as_of_date')[:1]
+    )
+    rows = CapTableSnapshot.objects.filter(as_of_date=Subquery(latest))
+    if shareholder_ids is not None:
+        rows = rows.filter(shareholder_id__in=shareholder_ids)
+    return dict(rows.values_list('shareholder_id', 'shares'))
+
+
+def rebuild(batch_size=1000):
+    """Recompute every snapshot and register movement from the completed transaction ledger."""
+    daily = (
+        Transaction.objects.filter(status='COMPLETED')
+        .values('shareholder_id', 'transaction_date')
+        .annotate(delta=Sum(signed_shares_expression()))
+        .order_by('shareholder_id', 'transaction_date')
+    )
+
+    created = 0
+    with transaction.atomic():
+        CapTableSnapshot.objects.all().delete()
+        RegisterMovement.objects.all().delete()
+
+        batch = []
+        register_deltas = {}
+        current_holder = None
+        balance = Decimal('0')
+        for row in daily.iterator(chunk_size=batch_size):
+            if row['shareholder_id'] != current_holder:
+                current_holder = row['shareholder_id']
+                balance = Decimal('0')
+            balance += row['delta']
+            batch.append(CapTableSnapshot(
+                shareholder_id=current_holder,
+                as_of_date=row['transaction_date'],
+                shares=balance,
+            ))
+            day = row['transaction_date']
+            register_deltas[day] = register_deltas.get(day, Decimal('0')) + row['delta']
+            if len(batch) >= batch_size:
+                CapTableSnapshot.objects.bulk_create(batch)
+                created += len(batch)
+                batch = []
+
+        CapTableSnapshot.objects.bulk_create(batch, batch_size=batch_size)
+        created += len(batch)
+        RegisterMovement.objects.bulk_create(
+            [RegisterMovement(as_of_date=day, shares=delta) for day, delta in sorted(register_deltas.items())],
+            batch_size=batch_size,
+        )
+
+    return created
@@ -0,0 +1,258 @@
+"""
+PDF share certificates.
+
+A certificate is a one-page PDF built from the standard Helvetica fonts, so
+no font files or PDF library are needed. Everything that is the same on
+every certificate of a batch — the border, the company name, the headings,
+the font objects — is compiled into PDF bytes once per ``CertificateTemplate``;
+each certificate then only adds a short content stream with its own text and
+the cross-reference table. Large batches are rendered across a process pool
+and written to a ZIP archive that is streamed as it is built.
+"""
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import chain, islice
+
+import django
+from django.conf import settings
+from django.db.models import F
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from .models import Company, Shareholder, Transaction
+
+# Landscape A4, in points
+PAGE_WIDTH = 842
+PAGE_HEIGHT = 595
+CHUNK_SIZE = 200
+# Batches smaller than this are rendered in-process; a pool costs more than it saves
+POOL_THRESHOLD = 1000
+CERTIFIED_TYPES = ['ISSUE', 'PURCHASE', 'BONUS', 'RIGHTS', 'SPLIT', 'TRANSFER_IN']
+
+# Advance widths of Helvetica for ASCII 32-126, in thousandths of the font size
+_HELVETICA_WIDTHS = [
+    278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+    1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+    333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+    556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584,
+]
+
+
+def text_width(text, size):
+    """Width of ``text`` set in Helvetica at ``size`` points."""
+    units = sum(
+        _HELVETICA_WIDTHS[ord(c) - 32] if 32 <= ord(c) <= 126 else 556
+        for c in text
+    )
+    return units * size / 1000
+
+
+def _pdf_string(text):
+    encoded = str(text).encode('cp1252', errors='replace')
+    return b'(' + encoded.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)') + b')'
+
+
+def _text(x, y, text, size, font=b'F1'):
+    return b'BT /%s %d Tf %.2f %.2f Td %s Tj ET\n' % (font, size, x, y, _pdf_string(text))
+
+
+def _centred(y, text, size, font=b'F1'):
+    return _text((PAGE_WIDTH - text_width(text, size)) / 2, y, text, size, font)
+
+
+class Certificate:
+    """What one certificate says."""
+    __slots__ = ('number', 'holder_name', 'id_number', 'shares', 'issued_on', 'description')
+
+    def __init__(self, number, holder_name, id_number, shares, issued_on, description=''):
+        self.number = number or '-'
+        self.holder_name = holder_name
+        self.id_number = id_number
+        self.shares = shares
+        self.issued_on = issued_on
+        self.description = description
+
+    @property
+    def filename(self):
+        safe = ''.join(c if c.isalnum() or c in '-_' else '-' for c in f"{self.number}-{self.id_number}")
+        return f"certificate-{safe}.pdf"
+
+
+class CertificateTemplate:
+    """The fixed part of a batch of certificates, compiled to PDF bytes once."""
+
+    def __init__(self, company_name, registration_number=''):
+        static = b''.join([
+            b'0.15 0.25 0.45 RG 4 w 24 24 %d %d re S\n' % (PAGE_WIDTH - 48, PAGE_HEIGHT - 48),
+            b'1 w 34 34 %d %d re S\n' % (PAGE_WIDTH - 68, PAGE_HEIGHT - 68),
+            b'0.15 0.25 0.45 rg\n',
+            _centred(500, company_name, 24, b'F2'),
+            _centred(478, f"Company No. {registration_number}", 11) if registration_number else b'',
+            _centred(430, 'SHARE CERTIFICATE', 34, b'F2'),
+            b'0 0 0 rg\n',
+            _centred(330, 'This is to certify that', 13),
+            _centred(230, 'is the registered holder of', 13),
+            _centred(160, 'ordinary shares in the company, as entered in the share register.', 13),
+            b'0.5 w 110 90 m 330 90 l S 512 90 m 732 90 l S\n',
+            _text(110, 74, 'Director', 10),
+            _text(512, 74, 'Secretary', 10),
+        ])
+        objects = [
+            b'<< /Type /Catalog /Pages 2 0 R >>',
+            b'<< /Type /Pages /Kids [3 0 R] /Count 1 >>',
+            b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] '
+            b'/Resources << /Font << /F1 4 0 R /F2 5 0 R >> >> /Contents [6 0 R 7 0 R] >>' % (PAGE_WIDTH, PAGE_HEIGHT),
+            b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>',
+            b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>',
+            b'<< /Length %d >>\nstream\n%sendstream' % (len(static), static),
+        ]
+        prefix = b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n'
+        self.offsets = []
+        for number, body in enumerate(objects, start=1):
+            self.offsets.append(len(prefix))
+            prefix += b'%d 0 obj\n%s\nendobj\n' % (number, body)
+        self.prefix = prefix
+
+    def render(self, certificate):
+        """The PDF bytes of one certificate."""
+        issued_on = certificate.issued_on
+        content = b''.join([
+            _text(60, 530, f"Certificate No. {certificate.number}", 11, b'F2'),
+            _text(PAGE_WIDTH - 60 - text_width(f"Date: {issued_on:%d %B %Y}", 11), 530,
+                  f"Date: {issued_on:%d %B %Y}", 11),
+            _centred(290, certificate.holder_name, 26, b'F2'),
+            _centred(266, f"ID {certificate.id_number}", 12),
+            _centred(190, f"{certificate.shares:,}", 26, b'F2'),
+            _centred(130, certificate.description, 10) if certificate.description else b'',
+        ])
+        variable = b'7 0 obj\n<< /Length %d >>\nstream\n%sendstream\nendobj\n' % (len(content), content)
+        xref_offset = len(self.prefix) + len(variable)
+        xref = [b'xref\n0 8\n0000000000 65535 f \n']
+        xref += [b'%010d 00000 n \n' % offset for offset in self.offsets + [len(self.prefix)]]
+        trailer = b'trailer\n<< /Size 8 /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % xref_offset
+        return self.prefix + variable + b''.join(xref) + trailer
+
+
+def company_template():
+    company = Company.get_company()
+    return CertificateTemplate(company.name, company.registration_number)
+
+
+def holder_certificates(queryset=None):
+    """One certificate per holder with shares, for their current holding."""
+    queryset = Shareholder.objects.all() if queryset is None else queryset
+    today = timezone.localdate()
+    rows = (
+        queryset.filter(total_shares__gt=0)
+        .order_by('full_name', 'id')
+        .values_list('share_certificate_number', 'full_name', 'id_number', 'total_shares')
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+    for number, name, id_number, shares in rows:
+        yield Certificate(number, name, id_number, shares, today)
+
+
+def transaction_certificates(queryset=None):
+    """One certificate per completed issue or incoming transfer."""
+    queryset = Transaction.objects.all() if queryset is None else queryset
+    rows = (
+        queryset.filter(status='COMPLETED', transaction_type__in=CERTIFIED_TYPES)
+        .order_by('transaction_date', 'id')
+        .annotate(holder_name=F('shareholder__full_name'), holder_id_number=F('shareholder__id_number'))
+        .values_list('certificate_number', 'holder_name', 'holder_id_number', 'shares',
+                     'transaction_date', 'transaction_type', 'reference_number')
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+    labels = dict(Transaction.TRANSACTION_TYPE_CHOICES)
+    for number, name, id_number, shares, day, transaction_type, reference in rows:
+        description = labels.get(transaction_type, transaction_type)
+        if reference:
+            description = f"{description}, reference {reference}"
+        yield Certificate(number, name, id_number, int(shares), day, description)
+
+
+def _render_chunk(template, certificates):
+    return [(certificate.filename, template.render(certificate)) for certificate in certificates]
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def default_workers():
+    return getattr(settings, 'CERTIFICATE_WORKERS', 1)
+
+
+def render_all(certificates, template=None, workers=1):
+    """
+    Yield ``(filename, pdf bytes)`` for each certificate, in order. With
+    ``workers`` > 1, batches of more than ``POOL_THRESHOLD`` are rendered
+    ``CHUNK_SIZE`` at a time in a process pool.
+    """
+    template = template or company_template()
+    chunks = _chunks(certificates, CHUNK_SIZE)
+    if workers > 1:
+        head = list(islice(chunks, POOL_THRESHOLD // CHUNK_SIZE + 1))
+        chunks = chain(head, chunks)
+        if len(head) > POOL_THRESHOLD // CHUNK_SIZE:
+            # Rows are read from the database here, in the parent; workers only render
+            with ProcessPoolExecutor(max_workers=workers, initializer=django.setup) as pool:
+                for rendered in pool.map(partial(_render_chunk, template), chunks):
+                    yield from rendered
+            return
+    for chunk in chunks:
+        yield from _render_chunk(template, chunk)
+
+
+class _ZipStream:
+    """Write-only, unseekable file that hands what zipfile wrote to a generator."""
+
+    def __init__(self):
+        self.buffer = []
+        self.position = 0
+
+    def write(self, data):
+        self.buffer.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.buffer)
+        self.buffer = []
+        return data
+
+
+def iter_zip(files):
+    """Encode ``(filename, bytes)`` pairs as a ZIP archive, yielding it piece by piece."""
+    stream = _ZipStream()
+    seen = set()
+    # PDFs are already compact; deflating them costs more time than it saves bytes
+    with zipfile.ZipFile(stream, mode='w', compression=zipfile.ZIP_STORED) as archive:
+        for filename, data in files:
+            if filename in seen:
+                stem, extension = os.path.splitext(filename)
+                filename = f"{stem}-{len(seen)}{extension}"
+            seen.add(filename)
+            archive.writestr(filename, data)
+            yield stream.drain()
+    yield stream.drain()
+
+
+def zip_response(certificates, filename, workers=None):
+    """Stream the certificates back as a ZIP of PDFs, rendering as it goes."""
+    files = render_all(certificates, workers=workers or default_workers())
+    response = StreamingHttpResponse(iter_zip(files), content_type='application/zip')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
@@ -0,0 +1,131 @@
+"""
+Dividend runs.
+
+Declaring a dividend fixes an amount per share and a record date; every
+holder on the register at the end of the record date is entitled to their
+shares times the amount. The record date must therefore have passed:
+until then the register it describes can still change. Holdings come
+from ``register.holdings_as_of`` (the nearest checkpoint plus one grouped
+query over the ledger since), and the lines are written with
+``bulk_create``.
+
+Amounts are computed in ``Decimal`` and rounded down to the cent, so the
+same register always gives the same payments and the run never pays out
+more than was declared. What rounding leaves undistributed is kept on the
+run as ``rounding_residue``.
+"""
+from decimal import ROUND_DOWN, Decimal, localcontext
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from .models import DividendLine, DividendRun
+from .register import holdings_as_of
+
+CENT = Decimal('0.01')
+RESIDUE_PLACES = Decimal('0.000001')
+BATCH_SIZE = 5000
+
+PAYMENT_FILE_COLUMNS = [
+    ('ID Number', 'shareholder__id_number'),
+    ('Full Name', 'shareholder__full_name'),
+    ('Shares', 'shares'),
+    ('Amount', 'amount'),
+    ('Email', 'shareholder__email'),
+    ('Phone', 'shareholder__phone_number'),
+    ('Address', 'shareholder__address'),
+    ('City', 'shareholder__city'),
+    ('Country', 'shareholder__country'),
+    ('Postal Code', 'shareholder__postal_code'),
+]
+
+
+def entitlements(holdings, amount_per_share):
+    """
+    Yield ``(shareholder_id, shares, amount)`` for every positive holding in
+    ``{shareholder_id: shares}``, in shareholder order.
+    """
+    # Shares carry 2 places and the rate 6, so 40 digits are always exact
+    with localcontext() as context:
+        context.prec = 40
+        for shareholder_id in sorted(holdings):
+            shares = holdings[shareholder_id]
+            if shares > 0:
+                yield shareholder_id, shares, (shares * amount_per_share).quantize(CENT, rounding=ROUND_DOWN)
+
+
+def check_record_date(record_date):
+    if record_date >= timezone.localdate():
+        raise ValidationError("The record date must have passed before entitlements can be calculated")
+
+
+def check_terms(amount_per_share, record_date, payment_date=None):
+    """Raise ``ValidationError`` unless a dividend can be declared on these terms."""
+    if amount_per_share <= 0:
+        raise ValidationError("The dividend per share must be positive")
+    check_record_date(record_date)
+    if payment_date and payment_date < record_date:
+        raise ValidationError("The payment date cannot be before the record date")
+
+
+@transaction.atomic
+def calculate(run):
+    """(Re)compute the lines and totals of an unpaid run from the register at its record date."""
+    if run.status == 'PAID':
+        raise ValidationError("A paid dividend run cannot be recalculated")
+    check_record_date(run.record_date)
+    run.lines.all().delete()
+
+    holdings = holdings_as_of(run.record_date)
+    lines = []
+    total_shares = Decimal('0')
+    total_amount = Decimal('0')
+    for shareholder_id, shares, amount in entitlements(holdings, run.amount_per_share):
+        lines.append(DividendLine(run_id=run.pk, shareholder_id=shareholder_id, shares=shares, amount=amount))
+        total_shares += shares
+        total_amount += amount
+    DividendLine.objects.bulk_create(lines, batch_size=BATCH_SIZE)
+
+    run.holder_count = len(lines)
+    run.total_shares = total_shares
+    run.total_amount = total_amount
+    run.rounding_residue = (total_shares * run.amount_per_share - total_amount).quantize(RESIDUE_PLACES)
+    run.save(update_fields=['holder_count', 'total_shares', 'total_amount', 'rounding_residue'])
+    return run
+
+
+def declare(amount_per_share, record_date, payment_date=None, description='', declared_by=None):
+    """Declare a dividend and compute every holder's entitlement."""
+    amount_per_share = Decimal(amount_per_share)
+    check_terms(amount_per_share, record_date, payment_date)
+    with transaction.atomic():
+        run = DividendRun.objects.create(
+            amount_per_share=amount_per_share,
+            record_date=record_date,
+            payment_date=payment_date,
+            description=description,
+            declared_by=declared_by,
+        )
+        return calculate(run)
+
+
+def mark_paid(queryset):
+    """Mark calculated runs as paid; returns how many were."""
+    return queryset.filter(status='CALCULATED').update(status='PAID', paid_at=timezone.now())
+
+
+def payment_rows(run):
+    """The payment file for ``run``: a header, then one row per holder with an amount due."""
+    yield [heading for heading, _ in PAYMENT_FILE_COLUMNS]
+    lookups = [lookup for _, lookup in PAYMENT_FILE_COLUMNS]
+    yield from (
+        run.lines.filter(amount__gt=0)
+        .order_by('shareholder__full_name', 'shareholder_id')
+        .values_list(*lookups)
+        .iterator(chunk_size=BATCH_SIZE)
+    )
+
+
+def payment_filename(run):
+    return f"dividend-{run.pk}-{run.record_date:%Y%m%d}.csv"
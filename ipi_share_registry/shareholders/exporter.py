@@ -0,0 +1,195 @@
+"""
+Streaming exports of the register and ledger.
+
+Rows are fetched with ``values_list`` projections through server-side
+cursors (``.iterator(chunk_size=...)``) and encoded one at a time, so an
+export of any size uses constant memory and starts sending immediately.
+
+Names, addresses and notes are typed in by users, so text that a
+spreadsheet would take for a formula is written as plain text: prefixed
+with ``'`` in CSV, and stored as a string cell in XLSX.
+"""
+import csv
+import tempfile
+from datetime import datetime
+
+from django.utils import timezone
+
+from .models import Shareholder, ShareTransfer, Transaction
+
+CHUNK_SIZE = 2000
+# Leading characters that make spreadsheet applications evaluate a CSV cell
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+# Each export is a list of (column heading, values_list lookup)
+SHAREHOLDER_COLUMNS = [
+    ('ID Number', 'id_number'),
+    ('Full Name', 'full_name'),
+    ('Total Shares', 'total_shares'),
+    ('Active', 'is_active'),
+    ('Email', 'email'),
+    ('Phone', 'phone_number'),
+    ('Address', 'address'),
+    ('City', 'city'),
+    ('Country', 'country'),
+    ('Postal Code', 'postal_code'),
+    ('Nationality', 'nationality'),
+    ('Date of Birth', 'date_of_birth'),
+    ('Certificate Number', 'share_certificate_number'),
+    ('Date Joined', 'date_joined'),
+]
+
+TRANSACTION_COLUMNS = [
+    ('Transaction ID', 'id'),
+    ('Transaction Date', 'transaction_date'),
+    ('Shareholder ID Number', 'shareholder__id_number'),
+    ('Shareholder', 'shareholder__full_name'),
+    ('Type', 'transaction_type'),
+    ('Status', 'status'),
+    ('Shares', 'shares'),
+    ('Price per Share', 'price_per_share'),
+    ('Total Amount', 'total_amount'),
+    ('Reference Number', 'reference_number'),
+    ('Certificate Number', 'certificate_number'),
+    ('Approval Date', 'approval_date'),
+    ('Completion Date', 'completion_date'),
+]
+
+TRANSFER_COLUMNS = [
+    ('Transfer ID', 'id'),
+    ('Transfer Date', 'transfer_date'),
+    ('From ID Number', 'from_shareholder__id_number'),
+    ('From Shareholder', 'from_shareholder__full_name'),
+    ('To ID Number', 'to_shareholder__id_number'),
+    ('To Shareholder', 'to_shareholder__full_name'),
+    ('Shares', 'shares'),
+    ('Price per Share', 'price_per_share'),
+    ('Total Amount', 'total_amount'),
+    ('Status', 'status'),
+    ('Reference Number', 'reference_number'),
+    ('Certificate Number', 'certificate_number'),
+    ('Approved At', 'approved_at'),
+    ('Completed At', 'completed_at'),
+]
+
+REGISTER_HEADER = ['ID Number', 'Full Name', 'Shares', 'Ownership %']
+
+
+def shareholder_rows(queryset=None):
+    queryset = Shareholder.objects.all() if queryset is None else queryset
+    return _project(queryset.order_by('full_name', 'id'), SHAREHOLDER_COLUMNS)
+
+
+def transaction_rows(queryset=None):
+    queryset = Transaction.objects.all() if queryset is None else queryset
+    return _project(queryset.order_by('-transaction_date', '-id'), TRANSACTION_COLUMNS)
+
+
+def transfer_rows(queryset=None):
+    queryset = ShareTransfer.objects.all() if queryset is None else queryset
+    return _project(queryset.order_by('-transfer_date', '-id'), TRANSFER_COLUMNS)
+
+
+def register_rows(as_of):
+    """
+    Rows of the register as it stood at the end of ``as_of``. Each holder's
+    balance is looked up as their row is read, so the register is never
+    held in memory; the total comes from the cached register totals.
+    """
+    from .register import register_queryset, register_totals
+
+    _, total = register_totals(as_of)
+
+    yield REGISTER_HEADER
+    holders = (
+        register_queryset(as_of).order_by('full_name', 'id')
+        .values_list('id_number', 'full_name', 'shares')
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+    for id_number, full_name, shares in holders:
+        # Holdings that net to zero overall leave no share to divide by
+        percentage = round(shares / total * 100, 4) if total else None
+        yield [id_number, full_name, shares, percentage]
+
+
+DATASETS = {
+    'shareholders': ('Shareholders', shareholder_rows),
+    'transactions': ('Transactions', transaction_rows),
+    'transfers': ('Share Transfers', transfer_rows),
+}
+
+
+def dataset_rows(dataset, as_of=None):
+    """
+    Return ``(title, rows)`` for a named export: one of ``DATASETS`` or
+    ``'register'`` (the register at the end of ``as_of``, default today).
+    """
+    if dataset == 'register':
+        as_of = as_of or timezone.now().date()
+        return f"Share Register {as_of:%Y-%m-%d}", register_rows(as_of)
+    if dataset not in DATASETS:
+        raise ValueError(f"Unknown export '{dataset}'")
+    title, make_rows = DATASETS[dataset]
+    return title, make_rows()
+
+
+def _project(queryset, columns):
+    yield [heading for heading, _ in columns]
+    lookups = [lookup for _, lookup in columns]
+    yield from queryset.values_list(*lookups).iterator(chunk_size=CHUNK_SIZE)
+
+
+def _csv_value(value):
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def _excel_value(sheet, value):
+    # Excel has no notion of time zones
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        return timezone.make_naive(value)
+    if isinstance(value, str) and value.startswith('='):
+        # openpyxl would otherwise store it as a formula
+        from openpyxl.cell import WriteOnlyCell
+        cell = WriteOnlyCell(sheet, value=value)
+        cell.data_type = 's'
+        return cell
+    return value
+
+
+class _Echo:
+    """File-like object whose write() hands back the encoded line instead of buffering it."""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(rows):
+    """Encode rows as CSV lines, one at a time."""
+    writer = csv.writer(_Echo())
+    for row in rows:
+        yield writer.writerow([_csv_value(value) for value in row])
+
+
+def write_xlsx(rows, title='Export'):
+    """
+    Write rows to a temporary XLSX file and return it, rewound.
+
+    openpyxl's write-only mode keeps memory flat, but an XLSX file is a zip
+    archive that can only be sent once it is complete.
+    """
+    try:
+        from openpyxl import Workbook
+    except ImportError:
+        raise ValueError("XLSX export requires the openpyxl package")
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=title[:31])
+    for row in rows:
+        sheet.append([_excel_value(sheet, value) for value in row])
+
+    output = tempfile.TemporaryFile()
+    workbook.save(output)
+    output.seek(0)
+    return output
@@ -1,6 +1,7 @@
 # shareholders/forms.py
 from django import forms
-from .models import Shareholder
+from . import dividends
+from .models import DividendRun, Shareholder, Transaction
 import logging
 
 logger = logging.getLogger(__name__)
@@ -80,4 +81,57 @@ class ShareholderForm(forms.ModelForm):
             return shareholder
         except Exception as e:
             logger.error(f"Error saving shareholder: {str(e)}", exc_info=True)
-            raise
\ No newline at end of file
+            raise
+
+class DividendRunForm(forms.ModelForm):
+    """Admin form for a dividend run; checks the terms before the run is declared."""
+    class Meta:
+        model = DividendRun
+        fields = ['description', 'amount_per_share', 'record_date', 'payment_date']
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if self.instance.pk is None and not self.errors:
+            dividends.check_terms(
+                cleaned_data['amount_per_share'], cleaned_data['record_date'], cleaned_data.get('payment_date')
+            )
+        return cleaned_data
+
+class TransactionFilterForm(forms.Form):
+    """GET filters for the transaction history; blank fields are ignored."""
+    transaction_type = forms.ChoiceField(
+        choices=[('', 'All Types')] + Transaction.TRANSACTION_TYPE_CHOICES,
+        required=False,
+    )
+    status = forms.ChoiceField(
+        choices=[('', 'All Statuses')] + Transaction.STATUS_CHOICES,
+        required=False,
+    )
+    start_date = forms.DateField(required=False)
+    end_date = forms.DateField(required=False)
+    shareholder = forms.IntegerField(required=False, min_value=1)
+
+    def selected_shareholder(self):
+        """The shareholder being filtered on, if any, for redisplay in the filter box."""
+        if not self.is_valid() or not self.cleaned_data['shareholder']:
+            return None
+        return Shareholder.objects.filter(pk=self.cleaned_data['shareholder']).only(
+            'id', 'full_name', 'id_number'
+        ).first()
+
+    def filter(self, queryset):
+        """Apply the valid filters to a Transaction queryset."""
+        if not self.is_valid():
+            return queryset
+        data = self.cleaned_data
+        if data['transaction_type']:
+            queryset = queryset.filter(transaction_type=data['transaction_type'])
+        if data['status']:
+            queryset = queryset.filter(status=data['status'])
+        if data['start_date']:
+            queryset = queryset.filter(transaction_date__gte=data['start_date'])
+        if data['end_date']:
+            queryset = queryset.filter(transaction_date__lte=data['end_date'])
+        if data['shareholder']:
+            queryset = queryset.filter(shareholder_id=data['shareholder'])
+        return queryset
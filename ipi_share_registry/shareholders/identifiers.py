@@ -0,0 +1,91 @@
+"""
+Shareholder ID allocation.
+
+IDs have the form ``SH-YYYYMMDD-NNNNNN``: the allocation date and a
+per-day serial. Serials come from ``ShareholderIdCounter``, one row per
+day, advanced with a single ``UPDATE ... SET last_value = last_value + n``.
+The update holds the row lock until the surrounding transaction ends, so
+concurrent workers always receive disjoint blocks and no allocation ever
+needs an existence check or a retry. Reserve IDs before opening a long
+transaction rather than inside it: every other allocation for the day
+waits on that lock. Serials reserved for rows that are then never saved
+are simply never issued.
+"""
+import re
+from dataclasses import dataclass
+from datetime import date
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Shareholder, ShareholderIdCounter
+
+PREFIX = 'SH'
+SERIAL_DIGITS = 6
+
+
+def format_shareholder_id(day, serial):
+    return f"{PREFIX}-{day:%Y%m%d}-{serial:0{SERIAL_DIGITS}d}"
+
+
+@dataclass(frozen=True)
+class IdBlock:
+    """A contiguous run of serials reserved for one day."""
+    day: date
+    first: int
+    count: int
+
+    def __iter__(self):
+        for serial in range(self.first, self.first + self.count):
+            yield format_shareholder_id(self.day, serial)
+
+    def __len__(self):
+        return self.count
+
+
+def _highest_existing_serial(day):
+    # IDs issued before the counter existed used random suffixes, some of
+    # which are all digits; start the day's counter above any of those
+    pattern = re.compile(rf"^{PREFIX}-{day:%Y%m%d}-(\d+)$")
+    ids = Shareholder.objects.filter(
+        id_number__startswith=f"{PREFIX}-{day:%Y%m%d}-"
+    ).values_list('id_number', flat=True)
+    serials = [int(match.group(1)) for match in map(pattern.match, ids) if match]
+    return max(serials, default=0)
+
+
+def reserve_block(count, day=None):
+    """
+    Reserve ``count`` consecutive serials for ``day`` (default: today) and
+    return them as an ``IdBlock``. Costs two queries once the day's counter
+    exists.
+    """
+    if count < 1:
+        raise ValueError("count must be at least 1")
+    day = day or timezone.localdate()
+    counters = ShareholderIdCounter.objects.filter(day=day)
+    with transaction.atomic(savepoint=False):
+        if not counters.update(last_value=F('last_value') + count):
+            try:
+                with transaction.atomic():
+                    ShareholderIdCounter.objects.create(
+                        day=day, last_value=_highest_existing_serial(day) + count
+                    )
+            except IntegrityError:
+                # Another worker created the day's counter first
+                counters.update(last_value=F('last_value') + count)
+        last = counters.values_list('last_value', flat=True).get()
+    return IdBlock(day=day, first=last - count + 1, count=count)
+
+
+def allocate_shareholder_ids(count):
+    """Return ``count`` new shareholder IDs, in allocation order."""
+    if count < 1:
+        return []
+    return list(reserve_block(count))
+
+
+def generate_shareholder_id():
+    """Allocate a single new shareholder ID."""
+    return allocate_shareholder_ids(1)[0]
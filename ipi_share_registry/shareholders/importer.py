@@ -0,0 +1,300 @@
+"""
+Bulk shareholder import from CSV or XLSX files.
+
+Rows are read one at a time, checked against the same field rules as
+``ShareholderForm`` and written with ``bulk_create`` in batches, so memory
+stays flat however large the file is. Each batch commits on its own, so
+an import never keeps rows it has written locked while it reads on.
+
+An imported share balance is posted to the ledger as a completed ISSUE
+dated the import day, so the holder is on the register like any other.
+"""
+import csv
+import io
+import logging
+import os
+import zipfile
+
+from django import forms
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from . import audit, captable
+from .exporter import FORMULA_PREFIXES
+from .forms import ShareholderForm
+from .identifiers import allocate_shareholder_ids
+from .models import Company, Shareholder, Transaction
+from .signals import register_changed
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+
+# Alternative column headings accepted in import files
+COLUMN_ALIASES = {
+    'name': 'full_name',
+    'phone': 'phone_number',
+    'id': 'id_number',
+    'passport': 'id_number',
+    'dob': 'date_of_birth',
+    'certificate_number': 'share_certificate_number',
+    'shares': 'total_shares',
+}
+
+
+class ShareholderImportForm(ShareholderForm):
+    """ShareholderForm rules for one import row; IDs may be left blank to be allocated."""
+    total_shares = forms.IntegerField(min_value=0, required=False)
+
+    class Meta(ShareholderForm.Meta):
+        fields = [f for f in ShareholderForm.Meta.fields if f != 'photo']
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['id_number'].required = False
+
+
+class ImportResult:
+    def __init__(self):
+        self.created = 0
+        self.rows = 0
+        self.resumed_after = 0
+        self.error_count = 0
+        self.errors = []
+
+    def add_error(self, row_number, messages):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((row_number, messages))
+
+    def __str__(self):
+        return f"{self.created} of {self.rows} rows imported, {self.error_count} rejected"
+
+    def as_dict(self):
+        return {
+            'summary': str(self),
+            'created': self.created,
+            'rows': self.rows,
+            'resumed_after': self.resumed_after,
+            'error_count': self.error_count,
+            'errors': self.errors,
+        }
+
+
+def _normalise_header(name):
+    key = str(name or '').strip().lower().replace(' ', '_').replace('-', '_')
+    return COLUMN_ALIASES.get(key, key)
+
+
+def _normalise_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        # Spreadsheets store numeric IDs and share counts as floats
+        return str(int(value))
+    if isinstance(value, str):
+        if value[:1] == "'" and value[1:2] in FORMULA_PREFIXES:
+            # Escaped by our own CSV export so spreadsheets do not evaluate it
+            value = value[1:]
+        return value.strip()
+    return value
+
+
+def iter_csv_rows(stream):
+    """Yield one dict per data row of a CSV text stream."""
+    reader = csv.reader(stream)
+    try:
+        header = [_normalise_header(h) for h in next(reader, [])]
+        for values in reader:
+            if not any(v.strip() for v in values):
+                continue
+            yield {key: _normalise_value(v) for key, v in zip(header, values)}
+    except csv.Error as e:
+        # A file that cannot be parsed fails the same way however often it is retried
+        raise ValueError(f"Malformed CSV file at line {reader.line_num}: {e}") from e
+
+
+def iter_xlsx_rows(file):
+    """Yield one dict per data row of the first worksheet of an XLSX workbook."""
+    try:
+        from openpyxl import load_workbook
+        from openpyxl.utils.exceptions import InvalidFileException
+    except ImportError:
+        raise ValueError("XLSX import requires the openpyxl package")
+
+    try:
+        workbook = load_workbook(file, read_only=True, data_only=True)
+    except (zipfile.BadZipFile, InvalidFileException, KeyError) as e:
+        # Not a workbook, or one with parts missing
+        raise ValueError(f"Unreadable XLSX file: {e}") from e
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [_normalise_header(h) for h in next(rows, ())]
+        for values in rows:
+            if all(v in (None, '') for v in values):
+                continue
+            yield {key: _normalise_value(v) for key, v in zip(header, values) if key}
+    finally:
+        workbook.close()
+
+
+def iter_rows(file, filename):
+    """Pick a row reader for an uploaded or opened file based on its extension."""
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == '.csv':
+        if isinstance(file, io.TextIOBase):
+            return iter_csv_rows(file)
+        return iter_csv_rows(io.TextIOWrapper(file, encoding='utf-8-sig', newline=''))
+    if extension in ('.xlsx', '.xlsm'):
+        return iter_xlsx_rows(file)
+    raise ValueError(f"Unsupported file type '{extension}'; use CSV or XLSX")
+
+
+class RowValidator:
+    """Validate row dicts with ShareholderImportForm's fields, built once and reused."""
+
+    def __init__(self):
+        self.fields = ShareholderImportForm().fields
+
+    def clean(self, row):
+        if not row.get('full_name'):
+            first = str(row.get('first_name', '')).strip()
+            last = str(row.get('last_name', '')).strip()
+            row['full_name'] = f"{first} {last}".strip()
+
+        cleaned = {}
+        errors = []
+        for name, field in self.fields.items():
+            try:
+                cleaned[name] = field.clean(row.get(name, ''))
+            except ValidationError as e:
+                errors.extend(f"{name}: {message}" for message in e.messages)
+        return cleaned, errors
+
+
+def import_shareholders(rows, created_by=None, batch_size=DEFAULT_BATCH_SIZE, dry_run=False, progress=None,
+                        skip_rows=0):
+    """
+    Validate and insert shareholders from an iterable of row dicts.
+
+    Invalid rows are skipped and reported in the returned ``ImportResult``;
+    valid rows are inserted in batches, each committed in its own
+    transaction so a long import holds no locks between batches. With
+    ``dry_run`` rows are checked against the file and the register but
+    nothing is written.
+
+    ``progress``, if given, is called inside each batch's transaction with
+    the number of rows read so far, so whatever it records is committed
+    with the batch. An interrupted import can be resumed from that count by
+    passing it back as ``skip_rows``.
+    """
+    result = ImportResult()
+    validator = RowValidator()
+    company = Company.get_company()
+    today = timezone.now().date()
+    seen_ids = set()
+
+    def flush(pending):
+        # One query per batch to reject IDs already on the register
+        supplied = [cleaned['id_number'] for _, cleaned in pending if cleaned['id_number']]
+        taken = set(
+            Shareholder.objects.filter(id_number__in=supplied).values_list('id_number', flat=True)
+        )
+        accepted = []
+        for row_number, cleaned in pending:
+            if cleaned['id_number'] in taken:
+                result.add_error(row_number, [f"id_number: {cleaned['id_number']} already exists"])
+            else:
+                accepted.append(cleaned)
+
+        if dry_run:
+            new_ids = iter(())
+        else:
+            # Reserved before the batch's transaction opens, so the day's ID
+            # counter is locked only for the reservation itself and web
+            # requests adding a shareholder never wait on an import batch
+            new_ids = iter(allocate_shareholder_ids(sum(1 for c in accepted if not c['id_number'])))
+        with transaction.atomic():
+            if not dry_run:
+                insert(accepted, new_ids)
+            result.created += len(accepted)
+            if progress:
+                progress(result.rows)
+
+    def insert(accepted, new_ids):
+        shareholders = []
+        for cleaned in accepted:
+            shareholders.append(Shareholder(
+                company=company,
+                full_name=cleaned['full_name'],
+                id_number=cleaned['id_number'] or next(new_ids),
+                date_of_birth=cleaned['date_of_birth'],
+                gender=cleaned['gender'],
+                nationality=cleaned['nationality'],
+                email=cleaned['email'],
+                phone_number=cleaned['phone_number'],
+                address=cleaned['address'],
+                city=cleaned['city'],
+                country=cleaned['country'],
+                postal_code=cleaned['postal_code'],
+                share_certificate_number=cleaned['share_certificate_number'],
+                notes=cleaned['notes'],
+                total_shares=cleaned['total_shares'] or 0,
+                created_by=created_by,
+                date_joined=today,
+                is_active=True,
+            ))
+        Shareholder.objects.bulk_create(shareholders)
+        audit.record_created(shareholders)
+
+        # total_shares is already set on the rows above, so only the ledger
+        # and cap table take the opening balances
+        issues = Transaction.objects.bulk_create([
+            Transaction(
+                shareholder=shareholder,
+                transaction_type='ISSUE',
+                shares=shareholder.total_shares,
+                transaction_date=today,
+                notes="Opening balance from import",
+                created_by=created_by,
+                status='COMPLETED',
+                completion_date=timezone.now(),
+            )
+            for shareholder in shareholders
+            if shareholder.total_shares
+        ])
+        audit.record_created(issues)
+        if issues:
+            captable.record_completed_on(today, Transaction.objects.filter(pk__in=[tx.pk for tx in issues]))
+        if shareholders:
+            register_changed.send(sender=Shareholder, dates=[today])
+
+    pending = []
+    result.rows = result.resumed_after = skip_rows
+    # Data starts on line 2, after the header row
+    for row_number, row in enumerate(rows, start=2):
+        if row_number - 2 < skip_rows:
+            continue
+        result.rows += 1
+        cleaned, errors = validator.clean(row)
+        id_number = cleaned.get('id_number')
+        if id_number and id_number in seen_ids:
+            errors.append(f"id_number: {id_number} appears more than once in the file")
+        if errors:
+            result.add_error(row_number, errors)
+            continue
+        if id_number:
+            seen_ids.add(id_number)
+        pending.append((row_number, cleaned))
+        if len(pending) >= batch_size:
+            flush(pending)
+            pending = []
+    if pending:
+        flush(pending)
+    if progress:
+        progress(result.rows)
+
+    logger.info("Shareholder import finished: %s", result)
+    return result
@@ -0,0 +1,340 @@
+"""
+Database-backed background jobs.
+
+Views queue heavy work with ``enqueue(kind, **payload)`` and return at
+once; ``manage.py run_jobs`` processes claim queued ``Job`` rows and run the
+handler registered for their kind with ``@handler``. No broker is needed:
+workers claim jobs with ``SELECT ... FOR UPDATE SKIP LOCKED`` (where the
+database has it) and a conditional UPDATE, so any number of workers can
+share the table without running a job twice.
+
+Handlers take ``(job, progress)`` and return a JSON-serialisable result;
+they may also attach a file to ``job.result_file``. ``progress(current,
+total=None, message=None, force=False)`` records how far they are and
+doubles as the worker's heartbeat. A job whose worker stops reporting for
+``JOB_LEASE_SECONDS`` is queued again. Heartbeats must reach the database
+while the job runs, so handlers report between transactions, or inside
+short ones that commit as they go, never from within one long one.
+
+Failed attempts are retried with exponential backoff up to the job's
+``max_attempts``, except for ``ValidationError`` and ``ValueError``, which
+mean the job itself is bad and retrying would not help.
+"""
+import logging
+import os
+import socket
+import tempfile
+import time
+import traceback
+from datetime import timedelta
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.utils.text import slugify
+
+from . import audit, certificates, exporter, importer, statements, workflow
+from .models import Company, Job, ShareTransfer, Transaction
+
+logger = logging.getLogger(__name__)
+
+HANDLERS = {}
+DEFAULT_MAX_ATTEMPTS = 3
+PERMANENT_ERRORS = (ValidationError, ValueError)
+PROGRESS_INTERVAL = 1.0
+# Id ranges matched per query by workflow jobs
+RANGES_PER_QUERY = 500
+UPLOAD_DIR = 'jobs/uploads'
+
+
+def lease_seconds():
+    return getattr(settings, 'JOB_LEASE_SECONDS', 300)
+
+
+def retry_delay(attempt):
+    """Seconds to wait before the attempt after ``attempt`` failed."""
+    return getattr(settings, 'JOB_RETRY_DELAY', 30) * 2 ** (attempt - 1)
+
+
+def handler(kind):
+    """Register the decorated function as the handler for jobs of ``kind``."""
+    def decorator(function):
+        HANDLERS[kind] = function
+        return function
+    return decorator
+
+
+def enqueue(kind, created_by=None, max_attempts=DEFAULT_MAX_ATTEMPTS, **payload):
+    if kind not in HANDLERS:
+        raise ValueError(f"No handler for job kind '{kind}'")
+    return Job.objects.create(kind=kind, payload=payload, created_by=created_by, max_attempts=max_attempts)
+
+
+def store_upload(upload):
+    """Save an uploaded file where a worker on any host can read it; returns its storage name."""
+    return default_storage.save(f"{UPLOAD_DIR}/{upload.name}", upload)
+
+
+def discard_upload(job):
+    """Delete the file a job was queued with, once nothing will read it again."""
+    name = job.payload.get('file')
+    if name and name.startswith(f"{UPLOAD_DIR}/"):
+        default_storage.delete(name)
+
+
+class Progress:
+    """Handed to handlers to report progress; writes at most once per ``PROGRESS_INTERVAL``."""
+
+    def __init__(self, job):
+        self.job = job
+        self.current = job.progress_current
+        self.total = job.progress_total
+        self.message = job.message
+        self._written = time.monotonic()
+
+    def __call__(self, current, total=None, message=None, force=False):
+        self.current = current
+        if total is not None:
+            self.total = total
+        if message is not None:
+            self.message = message[:255]
+        if force or time.monotonic() - self._written >= PROGRESS_INTERVAL:
+            self.write()
+
+    def write(self):
+        Job.objects.filter(pk=self.job.pk).update(
+            progress_current=self.current,
+            progress_total=self.total,
+            message=self.message,
+            heartbeat_at=timezone.now(),
+        )
+        self._written = time.monotonic()
+
+
+def requeue_abandoned():
+    """Queue again, or fail if out of attempts, running jobs whose worker stopped reporting."""
+    now = timezone.now()
+    abandoned = Job.objects.filter(status='RUNNING', heartbeat_at__lt=now - timedelta(seconds=lease_seconds()))
+    exhausted = list(abandoned.filter(attempts__gte=F('max_attempts')).only('pk', 'payload'))
+    failed = abandoned.filter(pk__in=[job.pk for job in exhausted]).update(
+        status='FAILED', finished_at=now, error='The worker running this job stopped responding',
+    )
+    for job in exhausted:
+        discard_upload(job)
+    requeued = abandoned.update(status='QUEUED', run_after=now, worker='')
+    if failed or requeued:
+        logger.warning("Requeued %s and failed %s abandoned jobs", requeued, failed)
+    return requeued
+
+
+def claim(worker):
+    """Mark the next due job as running on ``worker`` and return it, or None if none is due."""
+    now = timezone.now()
+    with transaction.atomic():
+        due = list(
+            Job.objects.filter(status='QUEUED', run_after__lte=now)
+            .select_for_update(skip_locked=True)
+            .order_by('run_after', 'pk')
+            .values_list('pk', flat=True)[:1]
+        )
+        # The status condition keeps the claim safe on databases without row locks
+        if not due or not Job.objects.filter(pk=due[0], status='QUEUED').update(
+            status='RUNNING', worker=worker, attempts=F('attempts') + 1,
+            started_at=now, heartbeat_at=now, error='',
+        ):
+            return None
+    return Job.objects.get(pk=due[0])
+
+
+def run(job):
+    """Run a claimed job and record the outcome."""
+    progress = Progress(job)
+    # Renew the lease before the handler's first, possibly slow, batch
+    progress.write()
+    try:
+        if job.kind not in HANDLERS:
+            raise ValueError(f"No handler for job kind '{job.kind}'")
+        # Changes the job makes are the work of whoever queued it; they are
+        # logged as each batch commits rather than held until the job ends
+        with audit.context(job.created_by, buffered=False):
+            result = HANDLERS[job.kind](job, progress)
+    except Exception as e:
+        now = timezone.now()
+        error = traceback.format_exc()
+        if job.attempts < job.max_attempts and not isinstance(e, PERMANENT_ERRORS):
+            logger.warning("Job %s failed on attempt %s, retrying: %s", job.pk, job.attempts, e)
+            Job.objects.filter(pk=job.pk).update(
+                status='QUEUED', error=error, worker='',
+                run_after=now + timedelta(seconds=retry_delay(job.attempts)),
+            )
+        else:
+            logger.error("Job %s failed: %s", job.pk, e)
+            Job.objects.filter(pk=job.pk).update(status='FAILED', error=error, finished_at=now)
+            discard_upload(job)
+        return False
+
+    Job.objects.filter(pk=job.pk).update(
+        status='SUCCEEDED',
+        result=result,
+        result_file=job.result_file.name or '',
+        progress_current=progress.current,
+        progress_total=progress.total,
+        message=progress.message,
+        finished_at=timezone.now(),
+    )
+    return True
+
+
+def _close_old_connections():
+    # As Django does between requests, so a long-lived worker recovers from
+    # dropped connections; a connection inside a transaction is left alone
+    for connection in connections.all(initialized_only=True):
+        if not connection.in_atomic_block:
+            connection.close_if_unusable_or_obsolete()
+
+
+def work(worker=None, once=False, poll_interval=None):
+    """
+    Claim and run jobs until interrupted, or with ``once`` until the queue
+    has nothing due. Returns the number of jobs run.
+    """
+    worker = worker or f"{socket.gethostname()}:{os.getpid()}"
+    poll_interval = poll_interval if poll_interval is not None else getattr(settings, 'JOB_POLL_INTERVAL', 2)
+    processed = 0
+    while True:
+        _close_old_connections()
+        requeue_abandoned()
+        job = claim(worker)
+        if job is None:
+            if once:
+                return processed
+            time.sleep(poll_interval)
+            continue
+        run(job)
+        processed += 1
+
+
+# Handlers
+
+@handler('import_shareholders')
+def import_shareholders_job(job, progress):
+    name = job.payload['file']
+    with default_storage.open(name, 'rb') as file:
+        result = importer.import_shareholders(
+            importer.iter_rows(file, name),
+            created_by=job.created_by,
+            dry_run=job.payload.get('dry_run', False),
+            # Written in each batch's transaction, so the count is exactly what
+            # has been committed and a retry carries on from there
+            progress=lambda rows: progress(rows, message=f"{rows} rows read", force=True),
+            skip_rows=job.progress_current,
+        )
+    discard_upload(job)
+    return result.as_dict()
+
+
+@handler('export')
+def export_job(job, progress):
+    as_of = parse_date(job.payload.get('as_of') or '')
+    title, rows = exporter.dataset_rows(job.payload['dataset'], as_of=as_of)
+
+    def counted(rows):
+        for count, row in enumerate(rows):
+            if count % exporter.CHUNK_SIZE == 0:
+                progress(count, message=f"{count} rows written")
+            yield row
+
+    filename = f"{slugify(title)}-{timezone.now():%Y%m%d}"
+    if job.payload.get('format') == 'xlsx':
+        output = exporter.write_xlsx(counted(rows), title=title)
+        filename += '.xlsx'
+    else:
+        output = tempfile.TemporaryFile()
+        for line in exporter.iter_csv(counted(rows)):
+            output.write(line.encode('utf-8'))
+        output.seek(0)
+        filename += '.csv'
+    with output:
+        job.result_file.save(filename, File(output), save=False)
+    return {'filename': filename}
+
+
+@handler('statements')
+def statements_job(job, progress):
+    """Write every holder's statement for the period to a ZIP of HTML files."""
+    start = parse_date(job.payload['start'])
+    end = parse_date(job.payload['end'])
+    if not start or not end or start > end:
+        raise ValueError("A statement run needs a start date on or before its end date")
+    total = statements.holder_count()
+    count = 0
+
+    def counted(files):
+        nonlocal count
+        for item in files:
+            count += 1
+            if count % statements.BATCH_SIZE == 0:
+                progress(count, total, message=f"{count} statements written")
+            yield item
+
+    files = statements.render_register(
+        start, end, company=Company.get_company(), workers=job.payload.get('workers') or statements.default_workers(),
+    )
+    filename = f"statements-{start:%Y%m%d}-{end:%Y%m%d}.zip"
+    with tempfile.TemporaryFile() as output:
+        for chunk in certificates.iter_zip(counted(files)):
+            output.write(chunk)
+        output.seek(0)
+        job.result_file.save(filename, File(output), save=False)
+    progress(count, total, message=f"{count} statements written")
+    return {'filename': filename, 'statements': count}
+
+
+WORKFLOW_OPERATIONS = {
+    ('transactions', 'complete'): (Transaction, workflow.complete_transactions, None),
+    ('transfers', 'complete'): (ShareTransfer, workflow.complete_transfers, 'completed_by'),
+}
+
+
+def id_ranges(ids):
+    """``[[first, last], ...]`` runs of consecutive ids, so a large selection stays small in a payload."""
+    ranges = []
+    for pk in sorted(set(ids)):
+        if ranges and pk == ranges[-1][1] + 1:
+            ranges[-1][1] = pk
+        else:
+            ranges.append([pk, pk])
+    return ranges
+
+
+def range_filters(ranges, per_query=None):
+    """Yield a ``Q`` for each group of up to ``per_query`` id ranges."""
+    per_query = per_query or RANGES_PER_QUERY
+    for start in range(0, len(ranges), per_query):
+        yield reduce(or_, (Q(pk__range=(first, last)) for first, last in ranges[start:start + per_query]))
+
+
+@handler('workflow')
+def workflow_job(job, progress):
+    """Complete the transactions or transfers in the given id ranges, in batches."""
+    model, operation, user_argument = WORKFLOW_OPERATIONS[job.payload['target'], job.payload['action']]
+    # Jobs queued before ids were stored as ranges carry a plain list
+    ranges = job.payload.get('id_ranges') or id_ranges(job.payload.get('ids', []))
+    selected = sum(last - first + 1 for first, last in ranges)
+    kwargs = {user_argument: job.created_by} if user_argument else {}
+    total = 0
+    for selection in range_filters(ranges):
+        total += workflow.run_in_batches(
+            operation,
+            model.objects.filter(selection),
+            progress=lambda done: progress(total + done, selected),
+            **kwargs,
+        )
+    return {'processed': total}
@@ -0,0 +1,65 @@
+import re
+from datetime import date
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from shareholders import corporate_actions
+from shareholders.models import CorporateAction
+
+
+def ratio(value):
+    match = re.fullmatch(r'(\d+):(\d+)', value)
+    if not match:
+        raise ValueError(value)
+    return int(match.group(1)), int(match.group(2))
+
+
+class Command(BaseCommand):
+    help = "Apply a stock split or bonus issue across the register"
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=[kind for kind, _ in CorporateAction.KIND_CHOICES])
+        parser.add_argument('ratio', type=ratio, help='New shares for shares held, e.g. 2:1 for a two-for-one split')
+        parser.add_argument('--key', required=True, help='Idempotency key; a rerun with the same key changes nothing')
+        parser.add_argument('--date', type=date.fromisoformat, help='Effective date (YYYY-MM-DD, default: today)')
+        parser.add_argument(
+            '--fractions',
+            choices=[choice for choice, _ in CorporateAction.FRACTION_CHOICES],
+            default='DOWN',
+            help='Rounding of fractional entitlements (default: DOWN)'
+        )
+        parser.add_argument('--description', default='')
+        parser.add_argument('--dry-run', action='store_true', help='Show what would be allotted without applying it')
+
+    def handle(self, *args, **options):
+        ratio_new, ratio_held = options['ratio']
+        terms = {
+            'kind': options['kind'],
+            'ratio_new': ratio_new,
+            'ratio_held': ratio_held,
+            'effective_date': options['date'] or timezone.localdate(),
+            'fractions': options['fractions'],
+            'idempotency_key': options['key'],
+            'description': options['description'],
+        }
+        try:
+            if options['dry_run']:
+                action, _ = corporate_actions.preview(**terms)
+                created = None
+            else:
+                action, created = corporate_actions.apply(**terms)
+        except ValidationError as e:
+            raise CommandError('; '.join(e.messages))
+
+        summary = (
+            f"{action}: {action.shares_allotted} shares to {action.holder_count} holders "
+            f"of {action.shares_before}, {action.fractional_shares} fractional shares not allotted"
+        )
+        if created is None:
+            self.stdout.write(f"Dry run, nothing applied. {summary}")
+        elif created:
+            self.stdout.write(self.style.SUCCESS(f"Applied {summary}"))
+        else:
+            self.stdout.write(self.style.WARNING(f"Already applied with key '{action.idempotency_key}'. {summary}"))
@@ -0,0 +1,46 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.db.models import Min
+from django.utils import timezone
+
+from shareholders import register
+from shareholders.models import RegisterCheckpoint, Transaction
+
+
+class Command(BaseCommand):
+    help = "Create month-end register checkpoints used by point-in-time register queries"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--date',
+            type=date.fromisoformat,
+            help='Create a single checkpoint for this date (YYYY-MM-DD)'
+        )
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Recreate checkpoints that already exist'
+        )
+
+    def handle(self, *args, **options):
+        if options['date']:
+            checkpoint = register.create_checkpoint(options['date'])
+            self.stdout.write(self.style.SUCCESS(f"Created {checkpoint}"))
+            return
+
+        first = Transaction.objects.filter(status='COMPLETED').aggregate(first=Min('transaction_date'))['first']
+        if first is None:
+            self.stdout.write("No completed transactions; nothing to checkpoint")
+            return
+
+        existing = set(RegisterCheckpoint.objects.values_list('as_of_date', flat=True))
+        created = 0
+        # Oldest first, so each checkpoint only replays the month since the last one
+        for month_end in register.month_ends(first, timezone.now().date()):
+            if month_end in existing and not options['rebuild']:
+                continue
+            register.create_checkpoint(month_end)
+            created += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Created {created} register checkpoints"))
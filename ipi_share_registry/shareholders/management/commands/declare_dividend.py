@@ -0,0 +1,46 @@
+from datetime import date
+from decimal import Decimal, InvalidOperation
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from shareholders import dividends, exporter
+
+
+def decimal(value):
+    try:
+        return Decimal(value)
+    except InvalidOperation:
+        raise ValueError(value)
+
+
+class Command(BaseCommand):
+    help = "Declare a dividend and compute every holder's entitlement at the record date"
+
+    def add_arguments(self, parser):
+        parser.add_argument('amount_per_share', type=decimal, help='Dividend per share, e.g. 0.125')
+        parser.add_argument('record_date', type=date.fromisoformat, help='Record date (YYYY-MM-DD)')
+        parser.add_argument('--payment-date', type=date.fromisoformat, help='Payment date (YYYY-MM-DD)')
+        parser.add_argument('--description', default='', help='Description of the dividend')
+        parser.add_argument('--payment-file', help='Also write the payment file (CSV) to this path')
+
+    def handle(self, *args, **options):
+        try:
+            run = dividends.declare(
+                options['amount_per_share'],
+                options['record_date'],
+                payment_date=options['payment_date'],
+                description=options['description'],
+            )
+        except ValidationError as e:
+            raise CommandError('; '.join(e.messages))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Dividend run {run.pk}: {run.holder_count} holders, {run.total_shares} shares, "
+            f"{run.total_amount} to pay ({run.rounding_residue} left by rounding)"
+        ))
+        if options['payment_file']:
+            with open(options['payment_file'], 'w', newline='', encoding='utf-8') as output:
+                for line in exporter.iter_csv(dividends.payment_rows(run)):
+                    output.write(line)
+            self.stdout.write(f"Wrote the payment file to {options['payment_file']}")
@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks import generator
+from shareholders.models import Shareholder
+
+
+class Command(BaseCommand):
+    help = "Fill an empty database with a deterministic synthetic register for benchmarking"
+
+    def add_arguments(self, parser):
+        for name, default in generator.DEFAULT_COUNTS.items():
+            parser.add_argument(
+                f'--{name}',
+                type=int,
+                default=default,
+                help=f'Number of {name} to create (default: {default})'
+            )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=generator.DEFAULT_SEED,
+            help=f'Random seed; the same seed and counts give the same data (default: {generator.DEFAULT_SEED})'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=generator.DEFAULT_BATCH_SIZE,
+            help=f'Rows written per insert (default: {generator.DEFAULT_BATCH_SIZE})'
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Add to a register that already has shareholders'
+        )
+
+    def handle(self, *args, **options):
+        if Shareholder.objects.exists() and not options['force']:
+            raise CommandError("The register is not empty; use a scratch database or pass --force")
+        if Shareholder.objects.filter(id_number__startswith=generator.ID_PREFIX).exists():
+            raise CommandError("Benchmark data has already been generated in this database")
+
+        try:
+            counts = generator.generate(
+                shareholders=options['shareholders'],
+                directors=options['directors'],
+                transactions=options['transactions'],
+                transfers=options['transfers'],
+                seed=options['seed'],
+                batch_size=options['batch_size'],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        summary = ', '.join(f"{count} {name}" for name, count in counts.items())
+        self.stdout.write(self.style.SUCCESS(f"Generated {summary}"))
@@ -0,0 +1,51 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from shareholders import certificates
+from shareholders.models import Transaction
+
+
+class Command(BaseCommand):
+    help = "Write PDF share certificates to a ZIP file"
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help='Path of the ZIP file to write')
+        parser.add_argument(
+            '--issues',
+            action='store_true',
+            help='One certificate per completed issue or transfer in, instead of one per holder'
+        )
+        parser.add_argument(
+            '--since',
+            type=date.fromisoformat,
+            help='With --issues, only transactions dated on or after this date (YYYY-MM-DD)'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            help='Rendering processes (default: CERTIFICATE_WORKERS)'
+        )
+
+    def handle(self, *args, **options):
+        if options['issues']:
+            queryset = Transaction.objects.all()
+            if options['since']:
+                queryset = queryset.filter(transaction_date__gte=options['since'])
+            batch = certificates.transaction_certificates(queryset)
+        else:
+            batch = certificates.holder_certificates()
+
+        count = 0
+
+        def counted(files):
+            nonlocal count
+            for item in files:
+                count += 1
+                yield item
+
+        files = certificates.render_all(batch, workers=options['workers'] or certificates.default_workers())
+        with open(options['output'], 'wb') as output:
+            for chunk in certificates.iter_zip(counted(files)):
+                output.write(chunk)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {count} certificates to {options['output']}"))
@@ -0,0 +1,54 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from shareholders import certificates, statements
+from shareholders.models import Company
+
+
+class Command(BaseCommand):
+    help = "Write every shareholder's statement for a period to a ZIP file"
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help='Path of the ZIP file to write')
+        parser.add_argument(
+            '--start',
+            type=date.fromisoformat,
+            help='First day of the period (YYYY-MM-DD, default: 1 January this year)'
+        )
+        parser.add_argument(
+            '--end',
+            type=date.fromisoformat,
+            help='Last day of the period (YYYY-MM-DD, default: today)'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            help='Processes computing and rendering statements (default: STATEMENT_WORKERS)'
+        )
+
+    def handle(self, *args, **options):
+        today = timezone.localdate()
+        start = options['start'] or today.replace(month=1, day=1)
+        end = options['end'] or today
+        if start > end:
+            raise CommandError("--start must not be after --end")
+
+        count = 0
+
+        def counted(files):
+            nonlocal count
+            for item in files:
+                count += 1
+                yield item
+
+        files = statements.render_register(
+            start, end,
+            company=Company.get_company(),
+            workers=options['workers'] or statements.default_workers(),
+        )
+        with open(options['output'], 'wb') as output:
+            for chunk in certificates.iter_zip(counted(files)):
+                output.write(chunk)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {count} statements to {options['output']}"))
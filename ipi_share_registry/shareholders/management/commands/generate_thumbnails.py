@@ -0,0 +1,37 @@
+import os
+
+from django.core.management.base import BaseCommand
+
+from shareholders import thumbnails
+from shareholders.models import Shareholder
+
+
+class Command(BaseCommand):
+    help = "Make the resized thumbnails of existing shareholder photos"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Worker processes (default: one per CPU)'
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Regenerate thumbnails that already exist'
+        )
+
+    def handle(self, *args, **options):
+        names = list(
+            Shareholder.objects.exclude(photo='').exclude(photo__isnull=True)
+            .order_by('photo').values_list('photo', flat=True).distinct()
+        )
+        failed = 0
+        for name, error in thumbnails.backfill(names, workers=options['workers'], force=options['force']):
+            if error:
+                failed += 1
+                self.stderr.write(f"{name}: {error}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Processed {len(names)} photos with {options['workers']} workers ({failed} failed)"
+        ))
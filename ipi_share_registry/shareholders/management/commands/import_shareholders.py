@@ -0,0 +1,72 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from shareholders import importer
+
+
+class Command(BaseCommand):
+    help = "Import shareholders from a CSV or XLSX file"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or XLSX file with a header row')
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=importer.DEFAULT_BATCH_SIZE,
+            help=f'Rows inserted per query (default: {importer.DEFAULT_BATCH_SIZE})'
+        )
+        parser.add_argument(
+            '--user',
+            help='Username recorded as the creator of the imported shareholders'
+        )
+        parser.add_argument(
+            '--skip-rows',
+            type=int,
+            default=0,
+            help='Data rows already imported by an interrupted run, to continue after'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Validate and report without saving anything'
+        )
+
+    def handle(self, *args, **options):
+        created_by = None
+        if options['user']:
+            try:
+                created_by = User.objects.get(username=options['user'])
+            except User.DoesNotExist:
+                raise CommandError(f"User '{options['user']}' does not exist")
+
+        path = options['path']
+        # Batches commit as they go; remember how far they got
+        committed = options['skip_rows']
+
+        def progress(rows):
+            nonlocal committed
+            committed = rows
+
+        try:
+            with open(path, 'rb') as f:
+                result = importer.import_shareholders(
+                    importer.iter_rows(f, path),
+                    created_by=created_by,
+                    batch_size=options['batch_size'],
+                    dry_run=options['dry_run'],
+                    progress=progress,
+                    skip_rows=options['skip_rows'],
+                )
+        except (OSError, ValueError) as e:
+            if committed and not options['dry_run']:
+                raise CommandError(f"{e} (the first {committed} rows were imported; "
+                                   f"rerun with --skip-rows {committed} to continue)")
+            raise CommandError(str(e))
+
+        for row_number, errors in result.errors:
+            self.stderr.write(f"Row {row_number}: {'; '.join(errors)}")
+        if result.error_count > len(result.errors):
+            self.stderr.write(f"... and {result.error_count - len(result.errors)} more rejected rows")
+
+        prefix = "Dry run: " if options['dry_run'] else ""
+        self.stdout.write(self.style.SUCCESS(f"{prefix}{result}"))
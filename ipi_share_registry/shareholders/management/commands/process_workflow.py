@@ -0,0 +1,76 @@
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from shareholders import workflow
+from shareholders.models import ShareTransfer, Transaction
+
+
+class Command(BaseCommand):
+    help = "Approve or complete transactions or share transfers in bulk"
+
+    def add_arguments(self, parser):
+        parser.add_argument('target', choices=['transactions', 'transfers'])
+        parser.add_argument('action', choices=['approve', 'complete'])
+        parser.add_argument(
+            '--until',
+            type=date.fromisoformat,
+            help='Only process records dated on or before this date (YYYY-MM-DD)'
+        )
+        parser.add_argument(
+            '--status',
+            action='append',
+            help='Only process records currently in this status (repeatable)'
+        )
+        parser.add_argument(
+            '--user',
+            help='Username recorded as approver/completer'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=workflow.DEFAULT_BATCH_SIZE,
+            help=f'Records locked and updated per transaction (default: {workflow.DEFAULT_BATCH_SIZE})'
+        )
+
+    def handle(self, *args, **options):
+        user = None
+        if options['user']:
+            try:
+                user = User.objects.get(username=options['user'])
+            except User.DoesNotExist:
+                raise CommandError(f"User '{options['user']}' does not exist")
+
+        if options['target'] == 'transactions':
+            queryset = Transaction.objects.all()
+            date_field = 'transaction_date'
+            operations = {
+                'approve': (workflow.approve_transactions, {'approved_by': user}),
+                'complete': (workflow.complete_transactions, {}),
+            }
+        else:
+            queryset = ShareTransfer.objects.all()
+            date_field = 'transfer_date'
+            operations = {
+                'approve': (workflow.approve_transfers, {'approved_by': user}),
+                'complete': (workflow.complete_transfers, {'completed_by': user}),
+            }
+
+        if options['until']:
+            queryset = queryset.filter(**{f'{date_field}__lte': options['until']})
+        if options['status']:
+            queryset = queryset.filter(status__in=options['status'])
+
+        operation, kwargs = operations[options['action']]
+        try:
+            processed = workflow.run_in_batches(
+                operation, queryset, batch_size=options['batch_size'], **kwargs
+            )
+        except ValidationError as e:
+            raise CommandError('; '.join(e.messages))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{options['action'].capitalize()}d {processed} {options['target']}"
+        ))
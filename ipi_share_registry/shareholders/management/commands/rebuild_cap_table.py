@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from shareholders import captable
+
+
+class Command(BaseCommand):
+    help = "Rebuild the cap table snapshot from the completed transaction ledger"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of snapshot rows written per insert (default: 1000)'
+        )
+
+    def handle(self, *args, **options):
+        created = captable.rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt cap table with {created} snapshot rows"))
@@ -0,0 +1,57 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks import runner
+
+
+class Command(BaseCommand):
+    help = "Time the main views and operations and write the results as JSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scenario',
+            action='append',
+            choices=sorted(runner.SCENARIOS),
+            help='Only run this scenario (repeatable; default: all)'
+        )
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=runner.DEFAULT_ITERATIONS,
+            help=f'Timed runs per scenario (default: {runner.DEFAULT_ITERATIONS})'
+        )
+        parser.add_argument(
+            '--warmup',
+            type=int,
+            default=runner.DEFAULT_WARMUP,
+            help=f'Untimed runs per scenario first (default: {runner.DEFAULT_WARMUP})'
+        )
+        parser.add_argument('--output', help='Write the results to this file instead of stdout')
+        parser.add_argument('--compare', help='Results file from an earlier run to compare against')
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['compare']:
+            try:
+                with open(options['compare']) as f:
+                    baseline = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Cannot read {options['compare']}: {e}")
+
+        try:
+            results = runner.run(options['scenario'], options['iterations'], options['warmup'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(runner.dumps(results))
+            self.stdout.write(self.style.SUCCESS(f"Wrote results to {options['output']}"))
+        elif baseline is None:
+            self.stdout.write(runner.dumps(results))
+
+        if baseline is not None:
+            self.stdout.write(f"{'scenario':<30} {'before ms':>10} {'after ms':>10} {'change':>8}")
+            for name, before, after, change in runner.compare(baseline, results):
+                self.stdout.write(f"{name:<30} {before:>10.2f} {after:>10.2f} {change:>+7.1f}%")
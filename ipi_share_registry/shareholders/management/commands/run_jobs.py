@@ -0,0 +1,62 @@
+import multiprocessing
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+
+def run_worker(work_options):
+    # Imported here so that spawned (not forked) processes set Django up first
+    django.setup()
+    from shareholders import jobs
+    jobs.work(**work_options)
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs (imports, exports, bulk workflow)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=1,
+            help='Worker processes to run side by side (default: 1)'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Exit once no job is due instead of waiting for more'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            help='Seconds to wait between checks of an empty queue (default: JOB_POLL_INTERVAL)'
+        )
+
+    def handle(self, *args, **options):
+        from shareholders import jobs
+
+        work_options = {'once': options['once'], 'poll_interval': options['poll_interval']}
+        if options['processes'] <= 1:
+            try:
+                processed = jobs.work(**work_options)
+            except KeyboardInterrupt:
+                return
+            self.stdout.write(self.style.SUCCESS(f"Ran {processed} jobs"))
+            return
+
+        # Each process opens its own database connection
+        connections.close_all()
+        workers = [
+            multiprocessing.Process(target=run_worker, args=(work_options,), daemon=True)
+            for _ in range(options['processes'])
+        ]
+        for worker in workers:
+            worker.start()
+        try:
+            for worker in workers:
+                worker.join()
+        except KeyboardInterrupt:
+            for worker in workers:
+                worker.terminate()
+        self.stdout.write(self.style.SUCCESS(f"{len(workers)} worker processes stopped"))
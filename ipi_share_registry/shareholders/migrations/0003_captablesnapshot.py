@@ -0,0 +1,38 @@
+# Generated by Django 4.2.30 on 2026-10-16 23:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shareholders', '0002_director_gender'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CapTableSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('as_of_date', models.DateField()),
+                ('shares', models.DecimalField(decimal_places=2, default=0, help_text='Shares held at the end of this date', max_digits=20)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('shareholder', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='cap_table_snapshots', to='shareholders.shareholder')),
+            ],
+            options={
+                'verbose_name': 'Cap Table Snapshot',
+                'verbose_name_plural': 'Cap Table Snapshots',
+                'ordering': ['-as_of_date'],
+                'indexes': [models.Index(fields=['as_of_date'], name='shareholder_as_of_d_b019fc_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='captablesnapshot',
+            constraint=models.UniqueConstraint(fields=('shareholder', 'as_of_date'), name='unique_holding_per_date'),
+        ),
+        migrations.AddConstraint(
+            model_name='captablesnapshot',
+            constraint=models.UniqueConstraint(condition=models.Q(('shareholder__isnull', True)), fields=('as_of_date',), name='unique_register_total_per_date'),
+        ),
+    ]
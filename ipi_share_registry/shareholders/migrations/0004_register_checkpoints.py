@@ -0,0 +1,42 @@
+# Generated by Django 4.2.30 on 2026-10-16 23:13
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shareholders', '0003_captablesnapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RegisterCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('as_of_date', models.DateField(unique=True)),
+                ('holder_count', models.PositiveIntegerField(default=0)),
+                ('total_shares', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Register Checkpoint',
+                'verbose_name_plural': 'Register Checkpoints',
+                'ordering': ['-as_of_date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='RegisterCheckpointLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shares', models.DecimalField(decimal_places=2, max_digits=20)),
+                ('checkpoint', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lines', to='shareholders.registercheckpoint')),
+                ('shareholder', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='checkpoint_lines', to='shareholders.shareholder')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='registercheckpointline',
+            constraint=models.UniqueConstraint(fields=('checkpoint', 'shareholder'), name='unique_checkpoint_holding'),
+        ),
+    ]
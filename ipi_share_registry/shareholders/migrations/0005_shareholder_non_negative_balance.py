@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-16 23:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shareholders', '0004_register_checkpoints'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='shareholder',
+            constraint=models.CheckConstraint(check=models.Q(('total_shares__gte', 0)), name='shareholder_total_shares_non_negative'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-16 23:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shareholders', '0005_shareholder_non_negative_balance'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['-created_at', 'id'], name='transaction_history_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['shareholder', '-created_at', 'id'], name='transaction_holder_history_idx'),
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 4.2.30 on 2026-10-16 23:26
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import AddIndexConcurrently, TrigramExtension
+from django.db import migrations
+
+
+class AddPostgresIndexConcurrently(AddIndexConcurrently):
+    """Build the index without locking writes; a no-op on databases other than PostgreSQL."""
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+def _has_extension(schema_editor, name, installed=False):
+    table = 'pg_extension WHERE extname' if installed else 'pg_available_extensions WHERE name'
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f"SELECT 1 FROM {table} = %s", [name])
+        return cursor.fetchone() is not None
+
+
+class CreateTrigramExtensionIfAvailable(TrigramExtension):
+    """Install pg_trgm where the server ships it; search falls back to full-text only otherwise."""
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql' and _has_extension(schema_editor, 'pg_trgm'):
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+
+class AddTrigramIndexConcurrently(AddPostgresIndexConcurrently):
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql' and _has_extension(schema_editor, 'pg_trgm', installed=True):
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS "{self.index.name}"')
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('shareholders', '0006_transaction_history_indexes'),
+    ]
+
+    operations = [
+        CreateTrigramExtensionIfAvailable(),
+        AddPostgresIndexConcurrently(
+            model_name='shareholder',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.search.SearchVector('full_name', 'id_number', 'email', 'phone_number', 'city', config='simple'), name='shareholder_search_idx'),
+        ),
+        AddTrigramIndexConcurrently(
+            model_name='shareholder',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['full_name'], name='shareholder_name_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+    ]
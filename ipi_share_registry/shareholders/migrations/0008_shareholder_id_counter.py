@@ -0,0 +1,25 @@
+# Generated by Django 4.2.30 on 2026-10-16 23:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shareholders', '0007_shareholder_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShareholderIdCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(unique=True)),
+                ('last_value', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Shareholder ID Counter',
+                'verbose_name_plural': 'Shareholder ID Counters',
+            },
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 4.2.30 on 2026-10-16 23:55
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('shareholders', '0009_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DividendRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('description', models.CharField(blank=True, max_length=255)),
+                ('amount_per_share', models.DecimalField(decimal_places=6, help_text='Dividend declared per share', max_digits=20)),
+                ('record_date', models.DateField(help_text='Holders on the register at the end of this date are paid')),
+                ('payment_date', models.DateField(blank=True, null=True)),
+                ('status', models.CharField(choices=[('CALCULATED', 'Calculated'), ('PAID', 'Paid')], default='CALCULATED', max_length=10)),
+                ('holder_count', models.PositiveIntegerField(default=0)),
+                ('total_shares', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('total_amount', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('rounding_residue', models.DecimalField(decimal_places=6, default=0, help_text='Declared amount not paid out because each line is rounded down to the cent', max_digits=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('paid_at', models.DateTimeField(blank=True, null=True)),
+                ('declared_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='dividend_runs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Dividend Run',
+                'verbose_name_plural': 'Dividend Runs',
+                'ordering': ['-record_date', '-id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='DividendLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shares', models.DecimalField(decimal_places=2, max_digits=20)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=20)),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lines', to='shareholders.dividendrun')),
+                ('shareholder', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='dividend_lines', to='shareholders.shareholder')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='dividendline',
+            constraint=models.UniqueConstraint(fields=('run', 'shareholder'), name='unique_dividend_entitlement'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.30 on 2026-10-17 00:02
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('shareholders', '0010_dividend_run'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CorporateAction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('SPLIT', 'Stock Split'), ('BONUS', 'Bonus Issue')], max_length=10)),
+                ('ratio_new', models.PositiveIntegerField()),
+                ('ratio_held', models.PositiveIntegerField()),
+                ('effective_date', models.DateField()),
+                ('fractions', models.CharField(choices=[('DOWN', 'Round down'), ('NEAREST', 'Round to nearest'), ('UP', 'Round up')], default='DOWN', help_text='How fractional entitlements are rounded to whole shares', max_length=10)),
+                ('idempotency_key', models.CharField(help_text='Applying an action again with the same key returns the first result', max_length=100, unique=True)),
+                ('description', models.CharField(blank=True, max_length=255)),
+                ('holder_count', models.PositiveIntegerField(default=0)),
+                ('shares_before', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('shares_allotted', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('fractional_shares', models.DecimalField(decimal_places=6, default=0, help_text='Exact entitlement not allotted because of rounding (negative when rounded up)', max_digits=20)),
+                ('applied_at', models.DateTimeField(auto_now_add=True)),
+                ('applied_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='corporate_actions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Corporate Action',
+                'verbose_name_plural': 'Corporate Actions',
+                'ordering': ['-effective_date', '-id'],
+            },
+        ),
+    ]
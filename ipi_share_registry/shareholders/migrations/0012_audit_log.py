@@ -0,0 +1,68 @@
+# Generated by Django 4.2.30 on 2026-10-17 00:06
+
+from django.db import migrations, models
+
+
+class ForbidAuditChangesOnPostgres(migrations.operations.base.Operation):
+    """Make the audit table append-only in the database itself; a no-op elsewhere."""
+
+    reversible = True
+
+    def state_forwards(self, app_label, state):
+        pass
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            schema_editor.execute("""
+                CREATE FUNCTION shareholders_auditentry_append_only() RETURNS trigger AS $$
+                BEGIN
+                    RAISE EXCEPTION 'audit entries are append-only';
+                END;
+                $$ LANGUAGE plpgsql
+            """)
+            schema_editor.execute("""
+                CREATE TRIGGER shareholders_auditentry_append_only
+                BEFORE UPDATE OR DELETE ON shareholders_auditentry
+                FOR EACH ROW EXECUTE FUNCTION shareholders_auditentry_append_only()
+            """)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            schema_editor.execute("DROP TRIGGER IF EXISTS shareholders_auditentry_append_only ON shareholders_auditentry")
+            schema_editor.execute("DROP FUNCTION IF EXISTS shareholders_auditentry_append_only()")
+
+    def describe(self):
+        return "Forbid UPDATE and DELETE on audit entries (PostgreSQL)"
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shareholders', '0011_corporate_action'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sequence', models.PositiveBigIntegerField(unique=True)),
+                ('created_at', models.DateTimeField()),
+                ('user_id', models.PositiveIntegerField(blank=True, null=True)),
+                ('username', models.CharField(blank=True, max_length=150)),
+                ('model', models.CharField(max_length=100)),
+                ('object_id', models.CharField(max_length=64)),
+                ('action', models.CharField(choices=[('CREATE', 'Created'), ('UPDATE', 'Updated'), ('DELETE', 'Deleted')], max_length=10)),
+                ('changes', models.TextField(help_text='Canonical JSON of {field: [old, new]}')),
+                ('previous_hash', models.CharField(max_length=64)),
+                ('entry_hash', models.CharField(max_length=64)),
+            ],
+            options={
+                'verbose_name': 'Audit Entry',
+                'verbose_name_plural': 'Audit Entries',
+                'ordering': ['sequence'],
+                'indexes': [models.Index(fields=['model', 'object_id'], name='audit_object_idx')],
+            },
+        ),
+        ForbidAuditChangesOnPostgres(),
+    ]
@@ -0,0 +1,37 @@
+from django.db import migrations
+
+
+def refuse_legacy_splits(apps, schema_editor):
+    """
+    SPLIT transactions used to leave balances alone; they now add to the
+    holding. Stop if any were recorded outside a corporate action, rather
+    than silently changing the register they describe.
+    """
+    Transaction = apps.get_model('shareholders', 'Transaction')
+    CorporateAction = apps.get_model('shareholders', 'CorporateAction')
+    references = [f"CORPORATE-ACTION-{pk}" for pk in CorporateAction.objects.values_list('pk', flat=True)]
+    legacy = (
+        Transaction.objects.filter(transaction_type='SPLIT')
+        .exclude(reference_number__in=references)
+        .order_by('pk')
+        .values_list('pk', flat=True)
+    )
+    count = legacy.count()
+    if count:
+        shown = ', '.join(str(pk) for pk in legacy[:20])
+        raise RuntimeError(
+            f"{count} SPLIT transaction(s) predate corporate actions (ids {shown}{'...' if count > 20 else ''}). "
+            "SPLIT now adds to the holding, which these never did. Re-type them as ADJUSTMENT to keep "
+            "their old meaning, or record the split they describe as a corporate action, then migrate again."
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shareholders', '0012_audit_log'),
+    ]
+
+    operations = [
+        migrations.RunPython(refuse_legacy_splits, migrations.RunPython.noop),
+    ]
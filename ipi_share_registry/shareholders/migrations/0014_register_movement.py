@@ -0,0 +1,53 @@
+# Generated by Django 4.2.30 on 2026-10-17 09:12
+
+from django.db import migrations, models
+
+
+def totals_to_movements(apps, schema_editor):
+    """Turn the running register totals kept in the cap table into per-date movements."""
+    CapTableSnapshot = apps.get_model('shareholders', 'CapTableSnapshot')
+    RegisterMovement = apps.get_model('shareholders', 'RegisterMovement')
+    totals = CapTableSnapshot.objects.filter(shareholder__isnull=True).order_by('as_of_date')
+    movements = []
+    previous = 0
+    for as_of_date, shares in totals.values_list('as_of_date', 'shares'):
+        movements.append(RegisterMovement(as_of_date=as_of_date, shares=shares - previous))
+        previous = shares
+    RegisterMovement.objects.bulk_create(movements, batch_size=1000)
+    totals.delete()
+
+
+def movements_to_totals(apps, schema_editor):
+    CapTableSnapshot = apps.get_model('shareholders', 'CapTableSnapshot')
+    RegisterMovement = apps.get_model('shareholders', 'RegisterMovement')
+    totals = []
+    total = 0
+    for as_of_date, shares in RegisterMovement.objects.order_by('as_of_date').values_list('as_of_date', 'shares'):
+        total += shares
+        totals.append(CapTableSnapshot(shareholder=None, as_of_date=as_of_date, shares=total))
+    CapTableSnapshot.objects.bulk_create(totals, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shareholders', '0013_refuse_legacy_split_transactions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RegisterMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('as_of_date', models.DateField(unique=True)),
+                ('shares', models.DecimalField(decimal_places=2, default=0, help_text='Shares added to (or, if negative, removed from) the register on this date', max_digits=20)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Register Movement',
+                'verbose_name_plural': 'Register Movements',
+                'ordering': ['-as_of_date'],
+            },
+        ),
+        migrations.RunPython(totals_to_movements, movements_to_totals),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-17 09:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shareholders', '0014_register_movement'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='captablesnapshot',
+            name='unique_register_total_per_date',
+        ),
+        migrations.AlterField(
+            model_name='captablesnapshot',
+            name='shareholder',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cap_table_snapshots', to='shareholders.shareholder'),
+        ),
+    ]
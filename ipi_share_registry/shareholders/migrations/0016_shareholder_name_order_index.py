@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-17 09:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shareholders', '0015_captablesnapshot_shareholder_required'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='shareholder',
+            index=models.Index(fields=['full_name', 'id'], name='shareholder_name_order_idx'),
+        ),
+        migrations.RemoveIndex(
+            model_name='shareholder',
+            name='shareholder_full_na_b66421_idx',
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-17 01:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shareholders', '0016_shareholder_name_order_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='shareholder',
+            index=models.Index(fields=['photo'], name='shareholder_photo_idx'),
+        ),
+    ]
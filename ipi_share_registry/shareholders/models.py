@@ -1,3 +1,5 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector
 from django.db import models, transaction
 from django.contrib.auth.models import User
 from django.utils import timezone
@@ -47,7 +49,70 @@ class Company(models.Model):
         return company
 
 
-class Shareholder(models.Model):
+class TrackedFieldsMixin:
+    """
+    Remember the database value of every loaded field, so save() and the
+    audit log (``shareholders.audit``) can tell what changed without
+    re-reading the row. save() and refresh_from_db() keep the snapshot in
+    step with the database.
+    """
+    # Fields left out of audit entries
+    audit_exclude = ('created_at', 'updated_at')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def get_loaded_value(self, field_name):
+        """The value of ``field_name`` as last read from or written to the database."""
+        if self._state.adding:
+            return None
+        attname = self._meta.get_field(field_name).attname
+        loaded = getattr(self, '_loaded_values', {})
+        if attname not in loaded:
+            # Built by hand with a pk, or loaded with the field deferred
+            loaded[attname] = (
+                type(self)._default_manager.filter(pk=self.pk)
+                .values_list(attname, flat=True)
+                .first()
+            )
+            self._loaded_values = loaded
+        return loaded[attname]
+
+    def has_changed(self, field_name):
+        if self._state.adding:
+            return True
+        return self.get_loaded_value(field_name) != getattr(self, self._meta.get_field(field_name).attname)
+
+    def save(self, *args, **kwargs):
+        # post_save receivers still see the values the row had before
+        super().save(*args, **kwargs)
+        self._reset_tracking(kwargs.get('update_fields'))
+
+    def refresh_from_db(self, using=None, fields=None):
+        super().refresh_from_db(using=using, fields=fields)
+        self._reset_tracking(fields)
+
+    def _reset_tracking(self, fields=None):
+        """Note the current values as loaded: all of them, or only ``fields``, which now match the database."""
+        if fields is None:
+            loaded = {}
+        else:
+            # Other fields may hold unsaved edits
+            loaded, fields = getattr(self, '_loaded_values', {}), set(fields)
+        deferred = self.get_deferred_fields()
+        for field in self._meta.concrete_fields:
+            if field.attname in deferred:
+                continue
+            if fields is not None and field.name not in fields and field.attname not in fields:
+                continue
+            loaded[field.attname] = field.value_from_object(self)
+        self._loaded_values = loaded
+
+
+class Shareholder(TrackedFieldsMixin, models.Model):
     GENDER_CHOICES = [
         ('M', 'Male'),
         ('F', 'Female'),
@@ -100,8 +165,23 @@ class Shareholder(models.Model):
         verbose_name_plural = 'Shareholders'
         indexes = [
             models.Index(fields=['id_number']),
-            models.Index(fields=['full_name']),
+            # Name order for the keyset-paginated lists; also serves lookups by name
+            models.Index(fields=['full_name', 'id'], name='shareholder_name_order_idx'),
             models.Index(fields=['is_active']),
+            # Thumbnail requests check the photo belongs to a shareholder
+            models.Index(fields=['photo'], name='shareholder_photo_idx'),
+            # Shareholder search (PostgreSQL only, see shareholders.search)
+            GinIndex(
+                SearchVector('full_name', 'id_number', 'email', 'phone_number', 'city', config='simple'),
+                name='shareholder_search_idx',
+            ),
+            GinIndex(fields=['full_name'], opclasses=['gin_trgm_ops'], name='shareholder_name_trgm_idx'),
+        ]
+        constraints = [
+            models.CheckConstraint(
+                check=models.Q(total_shares__gte=0),
+                name='shareholder_total_shares_non_negative'
+            )
         ]
 
     def __str__(self):
@@ -116,6 +196,21 @@ class Shareholder(models.Model):
             return f"{names[0][0]}{names[-1][0]}".upper()
         return self.full_name[:2].upper()
     
+    @classmethod
+    def adjust_total_shares(cls, shareholder_id, delta):
+        """
+        Atomically add ``delta`` (negative to remove) to a shareholder's total
+        shares in the database, refusing to take the balance below zero.
+        """
+        delta = int(delta)
+        if not delta:
+            return
+        rows = cls.objects.filter(pk=shareholder_id)
+        if delta < 0:
+            rows = rows.filter(total_shares__gte=-delta)
+        if not rows.update(total_shares=models.F('total_shares') + delta):
+            raise ValidationError("Shareholder cannot have negative shares")
+
     def get_absolute_url(self):
         from django.urls import reverse
         return reverse('shareholders:shareholder_detail', args=[str(self.id)])
@@ -194,7 +289,7 @@ class Director(models.Model):
         return self.position
 
 
-class Transaction(models.Model):
+class Transaction(TrackedFieldsMixin, models.Model):
     """
     Represents a share transaction in the system.
     """
@@ -212,6 +307,13 @@ class Transaction(models.Model):
         ("SPLIT", "Stock Split"),
         ("OTHER", "Other"),
     ]
+
+    # Transaction types that add to or remove from a shareholder's balance; a
+    # SPLIT records the shares a split adds to the holding
+    CREDIT_TYPES = ['ISSUE', 'PURCHASE', 'TRANSFER_IN', 'BONUS', 'RIGHTS', 'SPLIT']
+    DEBIT_TYPES = ['BUYBACK', 'TRANSFER_OUT']
+    # Fields that decide where a completed transaction lands in the cap table
+    LEDGER_FIELDS = ('shareholder', 'transaction_type', 'shares', 'transaction_date')
     
     STATUS_CHOICES = [
         ('DRAFT', 'Draft'),
@@ -223,6 +325,10 @@ class Transaction(models.Model):
         ('REVERSED', 'Reversed'),
     ]
 
+    # Statuses from which can_be_approved()/can_be_completed() allow a transition
+    APPROVABLE_STATUSES = ['DRAFT', 'PENDING']
+    COMPLETABLE_STATUSES = ['APPROVED', 'PENDING']
+
     # Core Fields
     shareholder = models.ForeignKey(
         Shareholder,
@@ -332,6 +438,9 @@ class Transaction(models.Model):
             models.Index(fields=['status']),
             models.Index(fields=['transaction_type']),
             models.Index(fields=['shareholder']),
+            # Transaction history ordering, unfiltered and per shareholder
+            models.Index(fields=['-created_at', 'id'], name='transaction_history_idx'),
+            models.Index(fields=['shareholder', '-created_at', 'id'], name='transaction_holder_history_idx'),
         ]
     
     def __str__(self):
@@ -342,50 +451,79 @@ class Transaction(models.Model):
         if self.price_per_share is not None and self.shares is not None:
             self.total_amount = self.price_per_share * self.shares
             
-        # Set approval date when status changes to APPROVED
-        if self.pk:
-            old_instance = Transaction.objects.get(pk=self.pk)
-            if old_instance.status != self.status and self.status == 'APPROVED':
-                self.approval_date = timezone.now()
-            if old_instance.status != self.status and self.status == 'COMPLETED':
-                self.completion_date = timezone.now()
-                
-        super().save(*args, **kwargs)
+        # Set approval/completion dates when the status changes
+        previous_status = self.get_loaded_value('status')
+        timestamp_fields = []
+        if previous_status != self.status and self.status == 'APPROVED':
+            self.approval_date = timezone.now()
+            timestamp_fields.append('approval_date')
+        if previous_status != self.status and self.status == 'COMPLETED':
+            self.completion_date = timezone.now()
+            timestamp_fields.append('completion_date')
+        if kwargs.get('update_fields') is not None and timestamp_fields:
+            kwargs['update_fields'] = set(kwargs['update_fields']) | set(timestamp_fields)
+
+        # An edit to a completed row moves its shares in the cap table
+        was_completed = previous_status == 'COMPLETED'
+        saved = kwargs.get('update_fields')
+        moved = was_completed and self.status == 'COMPLETED' and any(
+            self.has_changed(name) for name in self.LEDGER_FIELDS if saved is None or name in saved
+        )
+        if moved:
+            previous = Transaction(**{
+                self._meta.get_field(name).attname: self.get_loaded_value(name) for name in self.LEDGER_FIELDS
+            })
+
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+            # Keep the cap table snapshot in step with the completed ledger
+            from .captable import record_transaction
+            if was_completed != (self.status == 'COMPLETED'):
+                record_transaction(self, reverse=was_completed)
+            elif moved:
+                record_transaction(previous, reverse=True)
+                record_transaction(self)
     
     def can_be_approved(self):
         """Check if the transaction can be approved."""
-        return self.status in ['DRAFT', 'PENDING']
+        return self.status in self.APPROVABLE_STATUSES
     
     def can_be_completed(self):
         """Check if the transaction can be marked as completed."""
-        return self.status in ['APPROVED', 'PENDING']
+        return self.status in self.COMPLETABLE_STATUSES
     
     def can_be_cancelled(self):
         """Check if the transaction can be cancelled."""
         return self.status in ['DRAFT', 'PENDING', 'APPROVED']
     
+    @property
+    def signed_shares(self):
+        """Shares added to (positive) or removed from (negative) the holder's balance."""
+        if self.transaction_type in self.CREDIT_TYPES:
+            return self.shares
+        if self.transaction_type in self.DEBIT_TYPES:
+            return -self.shares
+        return 0
+
     def update_shareholder_balance(self):
         """Update the shareholder's total shares based on this transaction."""
         if self.status != 'COMPLETED':
             return False
             
         with transaction.atomic():
-            shareholder = self.shareholder
-            if self.transaction_type in ['ISSUE', 'PURCHASE', 'TRANSFER_IN', 'BONUS', 'RIGHTS']:
-                shareholder.total_shares += self.shares
-            elif self.transaction_type in ['BUYBACK', 'TRANSFER_OUT']:
-                shareholder.total_shares -= self.shares
-                if shareholder.total_shares < 0:
-                    raise ValidationError("Shareholder cannot have negative shares")
-            
-            shareholder.save(update_fields=['total_shares'])
+            Shareholder.adjust_total_shares(self.shareholder_id, self.signed_shares)
             self.status = 'COMPLETED'
             self.save(update_fields=['status'])
+
+        # Keep an already-loaded shareholder in step with the database
+        if Transaction.shareholder.is_cached(self):
+            self.shareholder.refresh_from_db(fields=['total_shares'])
             
         return True
 
 
-class ShareTransfer(models.Model):
+class ShareTransfer(TrackedFieldsMixin, models.Model):
     """
     Represents a transfer of shares between two shareholders.
     """
@@ -398,6 +536,9 @@ class ShareTransfer(models.Model):
         ('CANCELLED', 'Cancelled'),
     ]
 
+    APPROVABLE_STATUSES = ['DRAFT', 'PENDING']
+    COMPLETABLE_STATUSES = ['APPROVED', 'PENDING']
+
     # Transfer Details
     transfer_date = models.DateField(
         default=timezone.now,
@@ -533,14 +674,18 @@ class ShareTransfer(models.Model):
         if self.price_per_share is not None and self.shares is not None:
             self.total_amount = self.price_per_share * self.shares
         
-        # Update timestamps based on status changes
-        if self.pk:
-            old_instance = ShareTransfer.objects.get(pk=self.pk)
-            if old_instance.status != self.status:
-                if self.status == 'APPROVED':
-                    self.approved_at = timezone.now()
-                elif self.status == 'COMPLETED':
-                    self.completed_at = timezone.now()
+        # Set approval/completion timestamps when the status changes, as
+        # Transaction does, including for transfers created already approved
+        if self.has_changed('status'):
+            timestamp_field = None
+            if self.status == 'APPROVED':
+                self.approved_at = timezone.now()
+                timestamp_field = 'approved_at'
+            elif self.status == 'COMPLETED':
+                self.completed_at = timezone.now()
+                timestamp_field = 'completed_at'
+            if timestamp_field and kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = set(kwargs['update_fields']) | {timestamp_field}
         
         super().save(*args, **kwargs)
     
@@ -553,6 +698,27 @@ class ShareTransfer(models.Model):
             raise ValidationError("Only pending or approved transfers can be executed")
         
         with transaction.atomic():
+            # Lock the transfer to stop it being executed twice, then both
+            # parties in primary key order so opposing transfers between the
+            # same holders cannot deadlock
+            locked_status = (
+                ShareTransfer.objects.select_for_update()
+                .filter(pk=self.pk)
+                .values_list('status', flat=True)
+                .get()
+            )
+            if locked_status not in self.COMPLETABLE_STATUSES:
+                raise ValidationError("Only pending or approved transfers can be executed")
+            list(
+                Shareholder.objects.select_for_update()
+                .filter(pk__in=[self.from_shareholder_id, self.to_shareholder_id])
+                .order_by('pk')
+                .values_list('pk', flat=True)
+            )
+
+            Shareholder.adjust_total_shares(self.from_shareholder_id, -self.shares)
+            Shareholder.adjust_total_shares(self.to_shareholder_id, self.shares)
+
             # Create transfer out transaction
             from_tx = Transaction.objects.create(
                 shareholder=self.from_shareholder,
@@ -593,12 +759,400 @@ class ShareTransfer(models.Model):
     
     def can_be_approved(self):
         """Check if the transfer can be approved."""
-        return self.status in ['DRAFT', 'PENDING']
+        return self.status in self.APPROVABLE_STATUSES
     
     def can_be_completed(self):
         """Check if the transfer can be marked as completed."""
-        return self.status in ['APPROVED', 'PENDING']
+        return self.status in self.COMPLETABLE_STATUSES
     
     def can_be_cancelled(self):
         """Check if the transfer can be cancelled."""
         return self.status in ['DRAFT', 'PENDING', 'APPROVED']
+
+
+class CapTableSnapshot(models.Model):
+    """
+    Denormalized holdings: the balance of a shareholder at the end of a date.
+
+    A row exists for every date on which a holder's balance changed, so the
+    balance on any date is the latest row on or before it. The register-wide
+    total is kept in ``RegisterMovement``.
+    """
+    shareholder = models.ForeignKey(
+        Shareholder,
+        on_delete=models.CASCADE,
+        related_name='cap_table_snapshots'
+    )
+    as_of_date = models.DateField()
+    shares = models.DecimalField(
+        max_digits=20,
+        decimal_places=2,
+        default=0,
+        help_text="Shares held at the end of this date"
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-as_of_date']
+        verbose_name = 'Cap Table Snapshot'
+        verbose_name_plural = 'Cap Table Snapshots'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['shareholder', 'as_of_date'],
+                name='unique_holding_per_date'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['as_of_date']),
+        ]
+
+    def __str__(self):
+        return f"{self.shareholder} - {self.shares} shares as of {self.as_of_date}"
+
+
+class RegisterMovement(models.Model):
+    """
+    The net change in shares on the register on a date. The total on any
+    date is the sum of the rows up to it, so a change only ever writes its
+    own date's row.
+    """
+    as_of_date = models.DateField(unique=True)
+    shares = models.DecimalField(
+        max_digits=20,
+        decimal_places=2,
+        default=0,
+        help_text="Shares added to (or, if negative, removed from) the register on this date"
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-as_of_date']
+        verbose_name = 'Register Movement'
+        verbose_name_plural = 'Register Movements'
+
+    def __str__(self):
+        return f"{self.shares:+} shares on {self.as_of_date}"
+
+
+class RegisterCheckpoint(models.Model):
+    """
+    A full copy of the register as it stood at the end of a date.
+
+    Point-in-time queries start from the nearest checkpoint on or before the
+    requested date and only replay the ledger since then.
+    """
+    as_of_date = models.DateField(unique=True)
+    holder_count = models.PositiveIntegerField(default=0)
+    total_shares = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-as_of_date']
+        verbose_name = 'Register Checkpoint'
+        verbose_name_plural = 'Register Checkpoints'
+
+    def __str__(self):
+        return f"Register as of {self.as_of_date} ({self.holder_count} holders)"
+
+
+class RegisterCheckpointLine(models.Model):
+    checkpoint = models.ForeignKey(
+        RegisterCheckpoint,
+        on_delete=models.CASCADE,
+        related_name='lines'
+    )
+    shareholder = models.ForeignKey(
+        Shareholder,
+        on_delete=models.CASCADE,
+        related_name='checkpoint_lines'
+    )
+    shares = models.DecimalField(max_digits=20, decimal_places=2)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['checkpoint', 'shareholder'],
+                name='unique_checkpoint_holding'
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.shareholder_id}: {self.shares} shares @ {self.checkpoint_id}"
+
+
+class ShareholderIdCounter(models.Model):
+    """The last shareholder ID serial issued on a day; see ``shareholders.identifiers``."""
+    day = models.DateField(unique=True)
+    last_value = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Shareholder ID Counter'
+        verbose_name_plural = 'Shareholder ID Counters'
+
+    def __str__(self):
+        return f"{self.day}: {self.last_value}"
+
+
+class Job(models.Model):
+    """A piece of background work, run by ``manage.py run_jobs``; see ``shareholders.jobs``."""
+    STATUS_CHOICES = [
+        ('QUEUED', 'Queued'),
+        ('RUNNING', 'Running'),
+        ('SUCCEEDED', 'Succeeded'),
+        ('FAILED', 'Failed'),
+    ]
+    FINISHED_STATUSES = ['SUCCEEDED', 'FAILED']
+
+    kind = models.CharField(max_length=50)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='QUEUED')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+
+    # Progress, as last reported by the handler
+    progress_current = models.PositiveIntegerField(default=0)
+    progress_total = models.PositiveIntegerField(null=True, blank=True)
+    message = models.CharField(max_length=255, blank=True)
+
+    result = models.JSONField(null=True, blank=True)
+    result_file = models.FileField(upload_to='jobs/results/', blank=True)
+    error = models.TextField(blank=True)
+
+    worker = models.CharField(max_length=100, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    created_by = models.ForeignKey(
+        'auth.User',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='jobs'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='job_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.get_status_display()})"
+
+    @property
+    def label(self):
+        return self.kind.replace('_', ' ').capitalize()
+
+    @property
+    def is_finished(self):
+        return self.status in self.FINISHED_STATUSES
+
+    @property
+    def percent_complete(self):
+        if self.status == 'SUCCEEDED':
+            return 100
+        if not self.progress_total:
+            return None
+        return min(100, round(self.progress_current * 100 / self.progress_total))
+
+
+class DividendRun(models.Model):
+    """
+    A declared dividend and every holder's entitlement to it at the record
+    date; see ``shareholders.dividends``.
+    """
+    STATUS_CHOICES = [
+        ('CALCULATED', 'Calculated'),
+        ('PAID', 'Paid'),
+    ]
+
+    description = models.CharField(max_length=255, blank=True)
+    amount_per_share = models.DecimalField(
+        max_digits=20,
+        decimal_places=6,
+        help_text="Dividend declared per share"
+    )
+    record_date = models.DateField(help_text="Holders on the register at the end of this date are paid")
+    payment_date = models.DateField(null=True, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='CALCULATED')
+
+    # Totals over the lines, stored so listing runs never sums them
+    holder_count = models.PositiveIntegerField(default=0)
+    total_shares = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    total_amount = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    rounding_residue = models.DecimalField(
+        max_digits=20,
+        decimal_places=6,
+        default=0,
+        help_text="Declared amount not paid out because each line is rounded down to the cent"
+    )
+
+    declared_by = models.ForeignKey(
+        'auth.User',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='dividend_runs'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    paid_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-record_date', '-id']
+        verbose_name = 'Dividend Run'
+        verbose_name_plural = 'Dividend Runs'
+
+    def __str__(self):
+        return f"{self.description or 'Dividend'} of {self.amount_per_share} per share, record date {self.record_date}"
+
+
+class DividendLine(models.Model):
+    run = models.ForeignKey(
+        DividendRun,
+        on_delete=models.CASCADE,
+        related_name='lines'
+    )
+    shareholder = models.ForeignKey(
+        Shareholder,
+        on_delete=models.PROTECT,
+        related_name='dividend_lines'
+    )
+    shares = models.DecimalField(max_digits=20, decimal_places=2)
+    amount = models.DecimalField(max_digits=20, decimal_places=2)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['run', 'shareholder'],
+                name='unique_dividend_entitlement'
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.shareholder_id}: {self.amount} on {self.shares} shares @ {self.run_id}"
+
+
+class CorporateAction(models.Model):
+    """
+    A stock split or bonus issue applied across the register; see
+    ``shareholders.corporate_actions``.
+
+    Holders receive ``ratio_new`` shares for every ``ratio_held`` they hold
+    at the effective date: a 2:1 split doubles every holding, a 1:10 bonus
+    adds one share for every ten held.
+    """
+    KIND_CHOICES = [
+        ('SPLIT', 'Stock Split'),
+        ('BONUS', 'Bonus Issue'),
+    ]
+    FRACTION_CHOICES = [
+        ('DOWN', 'Round down'),
+        ('NEAREST', 'Round to nearest'),
+        ('UP', 'Round up'),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    ratio_new = models.PositiveIntegerField()
+    ratio_held = models.PositiveIntegerField()
+    effective_date = models.DateField()
+    fractions = models.CharField(
+        max_length=10,
+        choices=FRACTION_CHOICES,
+        default='DOWN',
+        help_text="How fractional entitlements are rounded to whole shares"
+    )
+    idempotency_key = models.CharField(
+        max_length=100,
+        unique=True,
+        help_text="Applying an action again with the same key returns the first result"
+    )
+    description = models.CharField(max_length=255, blank=True)
+
+    # Totals of the allotment
+    holder_count = models.PositiveIntegerField(default=0)
+    shares_before = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    shares_allotted = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    fractional_shares = models.DecimalField(
+        max_digits=20,
+        decimal_places=6,
+        default=0,
+        help_text="Exact entitlement not allotted because of rounding (negative when rounded up)"
+    )
+
+    applied_by = models.ForeignKey(
+        'auth.User',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='corporate_actions'
+    )
+    applied_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-effective_date', '-id']
+        verbose_name = 'Corporate Action'
+        verbose_name_plural = 'Corporate Actions'
+
+    def __str__(self):
+        return f"{self.ratio_new}:{self.ratio_held} {self.get_kind_display()} on {self.effective_date}"
+
+    @property
+    def reference(self):
+        """Reference number of the transactions this action created."""
+        return f"CORPORATE-ACTION-{self.pk}"
+
+
+class AuditEntryQuerySet(models.QuerySet):
+    def update(self, **kwargs):
+        raise ValidationError("Audit entries cannot be changed")
+
+    def delete(self):
+        raise ValidationError("Audit entries cannot be deleted")
+
+
+class AuditEntry(models.Model):
+    """
+    One change to an audited record, chained to the entry before it by
+    hash; see ``shareholders.audit``. Entries are only ever appended.
+    """
+    ACTION_CHOICES = [
+        ('CREATE', 'Created'),
+        ('UPDATE', 'Updated'),
+        ('DELETE', 'Deleted'),
+    ]
+
+    sequence = models.PositiveBigIntegerField(unique=True)
+    created_at = models.DateTimeField()
+    # Who made the change, copied rather than linked so removing a user
+    # cannot alter the log
+    user_id = models.PositiveIntegerField(null=True, blank=True)
+    username = models.CharField(max_length=150, blank=True)
+    model = models.CharField(max_length=100)
+    object_id = models.CharField(max_length=64)
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    changes = models.TextField(help_text="Canonical JSON of {field: [old, new]}")
+    previous_hash = models.CharField(max_length=64)
+    entry_hash = models.CharField(max_length=64)
+
+    objects = AuditEntryQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['sequence']
+        verbose_name = 'Audit Entry'
+        verbose_name_plural = 'Audit Entries'
+        indexes = [
+            models.Index(fields=['model', 'object_id'], name='audit_object_idx'),
+        ]
+
+    def __str__(self):
+        return f"#{self.sequence} {self.get_action_display()} {self.model} {self.object_id}"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValidationError("Audit entries cannot be changed")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValidationError("Audit entries cannot be deleted")
@@ -0,0 +1,168 @@
+"""
+Point-in-time register queries over the completed transaction ledger.
+
+Holdings as of a date are the signed sum of every completed transaction on
+or before it, computed in one grouped query. ``RegisterCheckpoint`` rows
+cache the full register at earlier dates so a query only has to replay the
+transactions since the nearest checkpoint.
+
+The register pages shown on the dashboard are read holder by holder in name
+order (``register_queryset``), so a page costs the same however large the
+register is; only its totals need the whole register, and those are cached
+per date and ledger version. The version, kept in the cache named by
+``REGISTER_CACHE``, changes whenever the ledger may have (see
+``shareholders.signals``).
+"""
+import calendar
+import time
+from datetime import date
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import DecimalField, ExpressionWrapper, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from dashboard import replicas
+
+from .captable import signed_shares_expression
+from .models import RegisterCheckpoint, RegisterCheckpointLine, Shareholder, Transaction
+
+VERSION_KEY = 'register:ledger-version'
+TOTALS_TIMEOUT = 24 * 60 * 60
+
+
+def _cache():
+    return caches[getattr(settings, 'REGISTER_CACHE', 'default')]
+
+
+def ledger_version():
+    cache = _cache()
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Start from the clock, not 1, so an evicted version can never be
+        # reused while entries cached under it are still around
+        cache.add(VERSION_KEY, time.time_ns(), None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_ledger_version():
+    cache = _cache()
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, time.time_ns(), None)
+
+
+def ledger_deltas(start=None, end=None):
+    """
+    Return ``{shareholder_id: net shares}`` for completed transactions dated
+    after ``start`` (exclusive) and on or before ``end`` (inclusive).
+    """
+    ledger = Transaction.objects.filter(status='COMPLETED')
+    if start is not None:
+        ledger = ledger.filter(transaction_date__gt=start)
+    if end is not None:
+        ledger = ledger.filter(transaction_date__lte=end)
+    rows = (
+        ledger.order_by()
+        .values('shareholder_id')
+        .annotate(delta=Sum(signed_shares_expression()))
+        .values_list('shareholder_id', 'delta')
+    )
+    return dict(rows)
+
+
+def nearest_checkpoint(as_of):
+    return RegisterCheckpoint.objects.filter(as_of_date__lte=as_of).order_by('-as_of_date').first()
+
+
+def holdings_as_of(as_of, use_checkpoints=True):
+    """Return ``{shareholder_id: shares}`` for every non-zero holding at the end of ``as_of``."""
+    balances = {}
+    start = None
+    checkpoint = nearest_checkpoint(as_of) if use_checkpoints else None
+    if checkpoint is not None:
+        balances = dict(checkpoint.lines.values_list('shareholder_id', 'shares'))
+        start = checkpoint.as_of_date
+
+    for shareholder_id, delta in ledger_deltas(start=start, end=as_of).items():
+        balances[shareholder_id] = balances.get(shareholder_id, Decimal('0')) + delta
+
+    return {sid: shares for sid, shares in balances.items() if shares}
+
+
+def register_queryset(as_of):
+    """
+    Shareholders holding shares at the end of ``as_of``, annotated with
+    ``shares``: their line in the nearest checkpoint plus their ledger since,
+    both looked up per holder through its index. Paged in name order, each
+    page reads only the holders on it.
+    """
+    amount = DecimalField(max_digits=20, decimal_places=2)
+    zero = Value(Decimal('0'), output_field=amount)
+    ledger = Transaction.objects.filter(
+        status='COMPLETED', shareholder_id=OuterRef('pk'), transaction_date__lte=as_of
+    )
+    opening = zero
+    checkpoint = nearest_checkpoint(as_of)
+    if checkpoint is not None:
+        ledger = ledger.filter(transaction_date__gt=checkpoint.as_of_date)
+        line = RegisterCheckpointLine.objects.filter(checkpoint=checkpoint, shareholder_id=OuterRef('pk'))
+        opening = Coalesce(Subquery(line.values('shares')[:1], output_field=amount), zero)
+    delta = ledger.order_by().values('shareholder_id').annotate(delta=Sum(signed_shares_expression())).values('delta')
+    return Shareholder.objects.annotate(
+        shares=ExpressionWrapper(opening + Coalesce(Subquery(delta, output_field=amount), zero), output_field=amount)
+    ).filter(~Q(shares=0))
+
+
+def register_totals(as_of):
+    """``(holder_count, total_shares)`` at the end of ``as_of``, computed once per ledger version."""
+    cache = _cache()
+    key = f"register-totals:{as_of}:{ledger_version()}"
+    totals = cache.get(key)
+    if totals is None:
+        # Cached under the primary's version, so read from the primary too
+        with replicas.primary():
+            balances = holdings_as_of(as_of)
+        totals = (len(balances), sum(balances.values(), Decimal('0')))
+        cache.set(key, totals, TOTALS_TIMEOUT)
+    return totals
+
+
+def create_checkpoint(as_of):
+    """Create (or replace) the checkpoint for ``as_of``, building on the previous one."""
+    balances = holdings_as_of(as_of)
+    with transaction.atomic():
+        RegisterCheckpoint.objects.filter(as_of_date=as_of).delete()
+        checkpoint = RegisterCheckpoint.objects.create(
+            as_of_date=as_of,
+            holder_count=len(balances),
+            total_shares=sum(balances.values(), Decimal('0')),
+        )
+        RegisterCheckpointLine.objects.bulk_create(
+            [
+                RegisterCheckpointLine(checkpoint=checkpoint, shareholder_id=sid, shares=shares)
+                for sid, shares in balances.items()
+            ],
+            batch_size=1000,
+        )
+    return checkpoint
+
+
+def invalidate_checkpoints(from_date):
+    """Drop checkpoints made stale by a ledger change dated ``from_date``."""
+    RegisterCheckpoint.objects.filter(as_of_date__gte=from_date).delete()
+
+
+def month_ends(start, end):
+    """Yield the last day of every month from ``start`` up to ``end`` inclusive."""
+    year, month = start.year, start.month
+    while True:
+        last_day = date(year, month, calendar.monthrange(year, month)[1])
+        if last_day > end:
+            return
+        yield last_day
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
@@ -0,0 +1,101 @@
+"""
+Ranked shareholder search over name, ID number, email, phone and city.
+
+On PostgreSQL a query matches on a ``simple``-config search vector (GIN
+expression index, prefix terms), on trigram similarity of the name (typos
+and partial names, ``gin_trgm_ops`` index) or on an exact ID number, and is
+ranked by the sum of the three. Without the pg_trgm extension the trigram
+part is left out. Other databases fall back to ``icontains`` filters with a
+coarser rank so the same calls work in tests.
+"""
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramWordSimilarity
+from django.db import connections
+from django.db.models import Case, F, FloatField, IntegerField, Q, Value, When
+
+from .models import Shareholder
+
+SEARCH_FIELDS = ('full_name', 'id_number', 'email', 'phone_number', 'city')
+SEARCH_CONFIG = 'simple'
+DEFAULT_LIMIT = 20
+MIN_QUERY_LENGTH = 2
+
+
+def search_vector():
+    """The indexed search vector; queries must build it the same way to use the index."""
+    return SearchVector(*SEARCH_FIELDS, config=SEARCH_CONFIG)
+
+
+_trigram_support = {}
+
+
+def has_trigram_support(connection):
+    """Whether pg_trgm is installed on ``connection``'s database (checked once per alias)."""
+    if connection.alias not in _trigram_support:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+            _trigram_support[connection.alias] = cursor.fetchone() is not None
+    return _trigram_support[connection.alias]
+
+
+def _terms(query):
+    return re.findall(r'\w+', query)
+
+
+def prefix_query(query):
+    """A tsquery matching every word of ``query`` as a prefix, or None if it has no words."""
+    terms = _terms(query)
+    if not terms:
+        return None
+    return SearchQuery(' & '.join(f'{term}:*' for term in terms), config=SEARCH_CONFIG, search_type='raw')
+
+
+def filter_shareholders(queryset, query):
+    """Narrow ``queryset`` to shareholders matching ``query``, annotated with a ``rank``."""
+    query = query.strip()
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql':
+        return _filter_postgresql(queryset, query, trigram=has_trigram_support(connection))
+    return _filter_fallback(queryset, query)
+
+
+def _filter_postgresql(queryset, query, trigram=True):
+    condition = Q(id_number=query)
+    rank = Value(0.0, output_field=FloatField())
+    if trigram:
+        condition |= Q(full_name__trigram_word_similar=query)
+        rank = TrigramWordSimilarity(query, 'full_name')
+    tsquery = prefix_query(query)
+    if tsquery is not None:
+        queryset = queryset.annotate(search=search_vector())
+        condition |= Q(search=tsquery)
+        rank = rank + SearchRank(F('search'), tsquery)
+    exact = Case(When(id_number=query, then=Value(1.0)), default=Value(0.0), output_field=FloatField())
+    return queryset.filter(condition).annotate(rank=rank + exact)
+
+
+def _filter_fallback(queryset, query):
+    condition = Q(id_number=query)
+    terms = _terms(query)
+    if terms:
+        words = Q()
+        for term in terms:
+            words &= Q(*[Q(**{f'{field}__icontains': term}) for field in SEARCH_FIELDS], _connector=Q.OR)
+        condition |= words
+    rank = Case(
+        When(id_number=query, then=Value(3)),
+        When(full_name__istartswith=query, then=Value(2)),
+        When(full_name__icontains=query, then=Value(1)),
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+    return queryset.filter(condition).annotate(rank=rank)
+
+
+def search_shareholders(query, limit=DEFAULT_LIMIT, queryset=None):
+    """Return up to ``limit`` shareholders matching ``query``, best match first."""
+    if len(query.strip()) < MIN_QUERY_LENGTH:
+        return Shareholder.objects.none()
+    queryset = Shareholder.objects.all() if queryset is None else queryset
+    return filter_shareholders(queryset, query).order_by('-rank', 'full_name', 'id')[:limit]
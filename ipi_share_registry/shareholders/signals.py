@@ -0,0 +1,63 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from . import audit, captable, register, thumbnails
+from .models import Shareholder, ShareTransfer, Transaction
+
+# Sent by bulk operations that bypass model save()/delete() (bulk_create,
+# queryset.update()) after they change shareholders or the ledger, so
+# listeners relying on post_save/post_delete can still react. ``dates``,
+# when given, are the transaction or join dates the change touched.
+register_changed = Signal()
+
+
+@receiver(post_save, sender=Shareholder)
+def make_photo_thumbnails(sender, instance, update_fields=None, **kwargs):
+    if not instance.photo or (update_fields is not None and 'photo' not in update_fields):
+        return
+    name = instance.photo.name
+    # A failed thumbnail must not fail the save; the serving view retries
+    transaction.on_commit(lambda: thumbnails.generate_quietly(name))
+
+
+@receiver(post_delete, sender=Shareholder)
+def delete_photo_thumbnails(sender, instance, **kwargs):
+    if instance.photo:
+        name = instance.photo.name
+        transaction.on_commit(lambda: thumbnails.delete(name))
+
+
+@receiver(post_save, sender=Transaction)
+@receiver(post_delete, sender=Transaction)
+@receiver(register_changed)
+def ledger_changed(sender, **kwargs):
+    # Cached statements and register totals are keyed by the ledger
+    # version, so moving it on retires them all; done on commit so a
+    # rolled-back change keeps them
+    transaction.on_commit(register.bump_ledger_version)
+
+
+@receiver(post_delete, sender=Transaction)
+def reverse_deleted_transaction(sender, instance, origin=None, **kwargs):
+    if instance.status != 'COMPLETED':
+        return
+    # This also drops register checkpoints from the transaction's date on.
+    # Deleting the holder cascades to their cap table rows too, so only
+    # the register total needs taking back
+    holder_deleted = isinstance(origin, Shareholder) or getattr(origin, 'model', None) is Shareholder
+    captable.record_transaction(instance, reverse=True, holding=not holder_deleted)
+
+
+@receiver(post_save, sender=Shareholder)
+@receiver(post_save, sender=Transaction)
+@receiver(post_save, sender=ShareTransfer)
+def audit_save(sender, instance, created, update_fields=None, **kwargs):
+    audit.record_save(instance, created, update_fields)
+
+
+@receiver(post_delete, sender=Shareholder)
+@receiver(post_delete, sender=Transaction)
+@receiver(post_delete, sender=ShareTransfer)
+def audit_delete(sender, instance, **kwargs):
+    audit.record_delete(instance)
@@ -0,0 +1,217 @@
+"""
+Periodic shareholder statements.
+
+A statement covers one holder over a period: the opening balance, each
+completed transaction in the period with the balance after it, and the
+closing balance and its value. Statements for a batch of holders come from
+one query: a window function keeps each holder's running balance over
+their ledger up to the end of the period, and ``LEAD()`` keeps only the
+rows in the period plus the last row before it, whose running balance is
+the opening balance.
+
+Statements are cached per holder, period and ledger version
+(``register.ledger_version``), which changes whenever the ledger may have
+(see ``shareholders.signals``), so a cached statement is never stale and
+asking again costs only the holder lookup. Statements read from a replica
+are not cached, since it may lag behind the version.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+from functools import partial
+
+import django
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from django.db.models import DateField, F, Sum, Value, Window
+from django.db.models.functions import Lead
+from django.template.loader import render_to_string
+
+from dashboard import replicas
+
+from .captable import signed_shares_expression
+from .models import Shareholder, Transaction
+from .register import ledger_version
+
+BATCH_SIZE = 500
+
+
+def _cache():
+    return caches[getattr(settings, 'STATEMENT_CACHE', 'default')]
+
+
+class StatementLine:
+    __slots__ = ('date', 'transaction_type', 'reference', 'shares', 'price_per_share', 'value', 'balance')
+
+    def __init__(self, date, transaction_type, reference, shares, price_per_share, balance):
+        self.date = date
+        self.transaction_type = transaction_type
+        self.reference = reference
+        self.shares = shares
+        self.price_per_share = price_per_share
+        self.value = abs(shares) * (price_per_share or 0)
+        self.balance = balance
+
+    def get_transaction_type_display(self):
+        return dict(Transaction.TRANSACTION_TYPE_CHOICES).get(self.transaction_type, self.transaction_type)
+
+
+class Statement:
+    __slots__ = ('shareholder_id', 'full_name', 'id_number', 'start', 'end',
+                 'opening_balance', 'lines', 'price_per_share')
+
+    def __init__(self, shareholder_id, full_name, id_number, start, end):
+        self.shareholder_id = shareholder_id
+        self.full_name = full_name
+        self.id_number = id_number
+        self.start = start
+        self.end = end
+        self.opening_balance = Decimal('0')
+        self.lines = []
+        self.price_per_share = Decimal('0')
+
+    @property
+    def closing_balance(self):
+        return self.lines[-1].balance if self.lines else self.opening_balance
+
+    @property
+    def closing_value(self):
+        return self.closing_balance * self.price_per_share
+
+    @property
+    def filename(self):
+        return f"statement-{self.id_number}-{self.start:%Y%m%d}-{self.end:%Y%m%d}.html"
+
+
+def valuation_price(end):
+    """The price of the latest completed, priced transaction on or before ``end``."""
+    return (
+        Transaction.objects.filter(status='COMPLETED', transaction_date__lte=end, price_per_share__gt=0)
+        .order_by('-transaction_date', '-id')
+        .values_list('price_per_share', flat=True)
+        .first()
+    ) or Decimal('0')
+
+
+def ledger_rows(holder_ids, start, end):
+    """
+    ``(shareholder_id, date, type, reference, signed shares, price, balance
+    after)`` for every completed transaction of ``holder_ids`` in the period,
+    preceded per holder by their last transaction before it.
+    """
+    signed = signed_shares_expression()
+    partition = {
+        'partition_by': [F('shareholder_id')],
+        'order_by': [F('transaction_date').asc(), F('id').asc()],
+    }
+    return (
+        Transaction.objects.filter(status='COMPLETED', shareholder_id__in=holder_ids, transaction_date__lte=end)
+        .annotate(
+            signed=signed,
+            balance=Window(Sum(signed), **partition),
+            # The last row of a holder has no successor; treating it as
+            # followed by ``end`` keeps it whichever side of ``start`` it is
+            next_date=Window(Lead('transaction_date', default=Value(end, output_field=DateField())), **partition),
+        )
+        .filter(next_date__gte=start)
+        .order_by('shareholder_id', 'transaction_date', 'id')
+        .values_list('shareholder_id', 'transaction_date', 'transaction_type', 'reference_number',
+                     'signed', 'price_per_share', 'balance')
+    )
+
+
+def compute(holders, start, end, price=None):
+    """Build statements for ``(id, full_name, id_number)`` holder tuples with one ledger query."""
+    price = valuation_price(end) if price is None else price
+    statements = {}
+    for shareholder_id, full_name, id_number in holders:
+        statement = statements[shareholder_id] = Statement(shareholder_id, full_name, id_number, start, end)
+        statement.price_per_share = price
+
+    for shareholder_id, day, transaction_type, reference, signed, line_price, balance in ledger_rows(
+        list(statements), start, end
+    ):
+        statement = statements[shareholder_id]
+        if day < start:
+            statement.opening_balance = balance
+        else:
+            statement.lines.append(StatementLine(day, transaction_type, reference, signed, line_price, balance))
+    return list(statements.values())
+
+
+def _key(holder_id, updated_at, start, end, version):
+    return f"statement:{holder_id}:{updated_at.timestamp()}:{start}:{end}:{version}"
+
+
+def statements_for(queryset, start, end):
+    """Statements for the holders in ``queryset``, in its order, from the cache where possible."""
+    holders = list(queryset.values_list('id', 'full_name', 'id_number', 'updated_at'))
+    cache = _cache()
+    version = ledger_version()
+    keys = {holder[0]: _key(holder[0], holder[3], start, end, version) for holder in holders}
+    cached = cache.get_many(list(keys.values()))
+
+    missing = [holder[:3] for holder in holders if keys[holder[0]] not in cached]
+    price = valuation_price(end) if missing else None
+    computed = {}
+    for batch_start in range(0, len(missing), BATCH_SIZE):
+        for statement in compute(missing[batch_start:batch_start + BATCH_SIZE], start, end, price):
+            computed[keys[statement.shareholder_id]] = statement
+    # A lagging replica may not have the change that moved the version on yet
+    if computed and not replicas.reading_from_replica():
+        cache.set_many(computed, getattr(settings, 'STATEMENT_TIMEOUT', 86400))
+
+    cached.update(computed)
+    return [cached[keys[holder[0]]] for holder in holders]
+
+
+def statement(shareholder_id, start, end):
+    return statements_for(Shareholder.objects.filter(pk=shareholder_id), start, end)[0]
+
+
+def render(statement, company=None):
+    return render_to_string('shareholders/report.html', {
+        'statement': statement,
+        'company': company,
+        'mailing': True,
+    }).encode('utf-8')
+
+
+def default_workers():
+    return getattr(settings, 'STATEMENT_WORKERS', 1)
+
+
+def holder_count(queryset=None):
+    return (Shareholder.objects.all() if queryset is None else queryset).count()
+
+
+def _render_batch(start, end, company, price, holder_ids):
+    holders = (
+        Shareholder.objects.filter(pk__in=holder_ids)
+        .order_by('full_name', 'id')
+        .values_list('id', 'full_name', 'id_number')
+    )
+    return [(s.filename, render(s, company)) for s in compute(holders, start, end, price)]
+
+
+def render_register(start, end, company=None, workers=1, queryset=None):
+    """
+    Yield ``(filename, html bytes)`` for the statement of every holder in
+    ``queryset`` (default: the whole register), ``BATCH_SIZE`` holders per
+    ledger query. A run covers each holder once, so it bypasses the cache
+    rather than flooding it. With ``workers`` > 1 batches are computed and
+    rendered in a process pool, each worker with its own connection.
+    """
+    queryset = Shareholder.objects.all() if queryset is None else queryset
+    holder_ids = list(queryset.order_by('full_name', 'id').values_list('id', flat=True))
+    batches = [holder_ids[i:i + BATCH_SIZE] for i in range(0, len(holder_ids), BATCH_SIZE)]
+    work = partial(_render_batch, start, end, company, valuation_price(end))
+    if workers <= 1 or len(batches) <= 1:
+        for batch in batches:
+            yield from work(batch)
+        return
+    # Forked workers must open their own connections rather than share ours
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers, initializer=django.setup) as pool:
+        for rendered in pool.map(work, batches):
+            yield from rendered
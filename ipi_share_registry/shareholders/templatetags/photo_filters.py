@@ -0,0 +1,9 @@
+from django import template
+
+from shareholders import thumbnails
+
+register = template.Library()
+
+@register.filter(name='thumbnail')
+def thumbnail(photo, size='detail'):
+    return thumbnails.url(photo.name if photo else None, size)
@@ -1,3 +1,1084 @@
-from django.test import TestCase
+import importlib
+import json
+import shutil
+import tempfile
+import re
+import threading
+import zipfile
+from datetime import date, timedelta
+from io import BytesIO, StringIO
+from decimal import Decimal
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.apps import apps as django_apps
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError, close_old_connections, connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from benchmarks import generator, runner
+
+from . import (
+    audit, captable, certificates, corporate_actions, dividends, exporter, identifiers, importer, jobs, register,
+    search, statements, thumbnails, workflow,
+)
+from .forms import DividendRunForm
+from .models import (
+    AuditEntry, CapTableSnapshot, Company, DividendRun, Job, RegisterCheckpoint, RegisterMovement, Shareholder,
+    ShareTransfer, Transaction,
+)
+
+
+class RegistryTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = Company.get_company()
+        cls.alice = Shareholder.objects.create(
+            company=cls.company, full_name='Alice Kila', id_number='SH-TEST-0001', total_shares=1000
+        )
+        cls.bob = Shareholder.objects.create(
+            company=cls.company, full_name='Bob Tau', id_number='SH-TEST-0002'
+        )
+
+
+class StatusTrackingTests(RegistryTestCase):
+    def test_approval_and_completion_dates_are_set_on_transition(self):
+        tx = Transaction.objects.create(
+            shareholder=self.alice, transaction_type='ISSUE', shares=Decimal('10'), status='PENDING'
+        )
+        self.assertIsNone(tx.approval_date)
+
+        tx.status = 'APPROVED'
+        tx.save()
+        tx.refresh_from_db()
+        self.assertIsNotNone(tx.approval_date)
+        self.assertIsNone(tx.completion_date)
+
+        tx.status = 'COMPLETED'
+        tx.save(update_fields=['status'])
+        tx.refresh_from_db()
+        self.assertIsNotNone(tx.completion_date)
+
+    def test_approve_complete_cycle_does_not_reread_the_row(self):
+        tx = Transaction.objects.create(
+            shareholder=self.alice, transaction_type='OTHER', shares=Decimal('10'), status='PENDING'
+        )
+        tx = Transaction.objects.get(pk=tx.pk)
+
+        # One UPDATE per save plus the savepoint pair from save()'s atomic block;
+        # previously each save also issued a SELECT for the old status.
+        with self.assertNumQueries(3):
+            tx.status = 'APPROVED'
+            tx.save()
+        with self.assertNumQueries(3):
+            tx.status = 'COMPLETED'
+            tx.save()
+
+    def test_transfer_timestamps_follow_status(self):
+        transfer = ShareTransfer.objects.create(
+            from_shareholder=self.alice, to_shareholder=self.bob, company=self.company,
+            shares=Decimal('5'), status='PENDING'
+        )
+        transfer = ShareTransfer.objects.get(pk=transfer.pk)
+        with self.assertNumQueries(1):
+            transfer.status = 'APPROVED'
+            transfer.save()
+        self.assertIsNotNone(transfer.approved_at)
+        self.assertIsNone(transfer.completed_at)
+
+    def test_transfers_created_approved_are_stamped_like_transactions(self):
+        transfer = ShareTransfer.objects.create(
+            from_shareholder=self.alice, to_shareholder=self.bob, company=self.company,
+            shares=Decimal('5'), status='APPROVED'
+        )
+        tx = Transaction.objects.create(
+            shareholder=self.alice, transaction_type='ISSUE', shares=Decimal('5'), status='APPROVED'
+        )
+        self.assertIsNotNone(transfer.approved_at)
+        self.assertIsNotNone(tx.approval_date)
+
+    def test_refresh_from_db_resets_the_loaded_status(self):
+        tx = Transaction.objects.create(
+            shareholder=self.bob, transaction_type='ISSUE', shares=Decimal('10'), status='PENDING'
+        )
+        stale = Transaction.objects.get(pk=tx.pk)
+        elsewhere = Transaction.objects.get(pk=tx.pk)
+        elsewhere.status = 'COMPLETED'
+        elsewhere.save()
+        completed_at = Transaction.objects.get(pk=tx.pk).completion_date
+
+        stale.refresh_from_db()
+        stale.notes = 'Edited after completion'
+        stale.save()
+        self.assertEqual(captable.holding(self.bob.pk), Decimal('10'))
+        self.assertEqual(Transaction.objects.get(pk=tx.pk).completion_date, completed_at)
+
+        # A partial refresh only resets the fields it read
+        stale.status = 'CANCELLED'
+        stale.refresh_from_db(fields=['notes'])
+        self.assertTrue(stale.has_changed('status'))
+
+
+class BulkWorkflowTests(RegistryTestCase):
+    def test_complete_transactions_posts_grouped_balances(self):
+        for shares in (Decimal('10'), Decimal('15')):
+            Transaction.objects.create(
+                shareholder=self.bob, transaction_type='ISSUE', shares=shares, status='PENDING'
+            )
+        Transaction.objects.create(
+            shareholder=self.alice, transaction_type='BUYBACK', shares=Decimal('100'), status='DRAFT'
+        )
+
+        self.assertEqual(workflow.approve_transactions(Transaction.objects.all()), 3)
+        self.assertFalse(Transaction.objects.filter(approval_date__isnull=True).exists())
+
+        self.assertEqual(workflow.complete_transactions(Transaction.objects.all()), 3)
+        self.alice.refresh_from_db()
+        self.bob.refresh_from_db()
+        self.assertEqual(self.alice.total_shares, 900)
+        self.assertEqual(self.bob.total_shares, 25)
+        self.assertEqual(captable.holding(self.bob.pk), Decimal('25'))
+
+        # Already completed rows are no longer eligible
+        self.assertEqual(workflow.complete_transactions(Transaction.objects.all()), 0)
+
+    def test_fractional_shares_post_the_same_total_either_way(self):
+        one_by_one = Transaction.objects.create(
+            shareholder=self.alice, transaction_type='ISSUE', shares=Decimal('2.75'), status='APPROVED'
+        )
+        one_by_one.status = 'COMPLETED'
+        one_by_one.save()
+        one_by_one.update_shareholder_balance()
+        for shares in (Decimal('2.75'), Decimal('0.5'), Decimal('0.5')):
+            Transaction.objects.create(shareholder=self.bob, transaction_type='ISSUE', shares=shares, status='APPROVED')
+        workflow.complete_transactions(Transaction.objects.filter(shareholder=self.bob))
+        Transaction.objects.create(shareholder=self.bob, transaction_type='BUYBACK', shares=Decimal('1.5'), status='APPROVED')
+        workflow.complete_transactions(Transaction.objects.filter(shareholder=self.bob))
+
+        self.alice.refresh_from_db()
+        self.bob.refresh_from_db()
+        self.assertEqual(self.alice.total_shares, 1002)
+        self.assertEqual(self.bob.total_shares, 1)
+
+    def test_complete_transfers_creates_both_legs(self):
+        ShareTransfer.objects.create(
+            from_shareholder=self.alice, to_shareholder=self.bob, company=self.company,
+            shares=Decimal('40'), status='APPROVED'
+        )
+        self.assertEqual(workflow.complete_transfers(ShareTransfer.objects.all()), 1)
+
+        self.alice.refresh_from_db()
+        self.bob.refresh_from_db()
+        self.assertEqual(self.alice.total_shares, 960)
+        self.assertEqual(self.bob.total_shares, 40)
+        self.assertEqual(
+            set(Transaction.objects.values_list('transaction_type', flat=True)),
+            {'TRANSFER_IN', 'TRANSFER_OUT'},
+        )
+        self.assertEqual(ShareTransfer.objects.get().status, 'COMPLETED')
+
+
+class CapTableTests(RegistryTestCase):
+    def complete(self, holder, shares, day, transaction_type='ISSUE'):
+        return Transaction.objects.create(
+            shareholder=holder, transaction_type=transaction_type, shares=Decimal(shares),
+            transaction_date=day, status='COMPLETED',
+        )
+
+    def test_register_total_writes_only_the_changed_date(self):
+        self.complete(self.alice, '100', date(2025, 1, 1))
+        self.complete(self.bob, '50', date(2025, 3, 1))
+        later = RegisterMovement.objects.get(as_of_date=date(2025, 3, 1))
+
+        self.complete(self.alice, '7', date(2025, 2, 1))
+        self.assertEqual(RegisterMovement.objects.get(as_of_date=date(2025, 3, 1)).updated_at, later.updated_at)
+        self.assertEqual(
+            [captable.register_total(day) for day in (date(2025, 1, 31), date(2025, 2, 28), date(2025, 3, 31))],
+            [Decimal('100'), Decimal('107'), Decimal('157')],
+        )
+
+    def test_edits_to_a_completed_transaction_are_reapplied(self):
+        tx = self.complete(self.alice, '100', date(2025, 1, 1))
+
+        tx.shares = Decimal('80')
+        tx.transaction_date = date(2025, 2, 1)
+        tx.save()
+        self.assertEqual(captable.holding(self.alice.pk, date(2025, 1, 31)), Decimal('0'))
+        self.assertEqual(captable.holding(self.alice.pk), Decimal('80'))
+        self.assertEqual(captable.register_total(date(2025, 1, 31)), Decimal('0'))
+
+        tx.shareholder = self.bob
+        tx.transaction_type = 'BUYBACK'
+        tx.save()
+        self.assertEqual(captable.holding(self.alice.pk), Decimal('0'))
+        self.assertEqual(captable.holding(self.bob.pk), Decimal('-80'))
+        self.assertEqual(captable.register_total(), Decimal('-80'))
+
+        # Fields left out of update_fields are not saved, so not applied
+        tx.shares = Decimal('5')
+        tx.save(update_fields=['notes'])
+        self.assertEqual(captable.holding(self.bob.pk), Decimal('-80'))
+
+    def test_deleting_a_completed_transaction_reverses_it(self):
+        self.complete(self.alice, '100', date(2025, 1, 1))
+        tx = self.complete(self.alice, '40', date(2025, 2, 1))
+        Transaction.objects.create(
+            shareholder=self.bob, transaction_type='ISSUE', shares=Decimal('9'),
+            transaction_date=date(2025, 2, 1), status='PENDING',
+        ).delete()
+        self.assertEqual(captable.register_total(), Decimal('140'))
+
+        tx.delete()
+        self.assertEqual(captable.holding(self.alice.pk), Decimal('100'))
+        self.assertEqual(captable.register_total(), Decimal('100'))
+
+        # A deleted holder takes their shares off the register with them
+        self.complete(self.bob, '30', date(2025, 3, 1))
+        self.bob.delete()
+        self.assertEqual(captable.register_total(), Decimal('100'))
+        self.assertFalse(CapTableSnapshot.objects.filter(shareholder_id=self.bob.pk).exists())
+
+    def test_rebuild_matches_incremental_maintenance(self):
+        self.complete(self.alice, '100', date(2025, 1, 1))
+        self.complete(self.bob, '30', date(2025, 1, 1))
+        self.complete(self.alice, '20', date(2025, 4, 1), transaction_type='BUYBACK')
+        incremental = list(RegisterMovement.objects.order_by('as_of_date').values_list('as_of_date', 'shares'))
+
+        captable.rebuild()
+        self.assertEqual(
+            list(RegisterMovement.objects.order_by('as_of_date').values_list('as_of_date', 'shares')), incremental
+        )
+        self.assertEqual(captable.register_total(), Decimal('110'))
+
+
+class RegisterTests(RegistryTestCase):
+    def setUp(self):
+        register._cache().clear()
+        for holder, kind, shares, day in [
+            (self.alice, 'ISSUE', 100, date(2025, 1, 10)),
+            (self.bob, 'ISSUE', 40, date(2025, 2, 10)),
+            (self.alice, 'BUYBACK', 100, date(2025, 3, 10)),
+            (self.bob, 'ISSUE', 5, date(2025, 4, 10)),
+        ]:
+            Transaction.objects.create(
+                shareholder=holder, transaction_type=kind, shares=Decimal(shares),
+                transaction_date=day, status='COMPLETED',
+            )
+
+    def test_checkpoints_give_the_same_holdings_as_the_ledger(self):
+        checkpoint = register.create_checkpoint(date(2025, 2, 28))
+        self.assertEqual((checkpoint.holder_count, checkpoint.total_shares), (2, Decimal('140')))
+        for day in (date(2025, 2, 28), date(2025, 3, 31), date(2025, 4, 30)):
+            self.assertEqual(register.holdings_as_of(day), register.holdings_as_of(day, use_checkpoints=False))
+        # Alice's holding went back to zero, so she drops off the register
+        self.assertEqual(register.holdings_as_of(date(2025, 4, 30)), {self.bob.pk: Decimal('45')})
+
+    def test_backdated_completion_invalidates_later_checkpoints(self):
+        register.create_checkpoint(date(2025, 1, 31))
+        register.create_checkpoint(date(2025, 3, 31))
+        Transaction.objects.create(
+            shareholder=self.bob, transaction_type='ISSUE', shares=Decimal('7'),
+            transaction_date=date(2025, 2, 1), status='COMPLETED',
+        )
+        self.assertEqual(
+            list(RegisterCheckpoint.objects.values_list('as_of_date', flat=True)), [date(2025, 1, 31)]
+        )
+        self.assertEqual(register.holdings_as_of(date(2025, 3, 31))[self.bob.pk], Decimal('47'))
+
+    def test_deleting_a_backdated_transaction_invalidates_later_checkpoints(self):
+        register.create_checkpoint(date(2025, 1, 31))
+        register.create_checkpoint(date(2025, 2, 28))
+        Transaction.objects.get(shareholder=self.bob, transaction_date=date(2025, 2, 10)).delete()
+        self.assertEqual(
+            list(RegisterCheckpoint.objects.values_list('as_of_date', flat=True)), [date(2025, 1, 31)]
+        )
+        self.assertEqual(register.holdings_as_of(date(2025, 2, 28)), {self.alice.pk: Decimal('100')})
+        self.assertEqual(register.holdings_as_of(date(2025, 4, 30)), {self.bob.pk: Decimal('5')})
+
+    def test_register_queryset_matches_holdings_with_or_without_a_checkpoint(self):
+        expected = {self.alice.pk: Decimal('100'), self.bob.pk: Decimal('40')}
+        rows = register.register_queryset(date(2025, 2, 28)).order_by('full_name', 'id')
+        self.assertEqual({row.pk: row.shares for row in rows}, expected)
+        register.create_checkpoint(date(2025, 1, 31))
+        rows = register.register_queryset(date(2025, 2, 28))
+        self.assertEqual({row.pk: row.shares for row in rows}, expected)
+        self.assertEqual([row.pk for row in register.register_queryset(date(2025, 4, 30))], [self.bob.pk])
+
+    def test_totals_are_cached_until_the_ledger_changes(self):
+        self.assertEqual(register.register_totals(date(2025, 4, 30)), (1, Decimal('45')))
+        with self.assertNumQueries(0):
+            register.register_totals(date(2025, 4, 30))
+        with self.captureOnCommitCallbacks(execute=True):
+            Transaction.objects.create(
+                shareholder=self.alice, transaction_type='ISSUE', shares=Decimal('5'),
+                transaction_date=date(2025, 4, 1), status='COMPLETED',
+            )
+        self.assertEqual(register.register_totals(date(2025, 4, 30)), (2, Decimal('50')))
+
+
+class SearchTests(RegistryTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.carol = Shareholder.objects.create(
+            company=cls.company, full_name='Carol Kila', id_number='SH-TEST-0003',
+            email='carol@example.com', city='Goroka',
+        )
+
+    def test_matches_rank_by_relevance(self):
+        self.assertEqual(set(search.search_shareholders('kila')), {self.alice, self.carol})
+        self.assertEqual(list(search.search_shareholders('carol kila')), [self.carol])
+        self.assertEqual(list(search.search_shareholders('goroka')), [self.carol])
+
+    def test_exact_id_number_ranks_first(self):
+        self.assertEqual(search.search_shareholders('SH-TEST-0002')[0], self.bob)
+
+    def test_short_queries_return_nothing(self):
+        self.assertEqual(list(search.search_shareholders('k')), [])
+
+    def test_suggest_endpoint(self):
+        self.client.force_login(User.objects.create_user('clerk'))
+        response = self.client.get(reverse('shareholders:search_suggest'), {'q': 'carol'})
+        self.assertEqual(response.json()['results'][0]['id_number'], 'SH-TEST-0003')
+
+    def test_search_page_requires_login(self):
+        url = reverse('shareholders:search_shareholder')
+        self.assertEqual(self.client.get(url, {'q': 'kila'}).status_code, 302)
+        self.client.force_login(User.objects.create_user('clerk'))
+        response = self.client.get(url, {'q': 'carol'})
+        self.assertEqual(response.context['shareholder'], self.carol)
+
+
+class IdentifierTests(RegistryTestCase):
+    def test_ids_are_sequential_per_day(self):
+        day = date(2025, 3, 1)
+        first = identifiers.reserve_block(2, day=day)
+        second = identifiers.reserve_block(1, day=day)
+        self.assertEqual(list(first), ['SH-20250301-000001', 'SH-20250301-000002'])
+        self.assertEqual(list(second), ['SH-20250301-000003'])
+
+    def test_allocation_issues_no_existence_checks(self):
+        identifiers.reserve_block(1)
+        with self.assertNumQueries(2):
+            self.assertEqual(len(identifiers.allocate_shareholder_ids(500)), 500)
+
+    def test_counter_starts_above_legacy_numeric_ids(self):
+        Shareholder.objects.create(company=self.company, full_name='Carol Wari', id_number='SH-20250301-000042')
+        Shareholder.objects.create(company=self.company, full_name='Dan Mek', id_number='SH-20250301-7QX2ZK')
+        block = identifiers.reserve_block(1, day=date(2025, 3, 1))
+        self.assertEqual(list(block), ['SH-20250301-000043'])
+
+
+class ThumbnailTests(RegistryTestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+        self.user = User.objects.create_user('viewer', password='pw')
+        self.client.force_login(self.user)
+
+    def photo(self, name='alice.png', size=(640, 480)):
+        output = BytesIO()
+        Image.new('RGB', size, 'navy').save(output, 'PNG')
+        return SimpleUploadedFile(name, output.getvalue(), content_type='image/png')
+
+    def test_saving_a_photo_makes_each_thumbnail(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.alice.photo = self.photo()
+            self.alice.save()
+        for size, (width, height, crop) in thumbnails.SIZES.items():
+            with default_storage.open(thumbnails.thumbnail_name(self.alice.photo.name, size)) as f:
+                image = Image.open(f)
+                self.assertEqual(image.format, 'WEBP')
+                self.assertLessEqual(image.size, (width, height))
+
+    def test_thumbnail_is_made_on_first_request_and_cached(self):
+        self.alice.photo = self.photo()
+        self.alice.save()
+        url = thumbnails.url(self.alice.photo.name, 'avatar')
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/webp')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn('private', response['Cache-Control'])
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_unknown_sizes_and_paths_are_not_served(self):
+        self.assertEqual(self.client.get(reverse('shareholders:photo_thumbnail', args=['huge', 'x.png'])).status_code, 404)
+        self.assertEqual(self.client.get(thumbnails.url('other/x.png', 'avatar')).status_code, 404)
+        self.assertEqual(self.client.get(thumbnails.url('shareholders/photos/missing.png', 'avatar')).status_code, 404)
+
+    def test_only_shareholder_photos_get_thumbnails(self):
+        stray = default_storage.save('shareholders/photos/stray.png', self.photo())
+        self.assertEqual(self.client.get(thumbnails.url(stray, 'avatar')).status_code, 404)
+        self.assertFalse(default_storage.exists(thumbnails.thumbnail_name(stray, 'avatar')))
+
+    def test_oversized_photos_are_skipped(self):
+        Shareholder.objects.filter(pk=self.alice.pk).update(
+            photo=default_storage.save('shareholders/photos/huge.png', self.photo(size=(200, 200)))
+        )
+        with mock.patch.object(Image, 'MAX_IMAGE_PIXELS', 1000):
+            with self.assertRaises(OSError):
+                thumbnails.generate('shareholders/photos/huge.png')
+            self.assertIsNotNone(thumbnails.generate_quietly('shareholders/photos/huge.png')[1])
+            self.assertEqual(self.client.get(thumbnails.url('shareholders/photos/huge.png', 'avatar')).status_code, 404)
+
+    def test_backfill_command_uses_a_process_pool(self):
+        Shareholder.objects.filter(pk=self.alice.pk).update(photo=default_storage.save('shareholders/photos/a.png', self.photo()))
+        Shareholder.objects.filter(pk=self.bob.pk).update(photo=default_storage.save('shareholders/photos/b.png', self.photo()))
+        out = StringIO()
+        call_command('generate_thumbnails', workers=2, stdout=out)
+        self.assertIn('Processed 2 photos', out.getvalue())
+        for name in ('a.png', 'b.png'):
+            for size in thumbnails.SIZES:
+                self.assertTrue(default_storage.exists(thumbnails.thumbnail_name(f'shareholders/photos/{name}', size)))
+
+
+class JobTests(RegistryTestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+
+    def test_import_job_runs_off_the_request_path(self):
+        upload = default_storage.save('jobs/uploads/holders.csv', ContentFile(
+            b"full_name,id_number,total_shares\nCarol Wari,SH-JOB-1,50\nDan Mek,SH-TEST-0001,5\n"
+        ))
+        job = jobs.enqueue('import_shareholders', file=upload)
+
+        self.assertEqual(jobs.work(once=True), 1)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'SUCCEEDED')
+        self.assertEqual((job.result['created'], job.result['error_count']), (1, 1))
+        self.assertEqual(job.progress_current, 2)
+        self.assertTrue(Shareholder.objects.filter(id_number='SH-JOB-1').exists())
+        self.assertFalse(default_storage.exists(upload))
+
+    def test_interrupted_import_resumes_after_its_last_committed_batch(self):
+        rows = [{'full_name': f'Holder {i}', 'total_shares': '1'} for i in range(5)]
+
+        def interrupted():
+            yield from rows[:3]
+            raise OSError("connection reset")
+
+        committed = []
+        with self.assertRaises(OSError):
+            importer.import_shareholders(interrupted(), batch_size=2, progress=committed.append)
+        self.assertEqual(committed, [2])
+        self.assertEqual(Shareholder.objects.filter(full_name__startswith='Holder').count(), 2)
+
+        result = importer.import_shareholders(iter(rows), batch_size=2, skip_rows=committed[-1])
+        self.assertEqual((result.created, result.rows, result.resumed_after), (3, 5, 2))
+        self.assertEqual(Shareholder.objects.filter(full_name__startswith='Holder').count(), 5)
+
+    def test_imported_shares_are_posted_to_the_register(self):
+        rows = [{'full_name': 'Carol Wari', 'total_shares': '50'}, {'full_name': 'Dan Mek'}]
+        importer.import_shareholders(iter(rows))
+        carol = Shareholder.objects.get(full_name='Carol Wari')
+        today = timezone.now().date()
+
+        self.assertEqual(register.holdings_as_of(today)[carol.pk], Decimal('50'))
+        self.assertEqual(captable.register_total(today), Decimal('50'))
+        issue = Transaction.objects.get(shareholder=carol)
+        self.assertEqual((issue.transaction_type, issue.status, issue.shares), ('ISSUE', 'COMPLETED', Decimal('50')))
+        self.assertFalse(Transaction.objects.filter(shareholder__full_name='Dan Mek').exists())
+        carol.refresh_from_db()
+        self.assertEqual(carol.total_shares, 50)
+
+    def test_import_dry_run_writes_nothing(self):
+        rows = [{'full_name': 'Carol Wari'}, {'full_name': 'Dan Mek', 'id_number': 'SH-TEST-0001'}]
+        result = importer.import_shareholders(iter(rows), dry_run=True)
+        self.assertEqual((result.created, result.error_count), (1, 1))
+        self.assertFalse(Shareholder.objects.filter(full_name='Carol Wari').exists())
+
+    def test_unreadable_import_files_fail_without_retrying(self):
+        with self.assertRaisesMessage(ValueError, 'Unreadable XLSX file'):
+            list(importer.iter_rows(BytesIO(b'not a workbook'), 'holders.xlsx'))
+        with self.assertRaisesMessage(ValueError, 'Malformed CSV file at line 2'):
+            list(importer.iter_rows(BytesIO(b'full_name\n' + b'x' * 200000 + b'\n'), 'holders.csv'))
+
+        upload = default_storage.save('jobs/uploads/holders.xlsx', ContentFile(b'PK\x03\x04 truncated'))
+        job = jobs.enqueue('import_shareholders', file=upload)
+        jobs.work(once=True)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('FAILED', 1))
+        self.assertIn('Unreadable XLSX file', job.error)
+        self.assertFalse(default_storage.exists(upload))
+
+    def test_export_job_attaches_its_file(self):
+        job = jobs.enqueue('export', dataset='shareholders')
+        jobs.work(once=True)
+        job.refresh_from_db()
+        with job.result_file.open('rb') as f:
+            lines = f.read().decode().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertIn('Alice Kila', lines[1])
+
+    def test_register_export_lists_holders_and_survives_a_zero_total(self):
+        register._cache().clear()
+        day = date(2025, 1, 10)
+        for holder, kind in ((self.alice, 'ISSUE'), (self.bob, 'BUYBACK')):
+            Transaction.objects.create(
+                shareholder=holder, transaction_type=kind, shares=Decimal('30'), transaction_date=day,
+                status='COMPLETED',
+            )
+        rows = list(exporter.register_rows(day))
+        self.assertEqual(rows[0], exporter.REGISTER_HEADER)
+        self.assertEqual(
+            [row[:3] for row in rows[1:]],
+            [['SH-TEST-0001', 'Alice Kila', Decimal('30')], ['SH-TEST-0002', 'Bob Tau', Decimal('-30')]],
+        )
+        self.assertEqual([row[3] for row in rows[1:]], [None, None])
+
+    def test_exports_write_formula_like_text_as_text(self):
+        rows = [['Name', 'Shares'], ['=HYPERLINK("http://x","y")', Decimal('-5')], ['+1', 3], ['@SUM(A1)', 0],
+                ['-2', 0], ['\tTab', 0], ['Plain - name', 0]]
+        lines = ''.join(exporter.iter_csv(rows)).splitlines()
+        self.assertEqual(lines[1:], [
+            '"\'=HYPERLINK(""http://x"",""y"")",-5', "'+1,3", "'@SUM(A1),0", "'-2,0", "'\tTab,0", 'Plain - name,0',
+        ])
+
+        reimported = list(importer.iter_csv_rows(StringIO(''.join(exporter.iter_csv(rows)))))
+        self.assertEqual([row['full_name'] for row in reimported], [row[0].strip() for row in rows[1:]])
+
+        from openpyxl import load_workbook
+        sheet = load_workbook(exporter.write_xlsx(rows)).active
+        cell = sheet['A2']
+        self.assertEqual((cell.value, cell.data_type), ('=HYPERLINK("http://x","y")', 's'))
+        self.assertEqual(sheet['B2'].value, -5)
+
+    def test_failed_attempts_are_retried_with_backoff(self):
+        calls = []
+
+        def flaky(job, progress):
+            calls.append(job.attempts)
+            if len(calls) == 1:
+                raise ConnectionError("database went away")
+            return {'ok': True}
+
+        with mock.patch.dict(jobs.HANDLERS, {'flaky': flaky}):
+            job = jobs.enqueue('flaky')
+            jobs.work(once=True)
+            job.refresh_from_db()
+            self.assertEqual((job.status, job.attempts), ('QUEUED', 1))
+            self.assertGreater(job.run_after, timezone.now())
+            self.assertEqual(jobs.work(once=True), 0)
+
+            Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+            jobs.work(once=True)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result, calls), ('SUCCEEDED', {'ok': True}, [1, 2]))
+
+    def test_bad_jobs_are_not_retried(self):
+        job = jobs.enqueue('export', dataset='nonsense')
+        jobs.work(once=True)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('FAILED', 1))
+        self.assertIn("Unknown export", job.error)
+
+    def test_jobs_of_unresponsive_workers_are_requeued(self):
+        stale = timezone.now() - timedelta(hours=1)
+        job = jobs.enqueue('export', dataset='shareholders')
+        Job.objects.filter(pk=job.pk).update(status='RUNNING', attempts=1, heartbeat_at=stale)
+        spent = jobs.enqueue('export', dataset='shareholders', max_attempts=1)
+        Job.objects.filter(pk=spent.pk).update(status='RUNNING', attempts=1, heartbeat_at=stale)
+
+        self.assertEqual(jobs.requeue_abandoned(), 1)
+        self.assertEqual(Job.objects.get(pk=job.pk).status, 'QUEUED')
+        self.assertEqual(Job.objects.get(pk=spent.pk).status, 'FAILED')
+
+    def test_running_a_job_renews_its_lease_first(self):
+        stale = timezone.now() - timedelta(hours=1)
+        seen = []
+
+        def slow(job, progress):
+            seen.append(Job.objects.get(pk=job.pk).heartbeat_at)
+            return {}
+
+        with mock.patch.dict(jobs.HANDLERS, {'slow': slow}):
+            job = jobs.enqueue('slow')
+            Job.objects.filter(pk=job.pk).update(status='RUNNING', attempts=1, heartbeat_at=stale)
+            jobs.run(Job.objects.get(pk=job.pk))
+        self.assertGreater(seen[0], stale + timedelta(minutes=59))
+
+    def test_uploads_of_abandoned_jobs_out_of_attempts_are_removed(self):
+        upload = default_storage.save('jobs/uploads/holders.csv', ContentFile(b"full_name\nCarol Wari\n"))
+        job = jobs.enqueue('import_shareholders', file=upload, max_attempts=1)
+        Job.objects.filter(pk=job.pk).update(status='RUNNING', attempts=1, heartbeat_at=timezone.now() - timedelta(hours=1))
+
+        jobs.requeue_abandoned()
+        self.assertEqual(Job.objects.get(pk=job.pk).status, 'FAILED')
+        self.assertFalse(default_storage.exists(upload))
+
+    def test_workflow_job_completes_selected_transfers(self):
+        transfer = ShareTransfer.objects.create(
+            from_shareholder=self.alice, to_shareholder=self.bob, company=self.company,
+            shares=Decimal('100'), status='APPROVED'
+        )
+        job = jobs.enqueue('workflow', target='transfers', action='complete', ids=[transfer.pk])
+        jobs.work(once=True)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result), ('SUCCEEDED', {'processed': 1}))
+        self.bob.refresh_from_db()
+        self.assertEqual(self.bob.total_shares, 100)
+
+    def test_workflow_job_completes_only_the_selected_id_ranges(self):
+        ids = [
+            Transaction.objects.create(
+                shareholder=self.bob, transaction_type='ISSUE', shares=Decimal('1'), status='PENDING'
+            ).pk
+            for _ in range(6)
+        ]
+        selected = ids[:2] + ids[3:5] + ids[5:]
+        ranges = jobs.id_ranges(selected)
+        self.assertEqual(ranges, [[ids[0], ids[1]], [ids[3], ids[5]]])
+
+        job = jobs.enqueue('workflow', target='transactions', action='complete', id_ranges=ranges)
+        with mock.patch.object(jobs, 'RANGES_PER_QUERY', 1):
+            jobs.work(once=True)
+        job.refresh_from_db()
+        self.assertEqual((job.result, job.progress_current, job.progress_total), ({'processed': 5}, 5, 5))
+        self.assertEqual(Transaction.objects.get(pk=ids[2]).status, 'PENDING')
+
+
+class CertificateTests(RegistryTestCase):
+    def test_certificate_is_a_well_formed_pdf(self):
+        template = certificates.CertificateTemplate('IPI Holdings (PNG) Limited', '1-23456')
+        pdf = template.render(certificates.Certificate('C-1', 'Alice Kila', 'SH-1', 1000, date(2025, 3, 1)))
+
+        self.assertTrue(pdf.startswith(b'%PDF-1.4'))
+        self.assertTrue(pdf.endswith(b'%%EOF\n'))
+        for number, offset in enumerate(re.findall(rb'(\d{10}) 00000 n', pdf), start=1):
+            self.assertTrue(pdf[int(offset):].startswith(b'%d 0 obj' % number))
+        startxref = int(pdf.rsplit(b'startxref\n', 1)[1].split(b'\n')[0])
+        self.assertTrue(pdf[startxref:].startswith(b'xref\n'))
+        self.assertIn(b'(IPI Holdings \\(PNG\\) Limited)', pdf)
+
+    def test_holder_certificates_stream_as_a_zip(self):
+        data = b''.join(certificates.iter_zip(certificates.render_all(certificates.holder_certificates())))
+        with zipfile.ZipFile(BytesIO(data)) as archive:
+            names = archive.namelist()
+            self.assertEqual(names, ['certificate---SH-TEST-0001.pdf'])
+            self.assertIn(b'(1,000)', archive.read(names[0]))
+
+    def test_large_batches_render_identically_in_a_process_pool(self):
+        batch = [
+            certificates.Certificate(f'C-{i}', f'Holder {i}', f'SH-{i}', i, date(2025, 3, 1))
+            for i in range(12)
+        ]
+        template = certificates.CertificateTemplate('IPI')
+        inline = list(certificates.render_all(batch, template=template))
+        with mock.patch.multiple(certificates, CHUNK_SIZE=2, POOL_THRESHOLD=4):
+            pooled = list(certificates.render_all(batch, template=template, workers=2))
+        self.assertEqual(pooled, inline)
+
+
+
+class StatementTests(RegistryTestCase):
+    def setUp(self):
+        statements._cache().clear()
+        for day, kind, shares, price in [
+            (date(2024, 6, 1), 'ISSUE', 1000, '2.00'),
+            (date(2025, 2, 1), 'TRANSFER_OUT', 200, '2.50'),
+            (date(2025, 5, 1), 'BONUS', 100, '0'),
+            (date(2026, 1, 1), 'ISSUE', 50, '3.00'),
+        ]:
+            Transaction.objects.create(
+                shareholder=self.alice, transaction_type=kind, shares=Decimal(shares),
+                price_per_share=Decimal(price), transaction_date=day, status='COMPLETED',
+            )
+        Transaction.objects.create(
+            shareholder=self.alice, transaction_type='ISSUE', shares=Decimal('999'),
+            transaction_date=date(2025, 3, 1), status='PENDING',
+        )
+
+    def test_statement_carries_the_balance_into_and_through_the_period(self):
+        statement = statements.statement(self.alice.pk, date(2025, 1, 1), date(2025, 12, 31))
+
+        self.assertEqual(statement.opening_balance, 1000)
+        self.assertEqual(
+            [(line.date, line.shares, line.balance) for line in statement.lines],
+            [(date(2025, 2, 1), -200, 800), (date(2025, 5, 1), 100, 900)],
+        )
+        self.assertEqual(statement.closing_balance, 900)
+        self.assertEqual(statement.closing_value, Decimal('2250'))
+
+    def test_statement_page_requires_login(self):
+        url = reverse('shareholders:shareholder_report', args=[self.alice.pk])
+        self.assertEqual(self.client.get(url).status_code, 302)
+        self.client.force_login(User.objects.create_user('clerk'))
+        response = self.client.get(url, {'start': '2025-01-01', 'end': '2025-12-31'})
+        self.assertEqual(response.context['statement'].opening_balance, 1000)
+
+    def test_holder_without_activity_opens_and_closes_at_their_balance(self):
+        quiet = statements.statement(self.alice.pk, date(2025, 6, 1), date(2025, 12, 31))
+        self.assertEqual((quiet.opening_balance, quiet.lines, quiet.closing_balance), (900, [], 900))
+
+        empty = statements.statement(self.bob.pk, date(2025, 1, 1), date(2025, 12, 31))
+        self.assertEqual((empty.opening_balance, empty.closing_balance), (0, 0))
+
+    def test_statements_are_cached_until_the_ledger_changes(self):
+        period = (date(2025, 1, 1), date(2025, 12, 31))
+        statements.statement(self.alice.pk, *period)
+        # Only the holder lookup; the statement comes from the cache
+        with self.assertNumQueries(1):
+            statements.statement(self.alice.pk, *period)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Transaction.objects.create(
+                shareholder=self.alice, transaction_type='PURCHASE', shares=Decimal('10'),
+                transaction_date=date(2025, 7, 1), status='COMPLETED',
+            )
+        self.assertEqual(statements.statement(self.alice.pk, *period).closing_balance, 910)
+
+    def test_register_run_writes_one_statement_per_holder(self):
+        files = statements.render_register(date(2025, 1, 1), date(2025, 12, 31), company=self.company)
+        data = b''.join(certificates.iter_zip(files))
+        with zipfile.ZipFile(BytesIO(data)) as archive:
+            self.assertEqual(archive.namelist(), [
+                'statement-SH-TEST-0001-20250101-20251231.html',
+                'statement-SH-TEST-0002-20250101-20251231.html',
+            ])
+            self.assertIn(b'Opening balance', archive.read(archive.namelist()[0]))
+
+
+class DividendTests(RegistryTestCase):
+    def setUp(self):
+        for holder, day, kind, shares in [
+            (self.alice, date(2025, 1, 1), 'ISSUE', '333'),
+            (self.bob, date(2025, 1, 1), 'ISSUE', '0.5'),
+            (self.bob, date(2025, 6, 1), 'ISSUE', '1000'),
+        ]:
+            Transaction.objects.create(
+                shareholder=holder, transaction_type=kind, shares=Decimal(shares),
+                transaction_date=day, status='COMPLETED',
+            )
+
+    def test_entitlements_follow_record_date_holdings_rounded_down(self):
+        run = dividends.declare('0.333333', date(2025, 3, 31), description='Interim')
+
+        lines = dict(run.lines.values_list('shareholder_id', 'amount'))
+        self.assertEqual(lines, {self.alice.pk: Decimal('110.99'), self.bob.pk: Decimal('0.16')})
+        run.refresh_from_db()
+        self.assertEqual((run.holder_count, run.total_shares, run.total_amount), (2, Decimal('333.5'), Decimal('111.15')))
+        self.assertEqual(run.rounding_residue, Decimal('0.016556'))
+
+    def test_payment_file_lists_each_holder_once(self):
+        run = dividends.declare('1', date(2025, 12, 31))
+        rows = list(dividends.payment_rows(run))
+        self.assertEqual(rows[0][:4], ['ID Number', 'Full Name', 'Shares', 'Amount'])
+        self.assertEqual([row[:4] for row in rows[1:]], [
+            ('SH-TEST-0001', 'Alice Kila', Decimal('333.00'), Decimal('333.00')),
+            ('SH-TEST-0002', 'Bob Tau', Decimal('1000.50'), Decimal('1000.50')),
+        ])
+
+    def test_paid_runs_cannot_be_recalculated(self):
+        run = dividends.declare('1', date(2025, 12, 31))
+        self.assertEqual(dividends.mark_paid(DividendRun.objects.filter(pk=run.pk)), 1)
+        run.refresh_from_db()
+        with self.assertRaises(ValidationError):
+            dividends.calculate(run)
+
+    def test_rate_must_be_positive(self):
+        with self.assertRaises(ValidationError):
+            dividends.declare('0', date(2025, 12, 31))
+
+    def test_record_date_must_have_passed(self):
+        today = timezone.localdate()
+        for record_date in (today, today + timedelta(days=30)):
+            with self.assertRaises(ValidationError):
+                dividends.declare('1', record_date)
+        self.assertFalse(DividendRun.objects.exists())
+
+        form = DividendRunForm({'amount_per_share': '1', 'record_date': today + timedelta(days=1)})
+        self.assertFalse(form.is_valid())
+        self.assertIn('The record date must have passed', str(form.errors))
+
+
+class CorporateActionTests(RegistryTestCase):
+    def setUp(self):
+        Shareholder.objects.filter(pk=self.bob.pk).update(total_shares=15)
+        for holder, shares in [(self.alice, '1000'), (self.bob, '15')]:
+            Transaction.objects.create(
+                shareholder=holder, transaction_type='ISSUE', shares=Decimal(shares),
+                transaction_date=date(2025, 1, 1), status='COMPLETED',
+            )
+        self.terms = {
+            'kind': 'SPLIT', 'ratio_new': 3, 'ratio_held': 2,
+            'effective_date': date(2025, 6, 30), 'idempotency_key': 'split-2025',
+        }
+
+    def test_split_allots_whole_shares_to_every_holder(self):
+        action, created = corporate_actions.apply(**self.terms)
+
+        self.assertTrue(created)
+        self.assertEqual((action.holder_count, action.shares_allotted, action.fractional_shares),
+                         (2, Decimal('507'), Decimal('0.5')))
+        self.assertEqual(
+            dict(Shareholder.objects.values_list('id_number', 'total_shares')),
+            {'SH-TEST-0001': 1500, 'SH-TEST-0002': 22},
+        )
+        self.assertEqual(captable.holding(self.bob.pk), Decimal('22'))
+        self.assertEqual(captable.register_total(), Decimal('1522'))
+        self.assertEqual(register.holdings_as_of(date(2025, 6, 30)), {self.alice.pk: 1500, self.bob.pk: 22})
+
+    def test_rerun_with_the_same_key_changes_nothing(self):
+        first, _ = corporate_actions.apply(**self.terms)
+        again, created = corporate_actions.apply(**self.terms)
+
+        self.assertFalse(created)
+        self.assertEqual(again.pk, first.pk)
+        self.assertEqual(corporate_actions.transactions(first).count(), 2)
+        self.assertEqual(Shareholder.objects.get(pk=self.alice.pk).total_shares, 1500)
+
+        with self.assertRaises(ValidationError):
+            corporate_actions.apply(**dict(self.terms, ratio_new=2, ratio_held=1))
+
+    def test_dry_run_writes_nothing(self):
+        action, lines = corporate_actions.preview(**dict(self.terms, kind='BONUS', ratio_new=1, fractions='UP'))
+
+        self.assertIsNone(action.pk)
+        self.assertEqual([line[2] for line in lines], [Decimal('500'), Decimal('8')])
+        self.assertEqual(action.fractional_shares, Decimal('-0.5'))
+        self.assertFalse(Transaction.objects.filter(transaction_type='BONUS').exists())
+
+    def test_consolidations_are_refused(self):
+        with self.assertRaises(ValidationError):
+            corporate_actions.apply(**dict(self.terms, ratio_new=1, ratio_held=2))
+
+    def test_migration_refuses_splits_recorded_outside_corporate_actions(self):
+        refuse_legacy_splits = importlib.import_module(
+            'shareholders.migrations.0013_refuse_legacy_split_transactions'
+        ).refuse_legacy_splits
+        corporate_actions.apply(**self.terms)
+        refuse_legacy_splits(django_apps, None)
+
+        Transaction.objects.create(
+            shareholder=self.alice, transaction_type='SPLIT', shares=Decimal('10'),
+            transaction_date=date(2024, 1, 1), status='COMPLETED',
+        )
+        with self.assertRaisesMessage(RuntimeError, '1 SPLIT transaction(s) predate corporate actions'):
+            refuse_legacy_splits(django_apps, None)
+
+
+class AuditTests(RegistryTestCase):
+    def entries(self):
+        return list(AuditEntry.objects.values_list('action', 'model', 'object_id', 'changes'))
+
+    def test_saves_record_only_what_changed(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            tx = Transaction.objects.create(
+                shareholder=self.alice, transaction_type='ISSUE', shares=Decimal('10'), status='PENDING'
+            )
+        tx = Transaction.objects.get(pk=tx.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            tx.shares = Decimal('12.50')
+            tx.notes = 'Corrected'
+            tx.save()
+
+        (created, _, _, _), (action, model, object_id, changes) = self.entries()
+        self.assertEqual((created, action, model, object_id), ('CREATE', 'UPDATE', 'shareholders.transaction', str(tx.pk)))
+        self.assertEqual(json.loads(changes), {'notes': ['', 'Corrected'], 'shares': ['10.00', '12.50']})
+
+    def test_rolled_back_changes_are_not_recorded(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                self.bob.notes = 'Kept'
+                self.bob.save()
+            try:
+                with transaction.atomic():
+                    self.alice.notes = 'Discarded'
+                    self.alice.save()
+                    raise ValueError
+            except ValueError:
+                pass
+        self.assertEqual([entry[2] for entry in self.entries()], [str(self.bob.pk)])
+
+    def test_context_writes_its_changes_at_the_end_attributed_to_its_user(self):
+        user = User.objects.create_user('registrar')
+        with audit.context(user):
+            with self.captureOnCommitCallbacks(execute=True):
+                workflow.complete_transactions(Transaction.objects.filter(pk__in=[
+                    Transaction.objects.create(
+                        shareholder=holder, transaction_type='ISSUE', shares=Decimal('5'), status='PENDING'
+                    ).pk
+                    for holder in (self.alice, self.bob)
+                ]))
+            self.assertFalse(AuditEntry.objects.exists())
+
+        entries = list(AuditEntry.objects.values_list('action', 'username', 'changes'))
+        self.assertEqual([(action, username) for action, username, _ in entries],
+                         [('CREATE', 'registrar')] * 2 + [('UPDATE', 'registrar')] * 2)
+        self.assertEqual(json.loads(entries[-1][2])['status'], ['PENDING', 'COMPLETED'])
+
+    def test_refreshed_values_are_the_old_values_of_the_next_save(self):
+        Shareholder.objects.filter(pk=self.bob.pk).update(city='Lae')
+        self.bob.refresh_from_db()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.bob.city = 'Goroka'
+            self.bob.save()
+        changes = AuditEntry.objects.values_list('changes', flat=True).get()
+        self.assertEqual(json.loads(changes), {'city': ['Lae', 'Goroka']})
+
+    def test_unbuffered_context_writes_each_commit(self):
+        with audit.context(User.objects.create_user('worker'), buffered=False):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.bob.notes = 'First batch'
+                self.bob.save()
+            self.assertEqual(list(AuditEntry.objects.values_list('username', flat=True)), ['worker'])
+
+    def test_verification_finds_an_altered_entry(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for holder in (self.alice, self.bob):
+                holder.notes = 'Checked'
+                holder.save()
+        self.assertEqual(list(audit.verify()), [(2, None)])
+
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                with self.assertRaises(DatabaseError), transaction.atomic():
+                    cursor.execute("UPDATE shareholders_auditentry SET changes = '{}'")
+                cursor.execute("ALTER TABLE shareholders_auditentry DISABLE TRIGGER shareholders_auditentry_append_only")
+            cursor.execute("UPDATE shareholders_auditentry SET changes = '{}' WHERE sequence = 2")
+        self.assertEqual(list(audit.verify()), [(1, 'entry 2 was altered')])
+        with self.assertRaises(CommandError):
+            call_command('verify_audit_log', stdout=StringIO())
+
+class BenchmarkTests(TestCase):
+    def test_generated_balances_match_the_ledger(self):
+        counts = generator.generate(shareholders=30, directors=3, transactions=200, transfers=40, seed=7)
+        self.assertEqual(Shareholder.objects.count(), counts['shareholders'])
+        self.assertEqual(Transaction.objects.count(), counts['transactions'])
+
+        ledger = register.ledger_deltas()
+        for holder in Shareholder.objects.all():
+            self.assertEqual(holder.total_shares, ledger.get(holder.pk, 0))
+            self.assertEqual(captable.holding(holder.pk), holder.total_shares)
+
+    def test_runner_reports_every_scenario(self):
+        generator.generate(shareholders=10, directors=2, transactions=20, transfers=5)
+        results = runner.run(iterations=1, warmup=0)
+        self.assertEqual(set(results['results']), set(runner.SCENARIOS))
+        self.assertEqual(results['meta']['dataset']['shareholders'], 10)
+
+
+class BalanceConcurrencyTests(TransactionTestCase):
+    writers = 50
+
+    def setUp(self):
+        company = Company.get_company()
+        self.alice = Shareholder.objects.create(
+            company=company, full_name='Alice Kila', id_number='SH-TEST-0001', total_shares=10000
+        )
+        self.bob = Shareholder.objects.create(
+            company=company, full_name='Bob Tau', id_number='SH-TEST-0002', total_shares=10000
+        )
+        self.company = company
+
+    def run_concurrently(self, work):
+        barrier = threading.Barrier(self.writers)
+        errors = []
+
+        def worker(i):
+            try:
+                barrier.wait()
+                work(i)
+            except Exception as e:  # surfaced through the assertion below
+                errors.append(e)
+            finally:
+                close_old_connections()
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(self.writers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+    def test_adjust_total_shares_refuses_negative_balance(self):
+        with self.assertRaises(ValidationError):
+            Shareholder.adjust_total_shares(self.bob.pk, -10001)
+        self.bob.refresh_from_db()
+        self.assertEqual(self.bob.total_shares, 10000)
+
+    @skipUnless(connection.vendor == 'postgresql', 'needs concurrent row-level locking')
+    def test_concurrent_completions_lose_no_updates(self):
+        transactions = [
+            Transaction.objects.create(
+                shareholder=self.alice, transaction_type='ISSUE', shares=Decimal('7'), status='COMPLETED'
+            )
+            for _ in range(self.writers)
+        ]
+
+        self.run_concurrently(lambda i: Transaction.objects.get(pk=transactions[i].pk).update_shareholder_balance())
+
+        self.alice.refresh_from_db()
+        self.assertEqual(self.alice.total_shares, 10000 + 7 * self.writers)
+
+    @skipUnless(connection.vendor == 'postgresql', 'needs concurrent row-level locking')
+    def test_opposing_concurrent_transfers_neither_deadlock_nor_lose_updates(self):
+        transfers = []
+        for i in range(self.writers):
+            source, target = (self.alice, self.bob) if i % 2 else (self.bob, self.alice)
+            transfers.append(ShareTransfer.objects.create(
+                from_shareholder=source, to_shareholder=target, company=self.company,
+                shares=Decimal(i + 1), status='APPROVED'
+            ))
+
+        self.run_concurrently(lambda i: ShareTransfer.objects.get(pk=transfers[i].pk).execute_transfer())
+
+        self.alice.refresh_from_db()
+        self.bob.refresh_from_db()
+        moved_to_bob = sum(i + 1 for i in range(self.writers) if i % 2)
+        moved_to_alice = sum(i + 1 for i in range(self.writers) if not i % 2)
+        self.assertEqual(self.alice.total_shares, 10000 - moved_to_bob + moved_to_alice)
+        self.assertEqual(self.bob.total_shares, 10000 + moved_to_bob - moved_to_alice)
+        self.assertEqual(self.alice.total_shares + self.bob.total_shares, 20000)
+
+    @skipUnless(connection.vendor == 'postgresql', 'needs concurrent row-level locking')
+    def test_opposing_concurrent_transfer_batches_do_not_deadlock(self):
+        for i in range(2 * self.writers):
+            source, target = (self.alice, self.bob) if i % 2 else (self.bob, self.alice)
+            ShareTransfer.objects.create(
+                from_shareholder=source, to_shareholder=target, company=self.company,
+                shares=Decimal(1), status='APPROVED'
+            )
+
+        self.run_concurrently(lambda i: workflow.complete_transfers(ShareTransfer.objects.all(), batch_size=2))
+
+        self.assertFalse(ShareTransfer.objects.exclude(status='COMPLETED').exists())
+        self.alice.refresh_from_db()
+        self.bob.refresh_from_db()
+        self.assertEqual((self.alice.total_shares, self.bob.total_shares), (10000, 10000))
+
+    def test_import_reserves_ids_outside_its_batch_transactions(self):
+        in_transaction = []
+        allocate = importer.allocate_shareholder_ids
+
+        def spy(count):
+            in_transaction.append(connection.in_atomic_block)
+            return allocate(count)
+
+        rows = [{'full_name': f'Holder {i}'} for i in range(5)]
+        with mock.patch.object(importer, 'allocate_shareholder_ids', spy):
+            result = importer.import_shareholders(rows, batch_size=2)
+        self.assertEqual(result.created, 5)
+        self.assertEqual(in_transaction, [False, False, False])
+
+    @skipUnless(connection.vendor == 'postgresql', 'needs concurrent row-level locking')
+    def test_concurrent_allocations_never_overlap(self):
+        allocated = []
+        self.run_concurrently(lambda i: allocated.extend(identifiers.allocate_shareholder_ids(10)))
+        self.assertEqual(len(set(allocated)), 10 * self.writers)
@@ -0,0 +1,122 @@
+"""
+Resized WebP copies of shareholder photos.
+
+Each photo gets one thumbnail per entry in ``SIZES``, stored in the same
+storage as the original under ``THUMBNAIL_ROOT/<size>/<photo name>.webp``.
+Thumbnails are made when a photo is saved, by the ``generate_thumbnails``
+command for existing photos, and on first request by
+``views.photo_thumbnail`` if neither has run yet. Upload names are never
+reused, so a thumbnail URL always refers to the same image and can be
+cached for a long time.
+"""
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from io import BytesIO
+
+import django
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.urls import reverse
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_ROOT = 'shareholders/thumbnails'
+# name -> (width, height, crop to fill). Twice the CSS size, for high-DPI screens.
+SIZES = {
+    'avatar': (80, 80, True),
+    'detail': (300, 300, False),
+}
+WEBP_QUALITY = 80
+
+
+def thumbnail_name(photo_name, size):
+    return f"{THUMBNAIL_ROOT}/{size}/{photo_name}.webp"
+
+
+def url(photo_name, size):
+    """URL of the ``size`` thumbnail of ``photo_name``, or None without a photo."""
+    if not photo_name:
+        return None
+    return reverse('shareholders:photo_thumbnail', args=[size, str(photo_name)])
+
+
+def _render(image, size):
+    width, height, crop = SIZES[size]
+    if crop:
+        image = ImageOps.fit(image, (width, height), Image.LANCZOS)
+    else:
+        image = image.copy()
+        image.thumbnail((width, height), Image.LANCZOS)
+    output = BytesIO()
+    image.save(output, 'WEBP', quality=WEBP_QUALITY, method=4)
+    return output.getvalue()
+
+
+def _write(name, data, storage):
+    if storage.exists(name):
+        storage.delete(name)
+    saved = storage.save(name, ContentFile(data))
+    if saved != name:
+        # A concurrent writer got there first; its copy is identical
+        storage.delete(saved)
+
+
+def generate(photo_name, sizes=None, force=False, storage=None):
+    """
+    Write the missing (or, with ``force``, all) thumbnails of ``photo_name``
+    and return the sizes written. Raises ``OSError`` if the original is
+    missing, is not an image or is too large to decode safely.
+    """
+    storage = storage or default_storage
+    sizes = [
+        size for size in (sizes or SIZES)
+        if force or not storage.exists(thumbnail_name(photo_name, size))
+    ]
+    if not sizes:
+        return []
+    with storage.open(photo_name, 'rb') as original:
+        try:
+            image = ImageOps.exif_transpose(Image.open(original))
+            image = image.convert('RGBA' if 'A' in image.getbands() or 'transparency' in image.info else 'RGB')
+        except Image.DecompressionBombError as e:
+            raise OSError(str(e)) from e
+        for size in sizes:
+            _write(thumbnail_name(photo_name, size), _render(image, size), storage)
+    return sizes
+
+
+def generate_quietly(photo_name, force=False):
+    """``generate`` for background callers: returns ``(photo_name, error message or None)``."""
+    try:
+        generate(photo_name, force=force)
+    except Exception as e:
+        logger.warning("Could not make thumbnails for %s: %s", photo_name, e)
+        return photo_name, str(e)
+    return photo_name, None
+
+
+def delete(photo_name, storage=None):
+    storage = storage or default_storage
+    for size in SIZES:
+        name = thumbnail_name(photo_name, size)
+        if storage.exists(name):
+            storage.delete(name)
+
+
+def backfill(photo_names, workers=1, force=False, chunksize=16):
+    """
+    Make thumbnails for ``photo_names`` across ``workers`` processes and
+    yield ``(photo_name, error message or None)`` as each finishes.
+    Decoding and resizing are CPU-bound, so processes rather than threads.
+    """
+    work = partial(generate_quietly, force=force)
+    if workers <= 1:
+        yield from map(work, photo_names)
+        return
+    # Workers only touch storage, never the database, so the parent's
+    # connection is left alone rather than shared with forked children
+    with ProcessPoolExecutor(max_workers=workers, initializer=django.setup) as pool:
+        yield from pool.map(work, photo_names, chunksize=chunksize)
@@ -6,6 +6,8 @@ app_name = 'shareholders'
 urlpatterns = [
     path('', views.home, name='home'),
     path('search/', views.search_shareholder, name='search_shareholder'),
+    path('search/suggest/', views.search_suggest, name='search_suggest'),
     path('update_shares/<int:shareholder_id>/', views.update_shares, name='update_shares'),
+    path('photos/<str:size>/<path:name>', views.photo_thumbnail, name='photo_thumbnail'),
     path('report/<int:shareholder_id>/', views.shareholder_report, name='shareholder_report'),
 ]
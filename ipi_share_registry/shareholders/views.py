@@ -1,36 +1,90 @@
 from django.shortcuts import render, get_object_or_404, redirect
-from django.http import HttpResponse
+from django.contrib.auth.decorators import login_required
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse
+from django.core.exceptions import ValidationError
+from django.core.files.storage import default_storage
+from django.db import transaction as db_transaction
 from django.db.models import Sum
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.dateparse import parse_date
+from django.utils.http import http_date, quote_etag
+
+from dashboard.replicas import read_replica
+from . import search, statements, thumbnails
 from .models import Shareholder, Transaction
 
+SUGGEST_LIMIT = 10
+THUMBNAIL_MAX_AGE = 365 * 24 * 60 * 60
+
 
 def home(request):
     """Render the home page."""
     return render(request, 'shareholders/home.html')
 
 
+@login_required
 def search_shareholder(request):
-    """Search a shareholder by ID number."""
+    """Search shareholders by name, ID number, email, phone or city."""
     query = request.GET.get('q', '').strip()
     shareholder = None
+    results = []
     total_shares = 0
 
     if query:
-        try:
-            shareholder = Shareholder.objects.get(id_number=query)
+        results = list(search.search_shareholders(query))
+        # Show the holder directly on an exact ID match or a single result
+        exact = [s for s in results if s.id_number == query]
+        if exact or len(results) == 1:
+            shareholder = (exact or results)[0]
             # Use related_name from Transaction model
             total_shares = shareholder.transactions.aggregate(Sum('shares'))['shares__sum'] or 0
-        except Shareholder.DoesNotExist:
-            shareholder = None
 
     context = {
         'shareholder': shareholder,
+        'results': results,
         'total_shares': total_shares,
         'query': query
     }
     return render(request, 'shareholders/search.html', context)
 
 
+@login_required
+def search_suggest(request):
+    """Typeahead JSON: the best few matches for ``?q=``."""
+    query = request.GET.get('q', '')
+    matches = search.search_shareholders(query, limit=SUGGEST_LIMIT).values(
+        'id', 'full_name', 'id_number', 'city'
+    )
+    return JsonResponse({'results': list(matches)})
+
+
+@login_required
+def photo_thumbnail(request, size, name):
+    """Serve a photo thumbnail, making it first if it does not exist yet."""
+    # Only current shareholder photos, so a request cannot have any other
+    # stored file decoded and resized
+    if size not in thumbnails.SIZES or not Shareholder.objects.filter(photo=name).exists():
+        raise Http404("No such thumbnail")
+    try:
+        thumbnails.generate(name, sizes=[size])
+    except OSError:
+        raise Http404("No such photo")
+
+    thumbnail = thumbnails.thumbnail_name(name, size)
+    modified = default_storage.get_modified_time(thumbnail)
+    etag = quote_etag(f"{size}-{int(modified.timestamp())}-{default_storage.size(thumbnail)}")
+    last_modified = int(modified.timestamp())
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = FileResponse(default_storage.open(thumbnail, 'rb'), content_type='image/webp')
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    # Private: photos are personal data and the view needs a login
+    patch_cache_control(response, private=True, max_age=THUMBNAIL_MAX_AGE, immutable=True)
+    return response
+
+
 def update_shares(request, shareholder_id):
     """Update shares of a shareholder by creating a transaction."""
     shareholder = get_object_or_404(Shareholder, pk=shareholder_id)
@@ -38,17 +92,26 @@ def update_shares(request, shareholder_id):
     if request.method == 'POST':
         shares = int(request.POST.get('shares', 0))
         transaction_type = request.POST.get('transaction_type', 'ISSUE')
+        if transaction_type not in dict(Transaction.TRANSACTION_TYPE_CHOICES):
+            transaction_type = 'ISSUE'
 
-        Transaction.objects.create(
-            shareholder=shareholder,
-            shares=shares,
-            transaction_type=transaction_type,
-            created_by=request.user if request.user.is_authenticated else None
-        )
-
-        # Optionally update Shareholder's total_shares
-        shareholder.total_shares = shareholder.transactions.aggregate(Sum('shares'))['shares__sum'] or 0
-        shareholder.save(update_fields=['total_shares'])
+        # Post the change as a single atomic increment instead of re-summing
+        # the shareholder's whole transaction history
+        try:
+            with db_transaction.atomic():
+                tx = Transaction.objects.create(
+                    shareholder=shareholder,
+                    shares=shares,
+                    transaction_type=transaction_type,
+                    status='COMPLETED',
+                    created_by=request.user if request.user.is_authenticated else None
+                )
+                tx.update_shareholder_balance()
+        except ValidationError as e:
+            return render(request, 'shareholders/update_shares.html', {
+                'shareholder': shareholder,
+                'error': '; '.join(e.messages),
+            })
 
         return redirect('shareholders:search_shareholder')
 
@@ -58,13 +121,22 @@ def update_shares(request, shareholder_id):
     return render(request, 'shareholders/update_shares.html', context)
 
 
+@login_required
+@read_replica
 def shareholder_report(request, shareholder_id):
-    """Generate a report for a shareholder."""
+    """Show a shareholder's statement for a period (``?start=``/``?end=``, default this year to date)."""
     shareholder = get_object_or_404(Shareholder, pk=shareholder_id)
-    total_shares = shareholder.transactions.aggregate(Sum('shares'))['shares__sum'] or 0
+    today = timezone.localdate()
+    try:
+        start = parse_date(request.GET.get('start') or '') or today.replace(month=1, day=1)
+        end = parse_date(request.GET.get('end') or '') or today
+    except ValueError:
+        raise Http404("Invalid date")
+    if start > end:
+        start, end = end, start
 
     context = {
         'shareholder': shareholder,
-        'total_shares': total_shares
+        'statement': statements.statement(shareholder.pk, start, end),
     }
     return render(request, 'shareholders/report.html', context)
@@ -0,0 +1,225 @@
+"""
+Bulk approval and completion of transactions and share transfers.
+
+Each call locks up to ``batch_size`` eligible rows with
+``select_for_update(skip_locked=True)`` so concurrent runs divide the work
+instead of waiting on each other, then moves them with set-based UPDATEs.
+Eligibility mirrors ``can_be_approved()``/``can_be_completed()`` but is
+evaluated in SQL.
+"""
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, IntegerField, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Cast, Coalesce, Floor
+from django.utils import timezone
+
+from . import audit, captable
+from .models import Shareholder, ShareTransfer, Transaction
+from .signals import register_changed
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+def _lock(queryset, statuses, batch_size):
+    """
+    Lock up to ``batch_size`` rows in ``statuses``, skipping rows locked
+    elsewhere, and return ``{id: status}`` for them.
+    """
+    return dict(
+        queryset.filter(status__in=statuses)
+        .select_for_update(skip_locked=True, of=('self',))
+        .order_by('pk')
+        .values_list('pk', 'status')[:batch_size]
+    )
+
+
+def _audit_status(model, locked, status, **values):
+    """Record the move of the ``locked`` rows to ``status``, and the fields set with it."""
+    set_values = {field: [None, value] for field, value in values.items()}
+    audit.record_updates(model, {pk: dict(set_values, status=[old, status]) for pk, old in locked.items()})
+
+
+def apply_balances(transactions):
+    """
+    Add the signed shares of ``transactions`` to their holders' ``total_shares``
+    in one grouped UPDATE, then bring the cap table snapshot in line.
+    """
+    post_totals(transactions)
+    captable.record_completed(transactions)
+
+
+def whole_signed_shares_expression():
+    """
+    Each transaction's signed shares with the fraction dropped, as
+    ``Shareholder.adjust_total_shares`` does with ``int()``, so a holder's
+    total comes out the same whichever path completed the transaction.
+    """
+    return Case(
+        When(transaction_type__in=Transaction.CREDIT_TYPES, then=Floor('shares')),
+        When(transaction_type__in=Transaction.DEBIT_TYPES, then=-Floor('shares')),
+        default=Value(Decimal('0')),
+        output_field=captable.signed_shares_expression().output_field,
+    )
+
+
+def post_totals(transactions):
+    """Add the signed shares of ``transactions`` to their holders' ``total_shares`` in one grouped UPDATE."""
+    delta = (
+        transactions.filter(shareholder_id=OuterRef('pk'))
+        .order_by()
+        .values('shareholder_id')
+        .annotate(total=Sum(whole_signed_shares_expression()))
+        .values('total')
+    )
+    try:
+        with transaction.atomic():
+            Shareholder.objects.filter(
+                pk__in=transactions.order_by().values('shareholder_id')
+            ).update(
+                total_shares=Cast(
+                    F('total_shares') + Coalesce(Subquery(delta), Value(Decimal('0'))),
+                    output_field=IntegerField(),
+                )
+            )
+    except IntegrityError:
+        raise ValidationError("Shareholder cannot have negative shares")
+
+
+def approve_transactions(queryset, approved_by=None, batch_size=DEFAULT_BATCH_SIZE):
+    """Approve up to ``batch_size`` draft or pending transactions. Returns the number approved."""
+    with transaction.atomic():
+        locked = _lock(queryset, Transaction.APPROVABLE_STATUSES, batch_size)
+        now = timezone.now()
+        approved = Transaction.objects.filter(pk__in=locked).update(
+            status='APPROVED',
+            approval_date=now,
+            approved_by=approved_by,
+            updated_at=now,
+        )
+        if approved:
+            _audit_status(Transaction, locked, 'APPROVED', approval_date=now,
+                          approved_by_id=approved_by.pk if approved_by else None)
+            register_changed.send(sender=Transaction)
+        return approved
+
+
+def complete_transactions(queryset, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Complete up to ``batch_size`` approved or pending transactions and post
+    them to shareholder balances. Returns the number completed.
+    """
+    with transaction.atomic():
+        locked = _lock(queryset, Transaction.COMPLETABLE_STATUSES, batch_size)
+        now = timezone.now()
+        completed = Transaction.objects.filter(pk__in=locked).update(
+            status='COMPLETED',
+            completion_date=now,
+            updated_at=now,
+        )
+        if completed:
+            _audit_status(Transaction, locked, 'COMPLETED', completion_date=now)
+            completed_transactions = Transaction.objects.filter(pk__in=locked)
+            apply_balances(completed_transactions)
+            dates = set(completed_transactions.values_list('transaction_date', flat=True))
+            register_changed.send(sender=Transaction, dates=dates)
+        return completed
+
+
+def approve_transfers(queryset, approved_by=None, batch_size=DEFAULT_BATCH_SIZE):
+    """Approve up to ``batch_size`` draft or pending transfers. Returns the number approved."""
+    with transaction.atomic():
+        locked = _lock(queryset, ShareTransfer.APPROVABLE_STATUSES, batch_size)
+        now = timezone.now()
+        approved = ShareTransfer.objects.filter(pk__in=locked).update(
+            status='APPROVED',
+            approved_at=now,
+            approved_by=approved_by,
+            updated_at=now,
+        )
+        if approved:
+            _audit_status(ShareTransfer, locked, 'APPROVED', approved_at=now,
+                          approved_by_id=approved_by.pk if approved_by else None)
+            register_changed.send(sender=ShareTransfer)
+        return approved
+
+
+def complete_transfers(queryset, completed_by=None, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Execute up to ``batch_size`` approved or pending transfers: bulk-create
+    their TRANSFER_OUT/TRANSFER_IN transactions, post balances and mark the
+    transfers completed. Returns the number completed.
+    """
+    with transaction.atomic():
+        locked = _lock(queryset, ShareTransfer.COMPLETABLE_STATUSES, batch_size)
+        ids = list(locked)
+        if not ids:
+            return 0
+
+        # Lock both legs' holders in pk order before any balance moves, the
+        # order execute_transfer() uses, so concurrent batches never deadlock
+        holder_ids = set()
+        for pair in ShareTransfer.objects.filter(pk__in=ids).values_list('from_shareholder_id', 'to_shareholder_id'):
+            holder_ids.update(pair)
+        list(
+            Shareholder.objects.filter(pk__in=holder_ids)
+            .order_by('pk')
+            .select_for_update()
+            .values_list('pk', flat=True)
+        )
+
+        transfers = ShareTransfer.objects.filter(pk__in=ids).select_related(
+            'from_shareholder', 'to_shareholder'
+        )
+        now = timezone.now()
+        legs = []
+        for transfer in transfers:
+            for shareholder, transaction_type, direction, counterparty in (
+                (transfer.from_shareholder, 'TRANSFER_OUT', 'OUT', f"Transfer to {transfer.to_shareholder.full_name}"),
+                (transfer.to_shareholder, 'TRANSFER_IN', 'IN', f"Transfer from {transfer.from_shareholder.full_name}"),
+            ):
+                legs.append(Transaction(
+                    shareholder=shareholder,
+                    transaction_type=transaction_type,
+                    shares=transfer.shares,
+                    price_per_share=transfer.price_per_share,
+                    total_amount=transfer.total_amount,
+                    transaction_date=transfer.transfer_date,
+                    reference_number=f"TRANSFER-{direction}-{transfer.id}",
+                    certificate_number=transfer.certificate_number,
+                    notes=counterparty,
+                    created_by_id=transfer.created_by_id,
+                    status='COMPLETED',
+                    completion_date=now,
+                ))
+        Transaction.objects.bulk_create(legs)
+        audit.record_created(legs)
+
+        apply_balances(Transaction.objects.filter(pk__in=[leg.pk for leg in legs]))
+
+        completed = ShareTransfer.objects.filter(pk__in=ids).update(
+            status='COMPLETED',
+            completed_at=now,
+            completed_by=completed_by,
+            updated_at=now,
+        )
+        _audit_status(ShareTransfer, locked, 'COMPLETED', completed_at=now,
+                      completed_by_id=completed_by.pk if completed_by else None)
+        register_changed.send(sender=ShareTransfer, dates={leg.transaction_date for leg in legs})
+        return completed
+
+
+def run_in_batches(operation, queryset, batch_size=DEFAULT_BATCH_SIZE, progress=None, **kwargs):
+    """
+    Repeat a bulk operation, one transaction per batch, until no eligible rows
+    remain. ``progress``, if given, is called with the running total.
+    """
+    total = 0
+    while True:
+        processed = operation(queryset, batch_size=batch_size, **kwargs)
+        total += processed
+        if progress:
+            progress(total)
+        if processed < batch_size:
+            return total